@@ -1,7 +1,11 @@
 """Authors: Cody Baker and Ben Dichter."""
 from pathlib import Path
-import numpy as np
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import Optional
 
+import numpy as np
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from pynwb import NWBFile, H5DataIO
 from pynwb.image import ImageSeries
@@ -14,6 +18,149 @@ except ImportError:
     assert CV_INSTALL, "Please install opencv to use this extractor (pip install opencv-python)!"
 
 
+def get_video_fps(video_capture) -> float:
+    (major_ver, minor_ver, subminor_ver) = (cv2.__version__).split(".")
+    if int(major_ver) < 3:
+        return video_capture.get(cv2.cv.CV_CAP_PROP_FPS)
+    return video_capture.get(cv2.CAP_PROP_FPS)
+
+
+class VideoFrameIterator(AbstractDataChunkIterator):
+    """Iterate over the frames of a movie in blocks, decoded ahead of the writer on a background thread.
+
+    A reader thread decodes frames with cv2.VideoCapture into a bounded queue, so decoding overlaps with compression
+    and at most decode_ahead blocks are held in memory at a time. Every HDF5 chunk holds a single frame, and the
+    dataset is extended as blocks arrive since the frame count in the container header is not reliable.
+
+    The thread starts with the first call to __next__. Call close(), or let the iterator be garbage collected, to stop
+    it and release the video when the iteration is abandoned early.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        max_frames: Optional[int] = None,
+        frames_per_block: int = 30,
+        decode_ahead: int = 4,
+    ):
+        """
+        Parameters
+        ----------
+        file_path: PathType
+        max_frames: int, optional
+            Stop after this many frames. Defaults to the whole movie.
+        frames_per_block: int, optional
+            Number of frames decoded and written at a time. Default is 30.
+        decode_ahead: int, optional
+            Maximum number of decoded blocks waiting to be written. Default is 4.
+        """
+        self.file_path = str(file_path)
+        self.max_frames = np.inf if max_frames is None else max_frames
+        self.frames_per_block = frames_per_block
+        self.video_capture = cv2.VideoCapture(self.file_path)
+        self.fps = get_video_fps(self.video_capture)
+        success, first_frame = self.video_capture.read()
+        assert success, f"Unable to decode the first frame of {self.file_path}!"
+        self.frame_shape = first_frame.shape
+        self._dtype = first_frame.dtype
+        self._frame = 0
+        self._done = False
+        self._queue = Queue(maxsize=max(1, decode_ahead))
+        self._stop = Event()
+        self._thread = Thread(
+            target=self._decode,
+            args=(self.video_capture, first_frame, self._queue, self._stop, self.max_frames, frames_per_block),
+            daemon=True,
+        )
+
+    @staticmethod
+    def _put(queue: Queue, stop: Event, item) -> bool:
+        """Put an item on the queue, waiting for room until stop is set. Return whether it was put."""
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    @classmethod
+    def _decode(cls, video_capture, first_frame, queue: Queue, stop: Event, max_frames, frames_per_block: int):
+        """Put blocks of frames on the queue, followed by None once the movie or max_frames is exhausted.
+
+        Runs on the reader thread. It takes no reference to the iterator, so that an abandoned iterator can still be
+        garbage collected and stop the thread.
+        """
+        try:
+            frames = [first_frame]
+            n_frames = 1
+            while n_frames < max_frames and not stop.is_set():
+                success, frame = video_capture.read()
+                if not success:
+                    break
+                frames.append(frame)
+                n_frames += 1
+                if len(frames) == frames_per_block:
+                    if not cls._put(queue, stop, np.stack(frames)):
+                        return
+                    frames = []
+            if frames:
+                cls._put(queue, stop, np.stack(frames))
+        except Exception as exception:  # Raised again by __next__ in the writing thread
+            cls._put(queue, stop, exception)
+        finally:
+            video_capture.release()
+            cls._put(queue, stop, None)
+
+    def close(self):
+        """Stop the reader thread and release the video."""
+        self._done = True
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        elif self._thread.ident is None:  # Never started
+            self.video_capture.release()
+
+    def __del__(self):
+        if hasattr(self, "_thread"):
+            self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        if self._thread.ident is None:
+            self._thread.start()
+        block = self._queue.get()
+        if isinstance(block, Exception):
+            self._done = True
+            raise block
+        if block is None:
+            self._done = True
+            self._thread.join()
+            raise StopIteration
+        start = self._frame
+        self._frame += block.shape[0]
+        selection = (slice(start, self._frame),) + tuple(slice(0, length) for length in self.frame_shape)
+        return DataChunk(data=block, selection=selection)
+
+    def recommended_chunk_shape(self):
+        return (1,) + tuple(self.frame_shape)
+
+    def recommended_data_shape(self):
+        return (0,) + tuple(self.frame_shape)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def maxshape(self):
+        return (None,) + tuple(self.frame_shape)
+
+
 class MPGInterface(BaseDataInterface):
     """Data interface for writing movies as ImageSeries."""
 
@@ -26,35 +173,46 @@ class MPGInterface(BaseDataInterface):
         nwbfile: NWBFile,
         metadata: dict,
         stub_test: bool = False,
+        frames_per_block: int = 30,
+        decode_ahead: int = 4,
     ):
-        if stub_test:
-            count_max = 10
-        else:
-            count_max = np.inf
-
-        (major_ver, minor_ver, subminor_ver) = (cv2.__version__).split(".")
+        """
+        Parameters
+        ----------
+        nwbfile: NWBFile
+        metadata: dict
+        stub_test: bool, optional
+            Only write the first 10 frames of each movie, decoded in place without the reader thread.
+        frames_per_block: int, optional
+            Number of frames decoded and written at a time. Default is 30.
+        decode_ahead: int, optional
+            Maximum number of decoded blocks held in memory while waiting to be written. Default is 4.
+        """
         file_paths = self.source_data["file_paths"]
         for file in file_paths:
-            cap = cv2.VideoCapture(file)
-            if int(major_ver) < 3:
-                fps = cap.get(cv2.cv.CV_CAP_PROP_FPS)
+            if stub_test:
+                cap = cv2.VideoCapture(file)
+                fps = get_video_fps(cap)
+                mov = []
+                while len(mov) < 10:
+                    success, frame = cap.read()
+                    if not success:
+                        break
+                    mov.append(frame)
+                cap.release()
+                mov = np.stack(mov)
+                data = H5DataIO(mov, compression="gzip", chunks=(1,) + mov.shape[1:])
             else:
-                fps = cap.get(cv2.CAP_PROP_FPS)
-
-            success, frame = cap.read()
-            mov = [frame]
-            count = 1
-            while success and count < count_max:
-                success, frame = cap.read()
-                mov.append(frame)
-                count += 1
-            mov = np.array(mov)
-            cap.release()
+                video_iterator = VideoFrameIterator(
+                    file_path=file, frames_per_block=frames_per_block, decode_ahead=decode_ahead
+                )
+                fps = video_iterator.fps
+                data = H5DataIO(video_iterator, compression="gzip")
 
             video = ImageSeries(
                 name=f"Video: {Path(file).name}",
                 description="Video recorded by camera.",
-                data=H5DataIO(mov, compression="gzip"),
+                data=data,
                 rate=fps,
             )
             nwbfile.add_acquisition(video)
@@ -5,10 +5,9 @@ import pandas as pd
 
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from pynwb import NWBFile
-from pynwb.file import TimeIntervals
-
-from ..neuroscope import get_events, check_module, add_position_data
 
+from ..utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
+from ..utils.neuroscope import get_events, check_module, add_position_data
 
 # TODO
 # Add mpg movies as acquisition image series
@@ -70,14 +69,10 @@ class GirardeauMiscInterface(BaseDataInterface):
         # label renaming
         state_label_names = dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM")
         if sleep_state_fpath.is_file():
-            matin = loadmat(sleep_state_fpath)["SleepState"]["ints"][0][0]
-
-            table = TimeIntervals(name="states", description="Sleep states of animal.")
-            table.add_column(name="label", description="Sleep state.")
-
-            data = []
-            for name in matin.dtype.names:
-                for row in matin[name][0][0]:
-                    data.append(dict(start_time=row[0], stop_time=row[1], label=state_label_names[name]))
-            [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
+            table = build_sleep_states_table(
+                state_intervals=read_sleep_state_intervals(file_path=sleep_state_fpath),
+                name="states",
+                description="Sleep states of animal.",
+                state_label_names=state_label_names,
+            )
             check_module(nwbfile, "behavior", "Contains behavioral data.").add(table)
@@ -9,7 +9,7 @@ from nwb_conversion_tools.datainterfaces.neuroscopedatainterface import (
 )
 from nwb_conversion_tools.datainterfaces.cellexplorerdatainterface import CellExplorerSortingInterface
 
-from ..mpgdatainterface import MPGInterface
+from ..common_interfaces.mpgdatainterface import MPGInterface
 from .girardeaumiscdatainterface import GirardeauMiscInterface
 
 
@@ -1,7 +1,6 @@
 """Authors: Cody Baker and Ben Dichter."""
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from pynwb import NWBFile
-from pynwb.file import TimeIntervals
 from pynwb.behavior import SpatialSeries, Position
 from hdmf.backends.hdf5.h5_utils import H5DataIO
 import os
@@ -11,6 +10,7 @@ from scipy.io import loadmat
 import warnings
 
 from ..utils.neuroscope import get_events, check_module
+from ..utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
 
 
 class GrosmarkBehaviorInterface(BaseDataInterface):
@@ -40,22 +40,12 @@ class GrosmarkBehaviorInterface(BaseDataInterface):
         # label renaming specific to Watson
         state_label_names = dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM")
         if os.path.isfile(sleep_state_fpath):
-            matin = loadmat(sleep_state_fpath)["SleepState"]["ints"][0][0]
-
-            table = TimeIntervals(name="states", description="Sleep states of animal.")
-            table.add_column(name="label", description="Sleep state.")
-
-            data = []
-            for name in matin.dtype.names:
-                for row in matin[name][0][0]:
-                    data.append(
-                        dict(
-                            start_time=row[0],
-                            stop_time=row[1],
-                            label=state_label_names[name],
-                        )
-                    )
-            [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
+            table = build_sleep_states_table(
+                state_intervals=read_sleep_state_intervals(file_path=sleep_state_fpath),
+                name="states",
+                description="Sleep states of animal.",
+                state_label_names=state_label_names,
+            )
             check_module(nwbfile, "behavior", "contains behavioral data").add_data_interface(table)
 
         # Position
@@ -3,10 +3,9 @@ from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from pynwb import NWBFile
 import os
 import warnings
-from lxml import etree as et
 import numpy as np
 
-from ..utils.neuroscope import read_lfp, write_lfp, write_spike_waveforms
+from ..utils.neuroscope import get_neuroscope_header, read_lfp, write_lfp, write_spike_waveforms
 
 
 class GrosmarkLFPInterface(BaseDataInterface):
@@ -24,23 +23,19 @@ class GrosmarkLFPInterface(BaseDataInterface):
         if "_" in session_id:
             subject_id, date_text = session_id.split("_")
 
-        xml_filepath = os.path.join(session_path, "{}.xml".format(session_id))
-        root = et.parse(xml_filepath).getroot()
+        header = get_neuroscope_header(session_path=session_path)
 
-        shank_channels = [
-            [int(channel.text) for channel in group.find("channels")]
-            for group in root.find("spikeDetection").find("channelGroups").findall("group")
-        ]
+        shank_channels = [list(channels) for channels in header.shank_channels]
         all_shank_channels = np.concatenate(shank_channels)
         all_shank_channels.sort()
-        lfp_sampling_rate = float(root.find("fieldPotentials").find("lfpSamplingRate").text)
-        spikes_nsamples = int(root.find("neuroscope").find("spikes").find("nSamples").text)
+        lfp_sampling_rate = header.lfp_sampling_rate
+        spikes_nsamples = header.spikes_nsamples
 
         subject_path, session_id = os.path.split(session_path)
 
         _, all_channels_lfp_data = read_lfp(session_path, stub=stub_test)
         try:
-            lfp_data = all_channels_lfp_data[:, all_shank_channels]
+            lfp_data = all_channels_lfp_data.subset(all_shank_channels)
         except IndexError:
             warnings.warn("Encountered indexing issue for all_shank_channels on lfp_data subsetting; using entire lfp!")
             lfp_data = all_channels_lfp_data
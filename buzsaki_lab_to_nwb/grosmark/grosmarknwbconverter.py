@@ -5,12 +5,12 @@ from dateutil.parser import parse as dateparse
 
 import numpy as np
 from scipy.io import loadmat
-from lxml import etree as et
 
 from nwb_conversion_tools import NWBConverter, NeuroscopeSortingInterface
 
 from .grosmarklfpdatainterface import GrosmarkLFPInterface
 from .grosmarkbehaviordatainterface import GrosmarkBehaviorInterface
+from ..utils.neuroscope import get_neuroscope_header
 
 
 class GrosmarkNWBConverter(NWBConverter):
@@ -24,16 +24,8 @@ class GrosmarkNWBConverter(NWBConverter):
 
     def __init__(self, **input_args):
         self._recording_type = "BuzsakiNoRecording"
-        session_id = os.path.split(input_args["GrosmarkLFP"]["folder_path"])[1]
-        xml_filepath = os.path.join(input_args["GrosmarkLFP"]["folder_path"], session_id + ".xml")
-        root = et.parse(xml_filepath).getroot()
-        n_channels = len(
-            [
-                int(channel.text)
-                for group in root.find("spikeDetection").find("channelGroups").findall("group")
-                for channel in group.find("channels")
-            ]
-        )
+        header = get_neuroscope_header(session_path=input_args["GrosmarkLFP"]["folder_path"])
+        n_channels = sum(len(channels) for channels in header.shank_channels)
         input_args.update(BuzsakiNoRecording=dict(timeseries=np.array(range(n_channels)), sampling_frequency=1))
         self._sorting_type = "NeuroscopeSorting"
         super().__init__(**input_args)
@@ -50,18 +42,14 @@ class GrosmarkNWBConverter(NWBConverter):
             subject_id, date_text = session_id.split("_")
         session_start = dateparse(date_text[-4:] + date_text[:-4])
 
-        xml_filepath = os.path.join(session_path, "{}.xml".format(session_id))
-        root = et.parse(xml_filepath).getroot()
+        header = get_neuroscope_header(session_path=session_path)
 
-        n_total_channels = int(root.find("acquisitionSystem").find("nChannels").text)
-        shank_channels = [
-            [int(channel.text) for channel in group.find("channels")]
-            for group in root.find("spikeDetection").find("channelGroups").findall("group")
-        ]
+        n_total_channels = header.n_channels
+        shank_channels = [list(channels) for channels in header.shank_channels]
         all_shank_channels = np.concatenate(shank_channels)
         all_shank_channels.sort()
-        spikes_nsamples = int(root.find("neuroscope").find("spikes").find("nSamples").text)
-        lfp_sampling_rate = float(root.find("fieldPotentials").find("lfpSamplingRate").text)
+        spikes_nsamples = header.spikes_nsamples
+        lfp_sampling_rate = header.lfp_sampling_rate
 
         shank_electrode_number = [x for channels in shank_channels for x, _ in enumerate(channels)]
         shank_group_name = ["shank{}".format(n + 1) for n, channels in enumerate(shank_channels) for _ in channels]
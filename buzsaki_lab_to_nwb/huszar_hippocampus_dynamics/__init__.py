@@ -1,2 +1,2 @@
 from .converter import HuzsarNWBConverter
-from .convert_session import session_to_nwbfile
+from .convert_session import get_nwbfile_path, session_to_nwbfile
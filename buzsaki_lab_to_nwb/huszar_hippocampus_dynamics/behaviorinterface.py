@@ -6,13 +6,14 @@ from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from neuroconv.utils.json_schema import FolderPathType
 from pynwb.behavior import CompassDirection, Position, SpatialSeries
-from pynwb.file import NWBFile, TimeIntervals, TimeSeries
-from scipy.io import loadmat as loadmat_scipy
-from pymatreader import read_mat
+from pynwb.file import NWBFile, TimeSeries
 import warnings
 
 from ndx_events import LabeledEvents
 
+from buzsaki_lab_to_nwb.utils.mat_loader import SCIPY, load_mat
+from buzsaki_lab_to_nwb.utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
+
 
 class HuszarBehavior8MazeRewardsInterface(BaseDataInterface):
     def __init__(self, folder_path: FolderPathType):
@@ -24,7 +25,8 @@ class HuszarBehavior8MazeRewardsInterface(BaseDataInterface):
 
         file_path = self.session_path / f"{self.session_id}.Behavior.mat"
 
-        mat_file = read_mat(file_path)
+        # Parsed as in HuszarBehavior8MazeInterface and HuszarTrialsInterface so that the file is read once
+        mat_file = load_mat(file_path, backend=SCIPY, simplify_cells=True)
 
         events_data = mat_file["behavior"]["events"]
 
@@ -75,29 +77,11 @@ class HuzsarBehaviorSleepInterface(BaseDataInterface):
 
         assert sleep_states_file_path.exists(), f"Sleep states file not found: {sleep_states_file_path}"
 
-        mat_file = loadmat_scipy(sleep_states_file_path, simplify_cells=True)
-
-        state_label_names = dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM")
-        sleep_state_dic = mat_file["SleepState"]["ints"]
-        table = TimeIntervals(name="SleepStates", description="Sleep state of the animal.")
-        table.add_column(name="label", description="Sleep state.")
-
-        data = []
-        for sleep_state in state_label_names:
-            values = sleep_state_dic[sleep_state]
-
-            if len(values) != 0 and type(values[0]) is not np.ndarray:
-                values = [values]
-
-            for start_time, stop_time in values:
-                data.append(
-                    dict(
-                        start_time=float(start_time),
-                        stop_time=float(stop_time),
-                        label=state_label_names[sleep_state],
-                    )
-                )
-        [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
+        table = build_sleep_states_table(
+            state_intervals=read_sleep_state_intervals(file_path=sleep_states_file_path),
+            name="SleepStates",
+            state_label_names=dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM"),
+        )
         processing_module.add(table)
 
     def align_timestamps(self, aligned_timestamps: np.ndarray):
@@ -157,7 +141,7 @@ class HuszarBehavior8MazeInterface(BaseDataInterface):
 
         file_path = self.session_path / f"{self.session_id}.Behavior.mat"
 
-        mat_file = loadmat_scipy(file_path, simplify_cells=True)
+        mat_file = load_mat(file_path, backend=SCIPY, simplify_cells=True)
 
         timestamps = mat_file["behavior"]["timestamps"]
         position = mat_file["behavior"]["position"]
@@ -1,8 +1,13 @@
 from pathlib import Path
-from buzsaki_lab_to_nwb.huszar_hippocampus_dynamics import session_to_nwbfile
+from buzsaki_lab_to_nwb.huszar_hippocampus_dynamics import get_nwbfile_path, session_to_nwbfile
+from buzsaki_lab_to_nwb.utils.batch_scheduler import (
+    STREAMED_SUFFIXES,
+    ConversionJob,
+    estimate_session_cost,
+    run_conversion_jobs,
+)
+from buzsaki_lab_to_nwb.utils.conversion_manifest import get_session_fingerprint
 
-import concurrent.futures
-import psutil
 import json
 import shutil
 
@@ -12,6 +17,7 @@ if __name__ == "__main__":
     stub_test = False  # Converts a only a stub of the data for quick iteration and testing
     verbose = False
     write_electrical_series = True  # Write the electrical series to the NWB file
+    incremental = False  # Patch existing files, rewriting only the interfaces whose source files changed
     iterator_opts = dict(buffer_gb=1.0, display_progress=verbose)
 
     output_dir_path = Path.home() / "final_conversion" / "HuszarR"  # "conversion_nwb"
@@ -32,19 +38,29 @@ if __name__ == "__main__":
             all_subject_sessions_paths = (path for path in subject_path.iterdir() if path.is_dir())
             session_dir_path_list.extend(all_subject_sessions_paths)
 
-    def worker(session_dir_path):
-        try:
-            session_to_nwbfile(
-                session_dir_path,
-                output_dir_path,
+    streamed_suffixes = [suffix for suffix in STREAMED_SUFFIXES if write_electrical_series or suffix != ".dat"]
+    jobs = [
+        ConversionJob(
+            name=str(session_dir_path.relative_to(project_root_path)),
+            function=session_to_nwbfile,
+            kwargs=dict(
+                session_dir_path=session_dir_path,
+                output_dir_path=output_dir_path,
                 stub_test=stub_test,
                 write_electrical_series=write_electrical_series,
                 verbose=verbose,
-            )
-        except Exception as e:
-            print(f"ERROR ({str(session_dir_path.relative_to(project_root_path))}): {str(e)}")
-
-    # Create a pool of worker processes
-    num_physical_cores = psutil.cpu_count(logical=False)
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_physical_cores) as executor:
-        executor.map(worker, session_dir_path_list)
+                incremental=incremental,
+            ),
+            cost=estimate_session_cost(
+                session_dir_path, buffer_gb=iterator_opts["buffer_gb"], streamed_suffixes=streamed_suffixes
+            ),
+            fingerprint=get_session_fingerprint(session_dir_path),
+            output_path=str(get_nwbfile_path(session_dir_path, output_dir_path, stub_test=stub_test)),
+        )
+        for session_dir_path in session_dir_path_list
+    ]
+
+    # Largest sessions first, packed under the available memory; errors are printed per session and recorded in the
+    # manifest, so a rerun retries the failed sessions and skips the converted ones
+    output_dir_path.mkdir(parents=True, exist_ok=True)
+    run_conversion_jobs(jobs, display_progress=verbose, manifest_path=output_dir_path / "conversion_manifest.sqlite")
@@ -2,24 +2,33 @@
 
 from neuroconv.utils import load_dict_from_file, dict_deep_update
 from buzsaki_lab_to_nwb.huszar_hippocampus_dynamics import HuzsarNWBConverter
+from buzsaki_lab_to_nwb.utils.chunking import add_recording_chunk_options
 from pathlib import Path
 import warnings
 
 
-def session_to_nwbfile(session_dir_path, output_dir_path, stub_test=False, write_electrical_series=True, verbose=False):
+def get_nwbfile_path(session_dir_path, output_dir_path, stub_test=False) -> Path:
+    """Path of the NWB file session_to_nwbfile writes for a session."""
+    output_dir_path = Path(output_dir_path)
+    if stub_test:
+        output_dir_path = output_dir_path / "nwb_stub"
+    return output_dir_path / f"{Path(session_dir_path).stem}.nwb"
+
+
+def session_to_nwbfile(
+    session_dir_path, output_dir_path, stub_test=False, write_electrical_series=True, verbose=False, incremental=False
+):
     if verbose:
         print("---------------------")
         print("conversion for:")
         print(f"{session_dir_path=}")
 
     session_dir_path = Path(session_dir_path)
-    output_dir_path = Path(output_dir_path)
-    if stub_test:
-        output_dir_path = output_dir_path / "nwb_stub"
+    nwbfile_path = get_nwbfile_path(session_dir_path, output_dir_path, stub_test=stub_test)
+    output_dir_path = nwbfile_path.parent
     output_dir_path.mkdir(parents=True, exist_ok=True)
 
     session_id = session_dir_path.stem
-    nwbfile_path = output_dir_path / f"{session_id}.nwb"
 
     source_data = dict()
     conversion_options = dict()
@@ -112,13 +121,22 @@ def session_to_nwbfile(session_dir_path, output_dir_path, stub_test=False, write
     editable_metadata = load_dict_from_file(editable_metadata_path)
     metadata = dict_deep_update(metadata, editable_metadata)
 
+    # Chunk the recordings for streaming reads so the files never need a repack
+    add_recording_chunk_options(converter=converter, conversion_options=conversion_options)
     # Run conversion
-    nwbfile = converter.run_conversion(
-        nwbfile_path=nwbfile_path,
-        metadata=metadata,
-        conversion_options=conversion_options,
-        overwrite=True,
-    )
+    if incremental:
+        # Only the interfaces whose source files changed since the last incremental run are rewritten
+        converter.run_incremental_conversion(
+            nwbfile_path=nwbfile_path, metadata=metadata, conversion_options=conversion_options
+        )
+        nwbfile = None  # The file is patched on disk rather than built in memory
+    else:
+        nwbfile = converter.run_conversion(
+            nwbfile_path=nwbfile_path,
+            metadata=metadata,
+            conversion_options=conversion_options,
+            overwrite=True,
+        )
 
     return nwbfile
 
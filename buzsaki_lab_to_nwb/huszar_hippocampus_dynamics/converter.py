@@ -4,7 +4,6 @@ from zoneinfo import ZoneInfo
 
 import numpy as np
 from neuroconv import NWBConverter
-from scipy.io import loadmat as loadmat_scipy
 
 from neuroconv.datainterfaces import NeuroScopeLFPInterface, NeuroScopeRecordingInterface
 
@@ -24,8 +23,11 @@ from trialsinterface import HuszarTrialsInterface
 
 from neuroconv.datainterfaces import CellExplorerSortingInterface
 
+from buzsaki_lab_to_nwb.utils.incremental_conversion import IncrementalNWBConverterMixin
+from buzsaki_lab_to_nwb.utils.mat_loader import SCIPY, load_mat
 
-class HuzsarNWBConverter(NWBConverter):
+
+class HuzsarNWBConverter(IncrementalNWBConverterMixin, NWBConverter):
     """Primary conversion class for the Huzsar hippocampus data set."""
 
     data_interface_classes = dict(
@@ -39,6 +41,15 @@ class HuzsarNWBConverter(NWBConverter):
         Trials=HuszarTrialsInterface,
         RippleEvents=HuszarProcessingRipplesEventsInterface,
     )
+    # Files each folder-based interface reads, used to detect which interfaces need rewriting
+    interface_source_patterns = dict(
+        Behavior8Maze=["*.Behavior.mat"],
+        BehaviorSleep=["*.SleepState.states.mat"],
+        BehaviorRewards=["*.Behavior.mat"],
+        Epochs=["*.session.mat"],
+        Trials=["*.Behavior.mat"],
+        RippleEvents=["*.ripples.events.mat"],
+    )
 
     def __init__(self, source_data: dict, verbose: bool = True):
         super().__init__(source_data=source_data, verbose=verbose)
@@ -51,7 +62,7 @@ class HuzsarNWBConverter(NWBConverter):
         session_file = self.session_folder_path / f"{self.session_id}.session.mat"
         assert session_file.is_file(), f"Session file not found: {session_file}"
 
-        session_mat = loadmat_scipy(session_file, simplify_cells=True)
+        session_mat = load_mat(session_file, backend=SCIPY, simplify_cells=True)
         date = self.session_id.split("_")[2]  # This does not contain the time
 
         # Convert date str to date object
@@ -3,9 +3,10 @@ from pathlib import Path
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils.json_schema import FolderPathType
 from pynwb.file import NWBFile
-from pymatreader import read_mat
 import numpy as np
 
+from buzsaki_lab_to_nwb.utils.mat_loader import SCIPY, load_mat
+
 
 class HuszarEpochsInterface(BaseDataInterface):
     def __init__(self, folder_path: FolderPathType):
@@ -17,7 +18,8 @@ class HuszarEpochsInterface(BaseDataInterface):
 
         session_file_path = self.session_path / f"{self.session_id}.session.mat"
         assert session_file_path.is_file(), session_file_path
-        mat_file = read_mat(session_file_path)
+        # Parsed as in HuzsarNWBConverter.get_metadata so that the file is read once
+        mat_file = load_mat(session_file_path, backend=SCIPY, simplify_cells=True)
 
         epoch_list = mat_file["session"].get("epochs", [])  # Include epochs if present
 
@@ -3,11 +3,11 @@ from pathlib import Path
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils.json_schema import FolderPathType
 from neuroconv.tools.nwb_helpers import get_module
-from pynwb import H5DataIO
-from pynwb.epoch import TimeIntervals
 from pynwb.file import NWBFile
 from pymatreader import read_mat
 
+from buzsaki_lab_to_nwb.utils.time_intervals import build_time_intervals
+
 
 class HuszarProcessingRipplesEventsInterface(BaseDataInterface):
     def __init__(self, folder_path: FolderPathType):
@@ -43,21 +43,6 @@ class HuszarProcessingRipplesEventsInterface(BaseDataInterface):
             peak_amplitudes="Peak amplitude of the ripple.",
         )
 
-        name = "Ripples"
-        ripple_events_table = TimeIntervals(name=name, description="Ripples and their metrics")
-
-        for start_time, stop_time in ripple_intervals:
-            ripple_events_table.add_row(start_time=start_time, stop_time=stop_time)
-
-        for column_name, column_data in zip(
-            list(descriptions), [ripple_durations, peaks, peak_normed_power, peak_frequencies, peak_amplitudes]
-        ):
-            ripple_events_table.add_column(
-                name=column_name,
-                description=descriptions[column_name],
-                data=H5DataIO(column_data, compression="gzip"),
-            )
-
         # Extract indexed data
         ripple_stats_maps = ripples_data["maps"]
 
@@ -73,15 +58,25 @@ class HuszarProcessingRipplesEventsInterface(BaseDataInterface):
             ripple_amplitudes="Amplitude of each point on the ripple.",
         )
 
-        for column_name, column_data in zip(
-            list(indexed_descriptions), [ripple_raw, ripple_frequencies, ripple_phases, ripple_amplitudes]
-        ):
-            ripple_events_table.add_column(
-                name=column_name,
-                description=indexed_descriptions[column_name],
-                index=list(range(column_data.shape[0])),
-                data=H5DataIO(column_data, compression="gzip"),
-            )
+        name = "Ripples"
+        ripple_events_table = build_time_intervals(
+            name=name,
+            description="Ripples and their metrics",
+            start_times=ripple_intervals[:, 0],
+            stop_times=ripple_intervals[:, 1],
+            columns=[
+                dict(name=column_name, description=descriptions[column_name], data=column_data)
+                for column_name, column_data in zip(
+                    list(descriptions), [ripple_durations, peaks, peak_normed_power, peak_frequencies, peak_amplitudes]
+                )
+            ],
+            ragged_columns=[
+                dict(name=column_name, description=indexed_descriptions[column_name], data=column_data)
+                for column_name, column_data in zip(
+                    list(indexed_descriptions), [ripple_raw, ripple_frequencies, ripple_phases, ripple_amplitudes]
+                )
+            ],
+        )
 
         processing_module = get_module(nwbfile=nwbfile, name="ecephys")
 
@@ -4,10 +4,11 @@ from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils.json_schema import FolderPathType
 from pynwb.file import NWBFile
 
-from scipy.io import loadmat as loadmat_scipy
 import numpy as np
 from hdmf.backends.hdf5.h5_utils import H5DataIO
 
+from buzsaki_lab_to_nwb.utils.mat_loader import SCIPY, load_mat
+
 
 def access_behavior_property_safe(property, parent, behavior_mat):
     trial_info = behavior_mat["behavior"]["trials"]
@@ -55,7 +56,7 @@ class HuszarTrialsInterface(BaseDataInterface):
 
         # Add trial table from the behavior file
         behavior_file_path = self.session_path / f"{self.session_id}.Behavior.mat"
-        behavior_mat = loadmat_scipy(behavior_file_path, simplify_cells=True)
+        behavior_mat = load_mat(behavior_file_path, backend=SCIPY, simplify_cells=True)
 
         trial_info = behavior_mat["behavior"]["trials"]
         trial_interval_list = access_behavior_property_safe("trial_ints", trial_info, behavior_mat)
@@ -6,7 +6,8 @@ from warnings import warn
 from uuid import uuid4
 
 from tqdm import tqdm
-from neuroconv.tools.processes import deploy_process
+from buzsaki_lab_to_nwb.utils.chunking import PER_CHANNEL, TIME_SLICE, get_chunk_advice
+from buzsaki_lab_to_nwb.utils.hdf5_repack import repack_nwbfiles
 
 dandi_base = Path("E:/Buzsaki/PetersenP/000059")
 all_dandi_nwbfiles = list(dandi_base.rglob("**/*.nwb"))
@@ -27,69 +28,58 @@ def recursively_rechunk_datasets(
         existing_chunk_shape = h5py_object.chunks
         # if existing_chunk_shape is None:  # Not supporting forced chunking yet...
         #    return
-        itemsize = h5py_object.dtype.itemsize
 
         location = h5py_object.name
         new_chunk_shape = None
         if existing_chunk_shape is None:  # Currently unchunked
             existing_chunk_shape = h5py_object.maxshape
 
-        if len(existing_chunk_shape) == 1:
-            new_chunk_shape = (min(10 * 1024**2 // itemsize, h5py_object.maxshape[0]),)
-        elif len(existing_chunk_shape) == 2:
+        if len(existing_chunk_shape) == 0:  # mostly string 'attributes' like 'Institution'. Unsure how to handle
+            pass
+        elif len(existing_chunk_shape) <= 3:  # 3D is not a general rule, but specific to this DANDI set
             # Decisions from https://github.com/flatironinstitute/neurosift/issues/52#issuecomment-1671405249
             # and https://github.com/flatironinstitute/neurosift/issues/109#issuecomment-1684481733
-            # to use 64 hard bound
-            max_raw_bound = min(64, h5py_object.maxshape[1])
-
-            new_chunk_shape = (
-                min(10 * 1024**2 // (itemsize * max_raw_bound), h5py_object.maxshape[0]),
-                max_raw_bound,  # MANUALLY MODIFIED FOR RAW SCRIPT
-            )
-        elif len(existing_chunk_shape) == 3:  # Not as a general rule, but specific to this DANDI set
-            new_chunk_shape = (
-                min(
-                    10 * 1024**2 // (itemsize * h5py_object.maxshape[1] * h5py_object.maxshape[2]),
-                    h5py_object.maxshape[0],
-                ),
-                h5py_object.maxshape[1],
-                h5py_object.maxshape[2],
-            )
-        elif len(existing_chunk_shape) == 0:  # mostly string 'attributes' like 'Institution'. Unsure how to handle
-            pass
+            # to use 64 hard bound on the channels of 2D raw data
+            access = PER_CHANNEL if len(existing_chunk_shape) == 2 else TIME_SLICE  # MANUALLY MODIFIED FOR RAW SCRIPT
+            chunk_advice = get_chunk_advice(shape=h5py_object.shape, dtype=h5py_object.dtype, access=access)
+            new_chunk_shape = chunk_advice.chunk_shape
         else:
             warn(f"Skipping object {h5py_object} due to unsupported chunk length {existing_chunk_shape}!", stacklevel=2)
 
-        if h5py_object.chunks is not None and h5py_object.compression is None:
-            h5py_object.compression = "gzip"
-            h5py_object.compression_opts = 4
         if new_chunk_shape is not None:
-            return [(f'"{location}"', new_chunk_shape)]
+            return [(location, new_chunk_shape)]
+
 
+if __name__ == "__main__":  # repack_nwbfiles spawns a process per file
+    repack_jobs = list()
+    for dandi_nwbfile in tqdm(iterable=all_dandi_nwbfiles):
+        with h5py.File(name=dandi_nwbfile, mode="a") as nwbfile:
+            nwbfile["identifier"][()] = str(uuid4()).encode("utf-8")
+            if "intervals" in nwbfile:
+                del nwbfile["intervals"]
+            if "units" in nwbfile:
+                del nwbfile["units"]
+            if "behavior" in nwbfile["processing"]:
+                del nwbfile["processing"]["behavior"]
 
-for dandi_nwbfile in tqdm(iterable=all_dandi_nwbfiles):
-    with h5py.File(name=dandi_nwbfile, mode="a") as nwbfile:
-        nwbfile["identifier"][()] = str(uuid4()).encode("utf-8")
-        if "intervals" in nwbfile:
-            del nwbfile["intervals"]
-        if "units" in nwbfile:
-            del nwbfile["units"]
-        if "behavior" in nwbfile["processing"]:
-            del nwbfile["processing"]["behavior"]
+        with h5py.File(name=dandi_nwbfile, mode="r") as nwbfile:
+            paths_and_new_chunk_shapes = recursively_rechunk_datasets(h5py_object=nwbfile)
 
-    with h5py.File(name=dandi_nwbfile, mode="r") as nwbfile:
-        paths_and_new_chunk_shapes = recursively_rechunk_datasets(h5py_object=nwbfile)
+        new_dandi_nwbfile = str(dandi_nwbfile).replace("E:\\", "F:\\").replace(".nwb", "_desc-raw.nwb")
+        if not Path(new_dandi_nwbfile).exists():
+            repack_jobs.append(
+                dict(
+                    source_file_path=dandi_nwbfile,
+                    target_file_path=new_dandi_nwbfile,
+                    chunk_shapes=dict(paths_and_new_chunk_shapes),
+                )
+            )
 
-    new_dandi_nwbfile = str(dandi_nwbfile).replace("E:\\", "F:\\").replace(".nwb", "_desc-raw.nwb")
-    if not Path(new_dandi_nwbfile).exists():
-        # repack_command = f"h5repack -v -i {dandi_nwbfile} -o {new_dandi_nwbfile} -S PAGE -G 10485760 "
-        repack_command = f"h5repack -v -i {dandi_nwbfile} -o {new_dandi_nwbfile} -S FSM_AGGR "
-        for path, new_chunk_shape in paths_and_new_chunk_shapes:
-            if len(new_chunk_shape) == 1:
-                new_chunk_string = f"{new_chunk_shape[0]}"
-            elif len(new_chunk_shape) == 2:
-                new_chunk_string = f"{new_chunk_shape[0]}x{new_chunk_shape[1]}"
-            elif len(new_chunk_shape) == 3:
-                new_chunk_string = f"{new_chunk_shape[0]}x{new_chunk_shape[1]}x{new_chunk_shape[2]}"
-            repack_command += f"-l {path}:CHUNK={new_chunk_string} -f {path}:GZIP=4 "
-        output = deploy_process(command=repack_command, catch_output=True)
+    # Rechunked datasets are gzip compressed; files are written with paged aggregation and several at a time
+    reports = repack_nwbfiles(repack_jobs=repack_jobs, n_files=4, display_progress=True)
+    for new_dandi_nwbfile, report in reports.items():
+        for dataset_report in report:
+            print(
+                f"{new_dandi_nwbfile}{dataset_report['path']}: {dataset_report['bytes'] / 1e9:.2f} GB at "
+                f"{dataset_report['mb_per_s']:.1f} MB/s"
+            )
@@ -1,6 +1,5 @@
 """Run entire conversion."""
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import timedelta
 from warnings import simplefilter
 
@@ -9,10 +8,15 @@ from nwb_conversion_tools.utils import load_dict_from_file, dict_deep_update
 from spikeextractors import NeuroscopeRecordingExtractor
 
 from buzsaki_lab_to_nwb.tingley_metabolic import TingleyMetabolicConverter, get_session_datetime
+from buzsaki_lab_to_nwb.utils.batch_scheduler import ConversionJob, estimate_session_cost, run_conversion_jobs
+from buzsaki_lab_to_nwb.utils.chunking import add_recording_chunk_options
+from buzsaki_lab_to_nwb.utils.conversion_manifest import get_session_fingerprint
+from buzsaki_lab_to_nwb.utils.parallel_compression import staged_compression
 
 n_jobs = 1
 progress_bar_options = dict(desc="Running conversion...", position=0, leave=False)
 stub_test = True
+incremental = False  # Patch existing files, rewriting only the interfaces whose source files changed
 conversion_factor = 0.195  # Intan
 buffer_gb = 1
 # note that on DANDIHub, max number of actual I/O operations on processes seems limited to 8-10,
@@ -59,7 +63,7 @@ global_metadata = load_dict_from_file(metadata_path)
 subject_info_table = load_dict_from_file(subject_info_path)
 
 
-def convert_session(session_path, nwbfile_path):
+def convert_session(session_path, nwbfile_path, incremental=False):
     """Run coonversion."""
     simplefilter("ignore")
     conversion_options = dict()
@@ -166,25 +170,48 @@ def convert_session(session_path, nwbfile_path):
     if any(ripple_mat_file_paths):
         conversion_options.update(Ripples=dict(stub_test=stub_test, ecephys_start_time=ecephys_start_time_increment))
 
-    converter.run_conversion(
-        nwbfile_path=str(nwbfile_path),
-        metadata=metadata,
-        conversion_options=conversion_options,
-        overwrite=True,
-    )
-    nwbfile_path.rename(nwb_final_output_path / nwbfile_path.name)
+    # Chunk the recordings for streaming reads so the files never need a repack
+    add_recording_chunk_options(converter=converter, conversion_options=conversion_options)
+    if incremental:
+        # Patch the finished file in place; only the interfaces whose source files changed are rewritten
+        converter.run_incremental_conversion(
+            nwbfile_path=nwb_final_output_path / nwbfile_path.name,
+            metadata=metadata,
+            conversion_options=conversion_options,
+        )
+    else:
+        # Stage the parallel accelerometer compression next to the output and release it once the file is written
+        with staged_compression(scratch_folder_path=nwbfile_path.parent):
+            converter.run_conversion(
+                nwbfile_path=str(nwbfile_path),
+                metadata=metadata,
+                conversion_options=conversion_options,
+                overwrite=True,
+            )
+        nwbfile_path.rename(nwb_final_output_path / nwbfile_path.name)
 
 
 if n_jobs == 1:
     for session_path, nwbfile_path in tqdm(zip(session_path_list, nwbfile_list), **progress_bar_options):
         simplefilter("ignore")
-        convert_session(session_path=session_path, nwbfile_path=nwbfile_path)
+        convert_session(session_path=session_path, nwbfile_path=nwbfile_path, incremental=incremental)
 else:
     simplefilter("ignore")
-    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
-        futures = []
-        for session_path, nwbfile_path in zip(session_path_list, nwbfile_list):
-            futures.append(executor.submit(convert_session, session_path=session_path, nwbfile_path=nwbfile_path))
-        completed_futures = tqdm(as_completed(futures), total=len(session_path_list), **progress_bar_options)
-        for future in completed_futures:
-            pass  # To get tqdm to show
+    jobs = [
+        ConversionJob(
+            name=session_path.name,
+            function=convert_session,
+            kwargs=dict(session_path=session_path, nwbfile_path=nwbfile_path, incremental=incremental),
+            cost=estimate_session_cost(session_path, buffer_gb=buffer_gb),
+            fingerprint=get_session_fingerprint(session_path),
+            output_path=str(nwb_final_output_path / nwbfile_path.name),
+        )
+        for session_path, nwbfile_path in zip(session_path_list, nwbfile_list)
+    ]
+    # Largest sessions first, packed under the available memory
+    run_conversion_jobs(
+        jobs,
+        max_workers=n_jobs,
+        progress_bar_options=progress_bar_options,
+        manifest_path=nwb_final_output_path / "conversion_manifest.sqlite",
+    )
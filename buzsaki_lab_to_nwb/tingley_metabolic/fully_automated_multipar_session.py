@@ -7,7 +7,7 @@ from datetime import timedelta
 from warnings import simplefilter
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import defaultdict
-from time import sleep
+from time import sleep, time
 
 from shutil import rmtree
 from natsort import natsorted
@@ -25,6 +25,15 @@ from nwb_conversion_tools.utils import load_dict_from_file, dict_deep_update
 from spikeextractors import NeuroscopeRecordingExtractor
 
 from buzsaki_lab_to_nwb.tingley_metabolic import TingleyMetabolicConverter, get_session_datetime
+from buzsaki_lab_to_nwb.utils.batch_scheduler import PeakMemorySampler
+from buzsaki_lab_to_nwb.utils.chunking import add_recording_chunk_options
+from buzsaki_lab_to_nwb.utils.conversion_manifest import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_RUNNING,
+    ConversionManifest,
+    get_fingerprint,
+)
 
 assert os.environ.get("DANDI_API_KEY"), "Set your DANDI_API_KEY!"
 
@@ -65,19 +74,36 @@ else:
     with open(content_cache_file_path, mode="r") as fp:
         contents_per_subject = json.load(fp)
 
+manifest = ConversionManifest(manifest_path=cache_path / "conversion_manifest.sqlite")
+if len(manifest) == 0:
+    print("No conversion manifest found! Marking the sessions already on DANDI as done.")
+    dandi_content = list(get_s3_urls_and_dandi_paths(dandiset_id=dandiset_id).values())
+    dandi_session_datetimes = set(
+        "_".join(x.split("/")[1].split("_")[-3:-1]) for x in dandi_content
+    )  # probably a better way to do this, just brute forcing for now
+    for subject_contents in contents_per_subject.values():
+        for session_id in set(Path(x).parent.name for x in subject_contents):
+            if "_".join(session_id.split("_")[-2:]) in dandi_session_datetimes:
+                manifest.record(name=session_id, status=STATUS_DONE)
+
+
+def get_session_contents_fingerprint(session_id, subject_contents):
+    """Fingerprint the names and sizes of the files of a session in the Globus manifest."""
+    return get_fingerprint({x: size for x, size in subject_contents.items() if Path(x).parent.name == session_id})
+
 
 def _transfer_and_convert(subject_id, subject_contents):
+    started_session_id = None
     try:
-        dandi_content = list(get_s3_urls_and_dandi_paths(dandiset_id=dandiset_id).values())
-        dandi_session_datetimes = [
-            "_".join(x.split("/")[1].split("_")[-3:-1]) for x in dandi_content
-        ]  # probably a better way to do this, just brute forcing for now
         sessions = set([Path(x).parent.name for x in subject_contents]) - set([subject_id])  # subject_id for .csv
         unconverted_sessions = natsorted(
             [
                 session_id
                 for session_id in sessions
-                if "_".join(session_id.split("_")[-2:]) not in dandi_session_datetimes
+                if not manifest.is_done(
+                    name=session_id,
+                    fingerprint=get_session_contents_fingerprint(session_id, subject_contents),
+                )
             ]
         )  # natsorted for consistency on each run
 
@@ -135,6 +161,13 @@ def _transfer_and_convert(subject_id, subject_contents):
             flush=True,
         )
 
+        started_session_id = session_id
+        manifest.record(
+            name=session_id,
+            status=STATUS_RUNNING,
+            fingerprint=get_session_contents_fingerprint(session_id, subject_contents),
+        )
+
         metadata_path = Path(__file__).parent / "tingley_metabolic_metadata.yml"
 
         nwb_output_path = cache_path / f"nwb_{session_id}"
@@ -254,6 +287,8 @@ def _transfer_and_convert(subject_id, subject_contents):
                 Ripples=dict(stub_test=stub_test, ecephys_start_time=ecephys_start_time_increment)
             )
 
+        # Chunk the recordings for streaming reads so the files never need a repack
+        add_recording_chunk_options(converter=converter, conversion_options=conversion_options)
         converter.run_conversion(
             nwbfile_path=str(nwbfile_path),
             metadata=metadata,
@@ -262,12 +297,20 @@ def _transfer_and_convert(subject_id, subject_contents):
         )
         return True, session_path, nwb_output_path
     except Exception as ex:
+        if started_session_id is not None:
+            manifest.record(
+                name=started_session_id,
+                status=STATUS_FAILED,
+                fingerprint=manifest.get(started_session_id)["fingerprint"],
+                error=f"{type(ex)}: - {str(ex)}",
+            )
         return False, f"{type(ex)}: - {str(ex)}\n\n{traceback.format_exc()}", False
 
 
 def _transfer_convert_and_upload(subject_id, subject_contents):
     try:
-        with ProcessPoolExecutor(max_workers=1) as executor:
+        start_time = time()
+        with PeakMemorySampler() as peak_memory, ProcessPoolExecutor(max_workers=1) as executor:
             future = executor.submit(_transfer_and_convert, subject_id=subject_id, subject_contents=subject_contents)
         success, session_path, nwb_folder_path = future.result()
         if success:
@@ -277,6 +320,15 @@ def _transfer_convert_and_upload(subject_id, subject_contents):
                 rmtree(session_path, ignore_errors=True)
             try:
                 automatic_dandi_upload(dandiset_id=dandiset_id, nwb_folder_path=nwb_folder_path)
+                session_id = Path(session_path).name
+                manifest.record(
+                    name=session_id,
+                    status=STATUS_DONE,
+                    fingerprint=manifest.get(session_id)["fingerprint"],
+                    output_path=f"dandiset {dandiset_id}",
+                    duration=time() - start_time,
+                    peak_rss_mb=peak_memory.peak_rss_mb,  # Includes the conversion process
+                )
             finally:
                 rmtree(nwb_folder_path, ignore_errors=True)
                 rmtree(nwb_folder_path.parent / dandiset_id, ignore_errors=True)
@@ -1,42 +1,83 @@
 """Author: Cody Baker."""
-from typing import List
+import os
+from typing import Optional, Tuple
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 
 import numpy as np
 from pandas import read_csv, to_datetime
 
+GLUCOSE_TIMESTAMP_FORMAT = "%m/%d/%y %H:%M:%S"
 
-def load_subject_glucose_series(session_path) -> (List[datetime], List[float]):
-    """Given the subject_id string and the ecephys session_path, load all glucose series data for further parsing."""
+
+def load_subject_glucose_series(session_path) -> Tuple[np.ndarray, np.ndarray]:
+    """Given the subject_id string and the ecephys session_path, load all glucose series data for further parsing.
+
+    The series of every .csv file are concatenated, sorted in time and deduplicated. The result is cached for the
+    lifetime of the process, keyed on the path, size and modification time of each file, so every session of a
+    subject reuses the same parsed series; the returned arrays are read-only for that reason.
+
+    Returns
+    -------
+    timestamps: np.ndarray(dtype='datetime64[ns]')
+    isig: np.ndarray(dtype='float64')
+    """
     all_csv = [x for x in Path(session_path).iterdir() if ".csv" in x.suffixes]
     if not all_csv:
         subject_path = Path(session_path).parent
         all_csv = [x for x in subject_path.iterdir() if ".csv" in x.suffixes]
 
-    timestamps = []
-    isig = []
-    for file_path in all_csv:
-        sub_timestamps, sub_isig = read_glucose_csv(file_path=file_path)
-        timestamps.extend(sub_timestamps)
-        isig.extend(sub_isig)
+    csv_keys = []
+    for file_path in sorted(all_csv):
+        file_stat = os.stat(file_path)
+        csv_keys.append((str(file_path.absolute()), file_stat.st_mtime_ns, file_stat.st_size))
+    return _load_glucose_series(tuple(csv_keys))
+
+
+@lru_cache(maxsize=None)
+def _load_glucose_series(csv_keys: Tuple[Tuple[str, int, int], ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse and merge the glucose files; the file modification times and sizes are only part of the cache key."""
+    all_series = [read_glucose_csv(file_path=file_path) for file_path, _, _ in csv_keys]
+    timestamps = np.concatenate([np.empty(0, dtype="datetime64[ns]")] + [series[0] for series in all_series])
+    isig = np.concatenate([np.empty(0)] + [series[1] for series in all_series])
+
+    # Exports of overlapping recording periods repeat the same samples
+    timestamps, unique_indices = np.unique(timestamps, return_index=True)
+    isig = isig[unique_indices]
+    timestamps.setflags(write=False)
+    isig.setflags(write=False)
     return timestamps, isig
 
 
-def read_glucose_csv(file_path: Path) -> (List[datetime], List[float]):
-    """Parse a single glucose data file."""
-    all_data = read_csv(filepath_or_buffer=file_path, skiprows=11)
+def read_glucose_csv(
+    file_path: Path, timestamp_format: Optional[str] = GLUCOSE_TIMESTAMP_FORMAT
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse a single glucose data file.
+
+    Parameters
+    ----------
+    file_path: Path
+    timestamp_format: str, optional
+        strftime format of the 'Timestamp' column. If the column does not match it, or if None, the format is
+        inferred by pandas instead. Default is '%m/%d/%y %H:%M:%S'.
+
+    Returns
+    -------
+    timestamps: np.ndarray(dtype='datetime64[ns]')
+    isig: np.ndarray(dtype='float64')
+    """
+    all_data = read_csv(filepath_or_buffer=file_path, skiprows=11, usecols=["Timestamp", "ISIG Value", "Excluded"])
 
-    isig = all_data["ISIG Value"]
-    exclude_col = all_data["Excluded"]
-    exclude_col.fillna(False, inplace=True)
-    exclude = (exclude_col.astype(bool) + np.isnan(isig) + (isig == -9999)).astype(bool)
-    valid_isig = isig[exclude == 0]
-    valid_timestamps = [
-        x.to_pydatetime() for x in to_datetime(all_data["Timestamp"][exclude == 0], infer_datetime_format=True)
-    ]
+    isig = all_data["ISIG Value"].to_numpy(dtype="float64")
+    exclude = all_data["Excluded"].fillna(False).astype(bool).to_numpy() | np.isnan(isig) | (isig == -9999)
+    valid_timestamps = all_data["Timestamp"][~exclude]
+    try:
+        valid_timestamps = to_datetime(valid_timestamps, format=timestamp_format)
+    except ValueError:
+        valid_timestamps = to_datetime(valid_timestamps)
 
-    return valid_timestamps, list(valid_isig)
+    return valid_timestamps.to_numpy(dtype="datetime64[ns]"), isig[~exclude]
 
 
 def get_session_datetime(session_id: str):
@@ -1,11 +1,92 @@
 """Authors: Cody Baker."""
+import os
+from typing import Optional
+
+import numpy as np
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
-from nwb_conversion_tools.tools.hdmf import SliceableDataChunkIterator
 from nwb_conversion_tools.utils import FilePathType
 from pynwb import TimeSeries, H5DataIO
-from spikeextractors.extraction_tools import read_binary
 from pyintan.intan import read_rhd
 
+from ..utils.parallel_compression import parallel_gzip_data_io
+from ..utils.neuroscope import ElectricalSeriesChunkIterator
+
+
+class AuxiliaryBinaryData:
+    """Lazy (frames, channels) view of the decimated accelerometer channels of an interleaved 'auxiliary.dat' file.
+
+    Slices of consecutive frames are served by reading the span of whole interleaved frames they cover as a single
+    contiguous block, which is then de-interleaved and decimated in memory. This keeps disk access sequential, unlike
+    a strided np.memmap view that touches every page of the file for a fraction of the samples.
+    """
+
+    def __init__(
+        self,
+        file_path: FilePathType,
+        n_channels: int,
+        channels=slice(0, 3),
+        decimation: int = 4,
+        max_frames: Optional[int] = None,
+        dtype: str = "uint16",
+    ):
+        """
+        Parameters
+        ----------
+        file_path: FilePathType
+            Path to the 'auxiliary.dat' file.
+        n_channels: int
+            Total number of interleaved AUX channels stored in the file, as listed in the .rhd header.
+        channels: array-like(dtype=int) or slice, optional
+            Channels exposed by this view. Defaults to the first 3, the only ones holding accelerometer data.
+        decimation: int, optional
+            Keep every n-th frame of the file. Default is 4, undoing the duplication of 5 kHz data to 20 kHz.
+        max_frames: int, optional
+            Truncate the view to at most this many decimated frames.
+        dtype: str, optional
+            Sample data type. Default is 'uint16'.
+        """
+        self.file_path = str(file_path)
+        self.n_channels = n_channels
+        self.decimation = decimation
+        itemsize = np.dtype(dtype).itemsize
+        n_raw_frames = os.path.getsize(self.file_path) // (itemsize * n_channels)
+        self.memmap = np.memmap(self.file_path, dtype=dtype, mode="r", shape=(n_raw_frames, n_channels))
+        n_frames = -(-n_raw_frames // decimation)
+        self.n_frames = n_frames if max_frames is None else min(n_frames, max_frames)
+        self.channels = np.arange(n_channels)[channels]
+
+    @property
+    def shape(self):
+        return (self.n_frames, len(self.channels))
+
+    @property
+    def dtype(self):
+        return self.memmap.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return self.n_frames
+
+    def __getitem__(self, item):
+        if not isinstance(item, tuple):
+            item = (item, slice(None))
+        frames, channels = item
+        channels = self.channels[channels]
+        if isinstance(frames, slice) and frames.step in (None, 1):
+            start, stop, _ = frames.indices(self.n_frames)
+            stop = max(start, stop)
+            block = np.asarray(self.memmap[start * self.decimation : stop * self.decimation])
+            return block[:: self.decimation, channels]
+        frames = np.arange(self.n_frames)[frames] * self.decimation
+        return np.asarray(self.memmap[frames][..., channels])
+
+    def __array__(self, dtype=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype)
+
 
 class TingleyMetabolicAccelerometerInterface(BaseDataInterface):
     """Aux data interface for the Tingley metabolic project."""
@@ -24,6 +105,7 @@ class TingleyMetabolicAccelerometerInterface(BaseDataInterface):
               20kHz by duplicating the data value at every 4th index. I can only assume this was done for easier
               side-by-side analysis of the raw data (which was acquired at 20kHz).
         """
+        self.dat_file_path = dat_file_path
         try:
             rhd_info = read_rhd(filename=rhd_file_path)
             self.readable = True
@@ -43,23 +125,65 @@ class TingleyMetabolicAccelerometerInterface(BaseDataInterface):
             # Manually confirmed that all aux channels have same properties
             self.conversion = first_aux_entry["gain"]  # offset confirmed to be 0, units confirmed to be Volts
             self.sampling_frequency = first_aux_entry["sampling_rate"]
-            dtype = first_aux_sub_entry[1]
-            numchan = sum("AUX" in header_info_entry["native_channel_name"] for header_info_entry in rhd_info[1])
-
-            # Manually confirmed result is still memmap after slicing
-            self.memmap = read_binary(file=dat_file_path, numchan=numchan, dtype=dtype)[:3, ::4]
+            self.dtype = first_aux_sub_entry[1]
+            self.numchan = sum("AUX" in header_info_entry["native_channel_name"] for header_info_entry in rhd_info[1])
 
-    def run_conversion(self, nwbfile, metadata, stub_test: bool = False, ecephys_start_time: float = 0.0):
+    def run_conversion(
+        self,
+        nwbfile,
+        metadata,
+        stub_test: bool = False,
+        ecephys_start_time: float = 0.0,
+        n_jobs: int = 1,
+        buffer_gb: float = 1.0,
+    ):
+        """
+        Parameters
+        ----------
+        nwbfile: NWBFile
+        metadata: dict
+        stub_test: bool, optional
+            Only write the first 200 frames.
+        ecephys_start_time: float, optional
+        n_jobs: int, optional
+            Number of threads used to gzip the data. Default is 1.
+        buffer_gb: float, optional
+            Maximum size of each contiguous block read from the 'auxiliary.dat' file. Default is 1 GB.
+        """
         if self.readable:
-            stub_frames = 200 if stub_test else None
+            accelerometer_data = AuxiliaryBinaryData(
+                file_path=self.dat_file_path,
+                n_channels=self.numchan,
+                max_frames=200 if stub_test else None,
+                dtype=self.dtype,
+            )
+            # The iterator budgets its blocks by the decimated frames it yields, not the raw frames read for them
+            samples_read_per_frame = accelerometer_data.decimation * accelerometer_data.n_channels
+            data_chunk_iterator = ElectricalSeriesChunkIterator(
+                data=accelerometer_data,
+                buffer_gb=buffer_gb * accelerometer_data.shape[1] / samples_read_per_frame,
+                display_progress=not stub_test,
+                progress_bar_options=dict(desc="writing accelerometer data"),
+            )
+            chunk_advice = data_chunk_iterator.chunk_advice
+            if n_jobs == 1:
+                data = H5DataIO(
+                    data_chunk_iterator,
+                    compression=chunk_advice.compression,
+                    compression_opts=chunk_advice.compression_opts,
+                )
+            else:
+                data = parallel_gzip_data_io(
+                    data_chunk_iterator=data_chunk_iterator,
+                    n_jobs=n_jobs,
+                    compression_opts=chunk_advice.compression_opts,
+                )
             nwbfile.add_acquisition(
                 TimeSeries(
                     name="Accelerometer",
                     description="Raw data from accelerometer sensors.",
                     unit="Volts",
-                    data=H5DataIO(
-                        SliceableDataChunkIterator(data=self.memmap.T[:stub_frames, :]), compression="gzip"
-                    ),  # should not need iterative write
+                    data=data,
                     conversion=self.conversion,
                     rate=self.sampling_frequency,
                     starting_time=ecephys_start_time,
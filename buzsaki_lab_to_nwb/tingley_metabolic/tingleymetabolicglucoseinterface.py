@@ -1,6 +1,5 @@
 """Authors: Cody Baker."""
-from datetime import datetime
-
+import numpy as np
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from nwb_conversion_tools.utils import FilePathType
 from pynwb import TimeSeries, H5DataIO
@@ -13,11 +12,8 @@ class TingleyMetabolicGlucoseInterface(BaseDataInterface):
 
     def __init__(self, session_path: FilePathType, ecephys_start_time: str, ecephys_stop_time: str):
         glucose_timestamps, glucose_isig = load_subject_glucose_series(session_path=session_path)
-        self.session_start_time = glucose_timestamps[0]
-        glucose_timestamps_floats_from_datetime = [
-            (glucose_timestamp - self.session_start_time).total_seconds() for glucose_timestamp in glucose_timestamps
-        ]
-        self.glucose_timestamps = glucose_timestamps_floats_from_datetime
+        self.session_start_time = glucose_timestamps[0].astype("datetime64[us]").item()
+        self.glucose_timestamps = (glucose_timestamps - glucose_timestamps[0]) / np.timedelta64(1, "s")
         self.glucose_isig = glucose_isig
 
     def run_conversion(self, nwbfile, metadata):
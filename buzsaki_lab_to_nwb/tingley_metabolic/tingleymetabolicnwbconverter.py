@@ -13,6 +13,7 @@ from .tingleymetabolicaccelerometerinterface import TingleyMetabolicAcceleromete
 from .tingleymetabolicglucoseinterface import TingleyMetabolicGlucoseInterface
 from .tingleymetabolicripplesinterface import TingleyMetabolicRipplesInterface
 from ..common_interfaces.sleepstatesinterface import SleepStatesInterface
+from ..utils.incremental_conversion import IncrementalNWBConverterMixin
 
 
 DEVICE_INFO = dict(
@@ -33,7 +34,7 @@ DEVICE_INFO = dict(
 )
 
 
-class TingleyMetabolicConverter(NWBConverter):
+class TingleyMetabolicConverter(IncrementalNWBConverterMixin, NWBConverter):
     """Primary conversion class for the Tingley Metabolic data project."""
 
     data_interface_classes = dict(
@@ -44,6 +45,8 @@ class TingleyMetabolicConverter(NWBConverter):
         SleepStates=SleepStatesInterface,
         Ripples=TingleyMetabolicRipplesInterface,
     )
+    # Glucose reads every .csv in the session folder; the other interfaces are given their files directly
+    interface_source_patterns = dict(Glucose=["*.csv"])
 
     def get_metadata(self):
         lfp_file_path = Path(self.data_interface_objects["NeuroscopeLFP"].source_data["file_path"])
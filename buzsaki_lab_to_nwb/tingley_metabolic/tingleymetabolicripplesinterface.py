@@ -1,10 +1,12 @@
 """Authors: Heberto Mayorquin and Cody Baker."""
-from scipy.io import loadmat
-from pynwb import NWBFile, H5DataIO
-from pynwb.file import TimeIntervals
+import numpy as np
+from pynwb import NWBFile
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from nwb_conversion_tools.tools.nwb_helpers import get_module
 
+from ..utils.mat_loader import read_mat_file
+from ..utils.time_intervals import build_time_intervals
+
 
 class TingleyMetabolicRipplesInterface(BaseDataInterface):
     """Data interface for handling ripples.mat files for the Tingley metabolic project."""
@@ -23,64 +25,51 @@ class TingleyMetabolicRipplesInterface(BaseDataInterface):
 
             for mat_file_path in self.source_data["mat_file_paths"]:
                 table_name = mat_file_path.suffixes[-3].lstrip(".").title()
-                try:
-                    mat_file = loadmat(file_name=mat_file_path)
-                    mat_file_is_scipy_readable = True
-                except NotImplementedError:
-                    mat_file_is_scipy_readable = False
-                    print(f"RippleInterface is unable to convert {mat_file_path} due to HDF5 version!")
-
-                if mat_file_is_scipy_readable:
-                    mat_data = mat_file["ripples"]
-                    start_and_stop_times = mat_data["timestamps"][0][0][:stub_events]
-                    durations = [x[0] for x in mat_data["data"][0][0]["duration"][0][0]][:stub_events]
-                    peaks = [x[0] for x in mat_data["peaks"][0][0]][:stub_events]
-                    peak_normed_powers = [x[0] for x in mat_data["peakNormedPower"][0][0]][:stub_events]
-                    peak_frequencies = [x[0] for x in mat_data["data"][0][0]["peakFrequency"][0][0]][:stub_events]
-                    peak_amplitudes = [x[0] for x in mat_data["data"][0][0]["peakAmplitude"][0][0]][:stub_events]
-                    ripples = mat_data["maps"][0][0]["ripples"][0][0][:stub_events]
-                    frequencies = mat_data["maps"][0][0]["frequency"][0][0][:stub_events]
-                    phases = mat_data["maps"][0][0]["phase"][0][0][:stub_events]
-                    amplitudes = mat_data["maps"][0][0]["amplitude"][0][0][:stub_events]
+                mat_data = read_mat_file(file_path=mat_file_path, variable_names=["ripples"])["ripples"]
+                start_and_stop_times = np.reshape(mat_data["timestamps"], (-1, 2))[:stub_events]
+                durations = np.atleast_1d(mat_data["data"]["duration"])[:stub_events]
+                peaks = np.atleast_1d(mat_data["peaks"])[:stub_events]
+                peak_normed_powers = np.atleast_1d(mat_data["peakNormedPower"])[:stub_events]
+                peak_frequencies = np.atleast_1d(mat_data["data"]["peakFrequency"])[:stub_events]
+                peak_amplitudes = np.atleast_1d(mat_data["data"]["peakAmplitude"])[:stub_events]
+                ripples = np.atleast_2d(mat_data["maps"]["ripples"])[:stub_events]
+                frequencies = np.atleast_2d(mat_data["maps"]["frequency"])[:stub_events]
+                phases = np.atleast_2d(mat_data["maps"]["phase"])[:stub_events]
+                amplitudes = np.atleast_2d(mat_data["maps"]["amplitude"])[:stub_events]
 
-                    descriptions = dict(
-                        duration="Duration of the ripple event.",
-                        peak="Peak of the ripple.",
-                        peak_normed_power="Normed power of the peak.",
-                        peak_frequency="Peak frequency of the ripple.",
-                        peak_amplitude="Peak amplitude of the ripple.",
-                    )
-                    indexed_descriptions = dict(
-                        ripple="Extracted ripple data.",
-                        frequency="Frequency of each point on the ripple.",
-                        phase="Phase of each point on the ripple.",
-                        amplitude="Amplitude of each point on the ripple.",
-                    )
+                descriptions = dict(
+                    duration="Duration of the ripple event.",
+                    peak="Peak of the ripple.",
+                    peak_normed_power="Normed power of the peak.",
+                    peak_frequency="Peak frequency of the ripple.",
+                    peak_amplitude="Peak amplitude of the ripple.",
+                )
+                indexed_descriptions = dict(
+                    ripple="Extracted ripple data.",
+                    frequency="Frequency of each point on the ripple.",
+                    phase="Phase of each point on the ripple.",
+                    amplitude="Amplitude of each point on the ripple.",
+                )
 
-                    table = TimeIntervals(
-                        name=table_name, description=f"Identified {table_name} events and their metrics."
-                    )
-                    for start_time, stop_time in start_and_stop_times:
-                        table.add_row(
-                            start_time=ecephys_start_time + start_time, stop_time=ecephys_start_time + stop_time
-                        )
-                    for column_name, column_data in zip(
-                        list(descriptions), [durations, peaks, peak_normed_powers, peak_frequencies, peak_amplitudes]
-                    ):
-                        table.add_column(
-                            name=column_name,
-                            description=descriptions[column_name],
-                            data=H5DataIO(column_data, compression="gzip"),
+                table = build_time_intervals(
+                    name=table_name,
+                    description=f"Identified {table_name} events and their metrics.",
+                    start_times=ecephys_start_time + start_and_stop_times[:, 0],
+                    stop_times=ecephys_start_time + start_and_stop_times[:, 1],
+                    columns=[
+                        dict(name=column_name, description=descriptions[column_name], data=column_data)
+                        for column_name, column_data in zip(
+                            list(descriptions),
+                            [durations, peaks, peak_normed_powers, peak_frequencies, peak_amplitudes],
                         )
-                    for column_name, column_data in zip(
-                        list(indexed_descriptions), [ripples, frequencies, phases, amplitudes]
-                    ):
-                        table.add_column(
-                            name=column_name,
-                            description=indexed_descriptions[column_name],
-                            index=list(range(column_data.shape[0])),
-                            data=H5DataIO(column_data, compression="gzip"),
+                    ],
+                    ragged_columns=[
+                        dict(name=column_name, description=indexed_descriptions[column_name], data=column_data)
+                        for column_name, column_data in zip(
+                            list(indexed_descriptions), [ripples, frequencies, phases, amplitudes]
                         )
-                    processing_module.add(table)
+                    ],
+                )
+                processing_module.add(table)
         except Exception as ex:
             print("Unable to convert Ripples!")
@@ -1,17 +1,7 @@
 """Authors: Heberto Mayorquin and Cody Baker."""
-from mat73 import loadmat as loadmat_mat73
-from mat4py import loadmat as loadmat_mat4py
-from scipy.io import loadmat as loadmat_scipy
+from ..utils.mat_loader import read_mat_file
 
 
 def read_matlab_file(file_path):
-    file_path = str(file_path)
-
-    try:
-        mat_file = loadmat_mat4py(str(file_path))
-    except:
-        try:
-            mat_file = loadmat_mat73(file_path)
-        except:
-            mat_file = loadmat_scipy(file_path)
-    return mat_file
+    """Read a .mat file of any version with the reader matching its header; see read_mat_file for the output."""
+    return read_mat_file(file_path=file_path)
@@ -5,13 +5,14 @@ import warnings
 import numpy as np
 from hdmf.backends.hdf5.h5_utils import H5DataIO
 
-from pynwb.file import NWBFile, TimeIntervals
+from pynwb.file import NWBFile
 from pynwb.behavior import SpatialSeries, Position, CompassDirection
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from nwb_conversion_tools.utils.conversion_tools import get_module
 from nwb_conversion_tools.utils.json_schema import FolderPathType
 from spikeextractors import NeuroscopeRecordingExtractor
 
+from ..utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
 from .tingleyseptal_utils import read_matlab_file
 
 
@@ -31,7 +32,7 @@ class TingleySeptalBehaviorInterface(BaseDataInterface):
 
         # Add trials
         events = behavior_mat["events"]
-        trial_interval_list = events["trialIntervals"]
+        trial_interval_list = np.reshape(events["trialIntervals"], (-1, 2))
 
         data = []
         for start_time, stop_time in trial_interval_list:
@@ -44,6 +45,7 @@ class TingleySeptalBehaviorInterface(BaseDataInterface):
         [nwbfile.add_trial(**row) for row in sorted(data, key=lambda x: x["start_time"])]
 
         trial_list = events["trials"]
+        trial_list = [trial_list] if isinstance(trial_list, dict) else trial_list
         direction_list = [trial.get("direction", "") for trial in trial_list]
         trial_type_list = [trial.get("type", "") for trial in trial_list]
 
@@ -58,11 +60,11 @@ class TingleySeptalBehaviorInterface(BaseDataInterface):
         module_description = "Contains behavioral data concerning position."
         processing_module = get_module(nwbfile=nwbfile, name=module_name, description=module_description)
 
-        timestamps = np.array(behavior_mat["timestamps"])[..., 0]
+        timestamps = np.asarray(behavior_mat["timestamps"])
 
         position = behavior_mat["position"]
         pos_data = [[x, y, z] for (x, y, z) in zip(position["x"], position["y"], position["y"])]
-        pos_data = np.array(pos_data)[..., 0]
+        pos_data = np.array(pos_data)
 
         unit = behavior_mat.get("units", "")
 
@@ -92,8 +94,8 @@ class TingleySeptalBehaviorInterface(BaseDataInterface):
 
         # Add error if available
         errorPerMarker = behavior_mat.get("errorPerMarker", None)
-        if errorPerMarker:
-            error_data = np.array([error for error in errorPerMarker])[..., 0]
+        if errorPerMarker is not None:
+            error_data = np.asarray(errorPerMarker)
 
             spatial_series_object = SpatialSeries(
                 name="error_per_marker",
@@ -115,7 +117,7 @@ class TingleySeptalBehaviorInterface(BaseDataInterface):
                 [x, y, z, w]
                 for (x, y, z, w) in zip(orientation["x"], orientation["y"], orientation["z"], orientation["w"])
             ]
-            orientation_data = np.array(orientation_data)[..., 0]
+            orientation_data = np.array(orientation_data)
 
             compass_obj = CompassDirection(name=f"allocentric_frame_tracking")
 
@@ -142,27 +144,11 @@ class TingleySeptalBehaviorInterface(BaseDataInterface):
         # Sleep states
         sleep_file_path = session_path / f"{session_id}.SleepState.states.mat"
         if Path(sleep_file_path).exists():
-            mat_file = read_matlab_file(sleep_file_path)
-
-            state_label_names = dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM", MAstate="MA")
-            sleep_state_dic = mat_file["SleepState"]["ints"]
-            table = TimeIntervals(name="sleep_states", description="Sleep state of the animal.")
-            table.add_column(name="label", description="Sleep state.")
-
-            data = []
-            for sleep_state in state_label_names:
-                values = sleep_state_dic[sleep_state]
-                if len(values) != 0 and isinstance(values[0], int):
-                    values = [values]
-                for start_time, stop_time in values:
-                    data.append(
-                        dict(
-                            start_time=float(start_time),
-                            stop_time=float(stop_time),
-                            label=state_label_names[sleep_state],
-                        )
-                    )
-            [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
+            table = build_sleep_states_table(
+                state_intervals=read_sleep_state_intervals(file_path=sleep_file_path),
+                name="sleep_states",
+                state_label_names=dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM", MAstate="MA"),
+            )
             processing_module.add(table)
 
         # Add epochs
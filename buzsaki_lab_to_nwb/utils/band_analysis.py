@@ -1,5 +1,15 @@
-from scipy.signal import hilbert, butter, filtfilt
+import os
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+
+from scipy.signal import hilbert, butter, cheby1, cheby2, ellip, sosfilt, sosfilt_zi, sosfiltfilt
+from scipy.fft import next_fast_len
 import numpy as np
+from hdmf.backends.hdf5.h5_utils import H5DataIO
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
+from pynwb.misc import DecompositionSeries
+
+from .chunking import TIME_SLICE, get_chunk_advice
 
 
 def parse_passband(passband):
@@ -16,7 +26,9 @@ def parse_passband(passband):
             'ripples':  (100, 250)
 
     """
-    if passband == "delta":
+    if not isinstance(passband, str):
+        passband = np.asarray(passband)
+    elif passband == "delta":
         passband = np.array([0, 4])
     elif passband == "theta":
         passband = np.array([4, 10])
@@ -30,9 +42,46 @@ def parse_passband(passband):
     return passband
 
 
+def design_sos(passband="theta", sampling_rate=1250.0, order=4, filter="butter", ripple=20):
+    """Design a bandpass filter as second-order sections.
+
+    Parameters
+    ----------
+    passband: np.array | str
+        (low, high) of bandpass filter or the name of a canonical band, see parse_passband.
+    sampling_rate: float, optional
+        sampling rate of LFP (default=1250.0)
+    order: int
+        order of the filter (default=4)
+    filter: str
+        choose filter: {'butter'}, 'cheby1', 'cheby2', 'ellip'
+    ripple: float | (float, float)
+        in dB; the maximum passband ripple for cheby1, the minimum stopband attenuation for cheby2, and either
+        (passband ripple, stopband attenuation) or the stopband attenuation alone, with a 1 dB passband ripple, for
+        ellip (default=20)
+
+    Returns
+    -------
+    sos: np.ndarray
+        (n_sections, 6)
+
+    """
+    Wn = parse_passband(passband) / (sampling_rate / 2)
+    if filter == "butter":
+        return butter(order, Wn, "bandpass", output="sos")
+    elif filter == "cheby1":
+        return cheby1(order, ripple, Wn, "bandpass", output="sos")
+    elif filter == "cheby2":
+        return cheby2(order, ripple, Wn, "bandpass", output="sos")
+    elif filter == "ellip":
+        rp, rs = ripple if np.ndim(ripple) else (1, ripple)
+        return ellip(order, rp, rs, Wn, "bandpass", output="sos")
+    else:
+        raise NotImplementedError(f"filter type '{filter}' not implemented")
+
+
 def filter_lfp(lfp, sampling_rate=1250.0, passband="theta", order=4, filter="butter", ripple=20):
-    """Apply a passband filter a signal. Butter is implemented but other
-    filters are not.
+    """Apply a zero-phase passband filter to a signal.
 
     Parameters
     ----------
@@ -51,9 +100,9 @@ def filter_lfp(lfp, sampling_rate=1250.0, passband="theta", order=4, filter="but
     order: int
         number of cycles (default=4)
     filter: str
-        choose filter: {'butter'},'cheby2', 'fir1'
+        choose filter: {'butter'}, 'cheby1', 'cheby2', 'ellip'
     ripple: double
-        attenuation factor used for cheby2 filter
+        ripple or attenuation in dB used for the Chebyshev and elliptic filters, see design_sos
 
     Returns
     -------
@@ -61,15 +110,87 @@ def filter_lfp(lfp, sampling_rate=1250.0, passband="theta", order=4, filter="but
         (ntt,)
 
     """
+    sos = design_sos(passband=passband, sampling_rate=sampling_rate, order=order, filter=filter, ripple=ripple)
+    return sosfiltfilt(sos, lfp, axis=0)
 
-    passband = parse_passband(passband)
 
-    if filter == "butter":
-        b, a = butter(order, passband / (sampling_rate / 2), "bandpass")
-        filt = filtfilt(b, a, lfp)
-        return filt
-    else:
-        NotImplementedError("filter type not implemented")
+def stream_filter_lfp(
+    blocks,
+    sampling_rate=1250.0,
+    passband="theta",
+    order=4,
+    filter="butter",
+    ripple=20,
+    zero_phase=True,
+    pad_duration=20.0,
+):
+    """Filter a signal delivered as consecutive blocks, yielding one filtered block per input block.
+
+    In causal mode the filter state is carried from block to block, so the output equals a single sosfilt pass over
+    the whole signal. In zero-phase mode each block is filtered forward and backward together with pad_duration of
+    the preceding and following signal, and the padding is discarded (overlap-save); each block is therefore yielded
+    once enough of the next blocks has arrived, and the output matches filter_lfp on the whole signal to within the
+    decay of the filter over the padding. Memory stays bounded by a few blocks either way.
+
+    Parameters
+    ----------
+    blocks: iterable of np.array
+        (frames, ...) consecutive blocks of the signal, e.g. slices of an np.memmap. Filtering is along axis 0.
+    sampling_rate: float, optional
+        sampling rate of LFP (default=1250.0)
+    passband: np.array | str
+        (low, high) of bandpass filter or the name of a canonical band, see parse_passband.
+    order: int
+        order of the filter (default=4)
+    filter: str
+        choose filter: {'butter'}, 'cheby1', 'cheby2', 'ellip'
+    ripple: double
+        ripple or attenuation in dB used for the Chebyshev and elliptic filters, see design_sos
+    zero_phase: bool, optional
+        Filter forward and backward (default) or only forward.
+    pad_duration: float, optional
+        Signal before and after each block used in zero-phase mode, in seconds (default=20.0).
+
+    Yields
+    ------
+    filt: np.array
+        Filtered block with the same shape as the input block.
+    """
+    sos = design_sos(passband=passband, sampling_rate=sampling_rate, order=order, filter=filter, ripple=ripple)
+
+    if not zero_phase:
+        zi = None
+        for block in blocks:
+            block = np.asarray(block, dtype="float64")
+            if zi is None:  # Start from the steady-state response to the first sample
+                zi = sosfilt_zi(sos).reshape(sos.shape[0], 2, *(1,) * (block.ndim - 1)) * block[0]
+            filt, zi = sosfilt(sos, block, axis=0, zi=zi)
+            yield filt
+        return
+
+    pad_frames = int(pad_duration * sampling_rate)
+    window = None  # history (at most pad_frames) + pending blocks + lookahead
+    n_history = 0
+    pending = deque()  # lengths of the blocks not yet yielded
+
+    def flush(final):
+        nonlocal window, n_history
+        while pending and (final or len(window) - n_history - pending[0] >= pad_frames):
+            block_stop = n_history + pending[0]
+            filt = sosfiltfilt(sos, window[: block_stop + pad_frames], axis=0)
+            yield filt[n_history:block_stop]
+            pending.popleft()
+            n_drop = max(block_stop - pad_frames, 0)
+            window = window[n_drop:]
+            n_history = block_stop - n_drop
+
+    for block in blocks:
+        block = np.asarray(block, dtype="float64")
+        window = block if window is None else np.concatenate((window, block))
+        pending.append(len(block))
+        yield from flush(final=False)
+    if pending:
+        yield from flush(final=True)
 
 
 def next_power_of_2(x):
@@ -99,3 +220,283 @@ def hilbert_lfp(filt):
     phase = np.mod(np.angle(hilb), 2 * np.pi)
 
     return phase, amp
+
+
+def _decompose_segment(segment, sos_filters, trim_start, trim_stop, metric):
+    """Filter and Hilbert transform one padded segment for every band, trimming the padding afterwards."""
+    nfft = next_fast_len(len(segment))
+    # Taper the padding smoothly to zero so the segment edges do not leak into the kept frames through the Hilbert kernel
+    taper = np.ones(len(segment))
+    taper[:trim_start] = np.sin(np.linspace(0, np.pi / 2, trim_start, endpoint=False)) ** 2
+    n_tail = len(segment) - trim_stop
+    taper[trim_stop:] = np.cos(np.linspace(0, np.pi / 2, n_tail + 1)[1:]) ** 2
+    result = np.empty((trim_stop - trim_start, len(sos_filters)))
+    for band_index, sos in enumerate(sos_filters):
+        hilb = hilbert(sosfiltfilt(sos, segment) * taper, nfft)[trim_start:trim_stop]
+        if metric == "phase":
+            result[:, band_index] = np.mod(np.angle(hilb), 2 * np.pi)
+        else:
+            result[:, band_index] = np.abs(hilb)
+    return result
+
+
+def iter_band_decomposition(
+    lfp,
+    sampling_rate=1250.0,
+    passbands=("theta", "gamma"),
+    order=4,
+    metric="phase",
+    segment_duration=600.0,
+    pad_duration=20.0,
+    n_jobs=1,
+):
+    """Iterate over the band decomposition of a single-channel signal, one segment at a time.
+
+    The signal is split into segments that overlap their neighbours by pad_duration on each side. Each padded
+    segment is band-passed with a zero-phase second-order-sections Butterworth filter and Hilbert transformed for
+    every passband, and the padding is trimmed, so the stitched output matches the whole-trace result away from the
+    very start and end of the recording while only holding a few segments in memory at a time.
+
+    Parameters
+    ----------
+    lfp: np.array
+        (ntt,) single channel, read only once for all passbands.
+    sampling_rate: float, optional
+        sampling rate of LFP (default=1250.0)
+    passbands: iterable of np.array | str
+        (low, high) of each bandpass filter or the name of a canonical band, see parse_passband.
+    order: int
+        order of the Butterworth filter (default=4)
+    metric: str
+        'phase' (default) or 'amplitude'.
+    segment_duration: float, optional
+        Length of each segment in seconds, excluding padding (default=600.0).
+    pad_duration: float, optional
+        Overlap on each side of a segment in seconds (default=20.0). Should span many cycles of the lowest band.
+    n_jobs: int, optional
+        Number of worker processes. The default of 1 decomposes in the calling process, -1 uses all cores.
+
+    Yields
+    ------
+    frames: slice
+        Frames of lfp covered by this segment.
+    decomposition: np.ndarray
+        (len(frames), len(passbands))
+    """
+    if metric not in ("phase", "amplitude"):
+        raise ValueError(f"metric must be 'phase' or 'amplitude', not '{metric}'!")
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    sos_filters = [design_sos(passband=passband, sampling_rate=sampling_rate, order=order) for passband in passbands]
+    n_frames = len(lfp)
+    segment_frames = max(int(segment_duration * sampling_rate), 1)
+    pad_frames = int(pad_duration * sampling_rate)
+
+    def segments():
+        for start in range(0, n_frames, segment_frames):
+            stop = min(start + segment_frames, n_frames)
+            padded_start = max(start - pad_frames, 0)
+            padded_stop = min(stop + pad_frames, n_frames)
+            segment = np.asarray(lfp[padded_start:padded_stop], dtype="float64")
+            yield slice(start, stop), (segment, sos_filters, start - padded_start, stop - padded_start, metric)
+
+    if n_jobs == 1:
+        for frames, args in segments():
+            yield frames, _decompose_segment(*args)
+        return
+
+    # Keep a bounded number of segments in flight so memory does not scale with the recording length
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = deque()
+        for frames, args in segments():
+            pending.append((frames, executor.submit(_decompose_segment, *args)))
+            if len(pending) >= 2 * n_jobs:
+                frames, future = pending.popleft()
+                yield frames, future.result()
+        while pending:
+            frames, future = pending.popleft()
+            yield frames, future.result()
+
+
+def decompose_lfp(lfp, sampling_rate=1250.0, passbands=("theta", "gamma"), order=4, metric="phase", **kwargs):
+    """Calculate the phase or amplitude of a single-channel signal in several passbands from one read.
+
+    Parameters
+    ----------
+    lfp: np.array
+        (ntt,)
+    sampling_rate: float, optional
+        sampling rate of LFP (default=1250.0)
+    passbands: iterable of np.array | str
+        (low, high) of each bandpass filter or the name of a canonical band, see parse_passband.
+    order: int
+        order of the Butterworth filter (default=4)
+    metric: str
+        'phase' (default) or 'amplitude'.
+    **kwargs
+        segment_duration, pad_duration and n_jobs, passed to iter_band_decomposition.
+
+    Returns
+    -------
+    decomposition: np.ndarray
+        (ntt, len(passbands))
+
+    """
+    decomposition = np.empty((len(lfp), len(passbands)))
+    for frames, segment_decomposition in iter_band_decomposition(
+        lfp, sampling_rate=sampling_rate, passbands=passbands, order=order, metric=metric, **kwargs
+    ):
+        decomposition[frames] = segment_decomposition
+    return decomposition
+
+
+class BandDecompositionChunkIterator(AbstractDataChunkIterator):
+    """Stream the (ntt, 1, n_bands) band decomposition of a single-channel signal one segment at a time.
+
+    Phase can be stored as float64, float32 or int16. For int16 the full circle is quantized to 2**16 steps and the
+    conversion and offset properties map the stored integers back to radians in [0, 2 * pi).
+    """
+
+    def __init__(
+        self,
+        lfp,
+        sampling_rate=1250.0,
+        passbands=("theta", "gamma"),
+        order=4,
+        metric="phase",
+        dtype="float64",
+        chunk_mb=None,
+        **kwargs,
+    ):
+        """
+        Parameters
+        ----------
+        lfp: np.array
+            (ntt,)
+        sampling_rate: float, optional
+            sampling rate of LFP (default=1250.0)
+        passbands: iterable of np.array | str
+            (low, high) of each bandpass filter or the name of a canonical band, see parse_passband.
+        order: int
+            order of the Butterworth filter (default=4)
+        metric: str
+            'phase' (default) or 'amplitude'.
+        dtype: str
+            'float64' (default), 'float32' or, for phase only, 'int16'.
+        chunk_mb: float, optional
+            Target size of each HDF5 chunk in MiB. Defaults to that of the 'time_slice' chunk advice.
+        **kwargs
+            segment_duration, pad_duration and n_jobs, passed to iter_band_decomposition.
+        """
+        self._dtype = np.dtype(dtype)
+        if self._dtype not in (np.dtype("float64"), np.dtype("float32"), np.dtype("int16")):
+            raise ValueError(f"dtype must be 'float64', 'float32' or 'int16', not '{dtype}'!")
+        if self._dtype == np.dtype("int16") and metric != "phase":
+            raise ValueError("int16 quantization is only supported for the phase metric!")
+        n_frames = len(lfp)
+        n_bands = len(passbands)
+        self._maxshape = (n_frames, 1, n_bands)
+        self.chunk_advice = get_chunk_advice(
+            shape=self._maxshape, dtype=self._dtype, access=TIME_SLICE, chunk_mb=chunk_mb
+        )
+        self.chunk_shape = self.chunk_advice.chunk_shape
+        self._segments = iter_band_decomposition(
+            lfp, sampling_rate=sampling_rate, passbands=passbands, order=order, metric=metric, **kwargs
+        )
+
+    @property
+    def conversion(self):
+        return 2 * np.pi / 2**16 if self._dtype == np.dtype("int16") else 1.0
+
+    @property
+    def offset(self):
+        return np.pi if self._dtype == np.dtype("int16") else 0.0
+
+    def _quantize(self, decomposition):
+        if self._dtype != np.dtype("int16"):
+            return decomposition.astype(self._dtype)
+        # Phase is circular, so a value rounding up to 2 * pi wraps around to 0
+        steps = np.round(decomposition / self.conversion).astype("int64") % 2**16
+        return (steps - 2**15).astype("int16")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        frames, decomposition = next(self._segments)
+        selection = (frames, slice(0, 1), slice(0, self._maxshape[2]))
+        return DataChunk(data=self._quantize(decomposition)[:, np.newaxis, :], selection=selection)
+
+    def recommended_chunk_shape(self):
+        return self.chunk_shape
+
+    def recommended_data_shape(self):
+        return self.maxshape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def maxshape(self):
+        return self._maxshape
+
+
+def get_decomposition_series(
+    lfp,
+    sampling_rate,
+    name,
+    description,
+    source_timeseries,
+    passbands=("theta", "gamma"),
+    metric="phase",
+    dtype="float64",
+    **kwargs,
+):
+    """Build a DecompositionSeries whose data is streamed into the file segment by segment when written.
+
+    Parameters
+    ----------
+    lfp: np.array
+        (ntt,) reference channel.
+    sampling_rate: float
+        sampling rate of LFP
+    name: str
+    description: str
+    source_timeseries: TimeSeries
+        The LFP series the decomposition was computed from.
+    passbands: iterable of np.array | str
+        (low, high) of each bandpass filter or the name of a canonical band, see parse_passband.
+    metric: str
+        'phase' (default) or 'amplitude'.
+    dtype: str
+        'float64' (default), 'float32' or, for phase only, 'int16'.
+    **kwargs
+        order, chunk_mb, segment_duration, pad_duration and n_jobs, passed to BandDecompositionChunkIterator.
+
+    Returns
+    -------
+    DecompositionSeries
+    """
+    data_chunk_iterator = BandDecompositionChunkIterator(
+        lfp, sampling_rate=sampling_rate, passbands=passbands, metric=metric, dtype=dtype, **kwargs
+    )
+    decomp_series = DecompositionSeries(
+        name=name,
+        description=description,
+        data=H5DataIO(
+            data_chunk_iterator,
+            compression=data_chunk_iterator.chunk_advice.compression,
+            compression_opts=data_chunk_iterator.chunk_advice.compression_opts,
+        ),
+        rate=sampling_rate,
+        source_timeseries=source_timeseries,
+        metric=metric,
+        unit="radians" if metric == "phase" else "V",
+        conversion=data_chunk_iterator.conversion,
+        offset=data_chunk_iterator.offset,
+    )
+    for passband in passbands:
+        band_limits = tuple(parse_passband(passband).astype("float64"))
+        band_name = passband if isinstance(passband, str) else "{}-{} Hz".format(*band_limits)
+        decomp_series.add_band(band_name=band_name, band_limits=band_limits)
+    return decomp_series
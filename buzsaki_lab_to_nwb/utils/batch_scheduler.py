@@ -0,0 +1,298 @@
+"""Run many session conversions in a process pool, packing them under memory and I/O budgets."""
+import os
+import time
+from pathlib import Path
+from threading import Event, Thread
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Iterable, Dict
+
+from tqdm import tqdm
+
+from .conversion_manifest import STATUS_DONE, STATUS_FAILED, STATUS_RUNNING, ConversionManifest
+from .mat_loader import clear_mat_cache
+from .parallel_compression import staged_compression
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+STREAMED_SUFFIXES = (".dat", ".lfp", ".eeg", ".spk")
+LOADED_SUFFIXES = (".mat", ".res", ".clu", ".evt", ".csv", ".xml")
+
+
+@dataclass(frozen=True)
+class SessionCost:
+    """Estimated peak memory and total bytes read for converting one session, both in GB."""
+
+    memory_gb: float
+    io_gb: float
+
+
+@dataclass
+class ConversionJob:
+    """A single call of a module-level conversion function, such as session_to_nwbfile, and its estimated cost.
+
+    The fingerprint of the inputs (see get_session_fingerprint) and the output path are only used by the manifest.
+    """
+
+    name: str
+    function: Callable
+    kwargs: dict = field(default_factory=dict)
+    cost: SessionCost = SessionCost(memory_gb=0.0, io_gb=0.0)
+    fingerprint: Optional[str] = None
+    output_path: Optional[str] = None
+
+
+def estimate_session_cost(
+    session_path,
+    buffer_gb: float = 1.0,
+    overhead_gb: float = 0.5,
+    streamed_suffixes: Iterable[str] = STREAMED_SUFFIXES,
+    loaded_suffixes: Iterable[str] = LOADED_SUFFIXES,
+) -> SessionCost:
+    """Estimate the cost of converting a session from the sizes of the files in its folder.
+
+    Binary files matching streamed_suffixes (.dat, .lfp, .spk.N, ...) are written through chunk iterators, so each
+    holds at most buffer_gb in memory at a time but is read in full. Files matching loaded_suffixes (.mat, .res,
+    .clu, ...) are read into memory whole. Any other file, such as a video, is not counted.
+
+    Parameters
+    ----------
+    session_path: PathType
+    buffer_gb: float, optional
+        buffer_gb passed to the iterators of the conversion. Default is 1 GB.
+    overhead_gb: float, optional
+        Memory of a worker process before it reads any data. Default is 0.5 GB.
+    streamed_suffixes: iterable of str, optional
+        Leave out '.dat' when the raw electrical series is not written.
+    loaded_suffixes: iterable of str, optional
+
+    Returns
+    -------
+    SessionCost
+    """
+    memory_gb, io_gb = overhead_gb, 0.0
+    for file_path in Path(session_path).rglob("*"):
+        if not file_path.is_file():
+            continue
+        suffixes = [suffix.lower() for suffix in file_path.suffixes]
+        size_gb = file_path.stat().st_size / 1e9
+        if any(suffix in suffixes for suffix in streamed_suffixes):
+            memory_gb += min(size_gb, buffer_gb)
+            io_gb += size_gb
+        elif any(suffix in suffixes for suffix in loaded_suffixes):
+            memory_gb += size_gb
+            io_gb += size_gb
+    return SessionCost(memory_gb=memory_gb, io_gb=io_gb)
+
+
+def get_default_memory_budget_gb() -> float:
+    """Available memory with a 20% margin, or infinity if psutil is not installed."""
+    if psutil is None:
+        return float("inf")
+    return 0.8 * psutil.virtual_memory().available / 1e9
+
+
+class PeakMemorySampler:
+    """Context manager sampling the resident memory of this process and its children on a background thread.
+
+    Unlike ru_maxrss, which never decreases over the life of a process, the peak only covers the sampled block, so it
+    is meaningful in reused workers. Spikes shorter than the sampling interval can be missed. peak_rss_mb is None if
+    psutil is not installed.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        """
+        Parameters
+        ----------
+        interval: float, optional
+            Seconds between samples. Default is 0.5.
+        """
+        self.interval = interval
+        self.peak_rss_mb = None
+        self._process = None
+        self._stop = Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = 0
+        for process in [self._process] + self._process.children(recursive=True):
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:  # Exited since it was listed
+                continue
+        self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss / 1e6)
+
+    def _run(self):
+        self._sample()
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if psutil is not None:
+            self._process = psutil.Process()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+
+def _run_job(function: Callable, kwargs: dict, output_path=None):
+    """Run a job in a worker process and return its duration in seconds and its peak memory in MB.
+
+    The peak is that of the worker and its children while the job ran, sampled by PeakMemorySampler.
+    The .mat files cached by the job and the staging files of its parallel compression, which are kept next to the
+    output file when its folder exists, are released when it finishes.
+    """
+    scratch_folder_path = None
+    if output_path is not None and Path(output_path).parent.is_dir():
+        scratch_folder_path = Path(output_path).parent
+    start_time = time.time()
+    try:
+        with PeakMemorySampler() as peak_memory, staged_compression(scratch_folder_path=scratch_folder_path):
+            function(**kwargs)
+    finally:
+        clear_mat_cache()
+    return time.time() - start_time, peak_memory.peak_rss_mb
+
+
+def run_conversion_jobs(
+    jobs: Iterable[ConversionJob],
+    max_workers: Optional[int] = None,
+    memory_budget_gb: Optional[float] = None,
+    io_budget_gb: Optional[float] = None,
+    display_progress: bool = True,
+    progress_bar_options: Optional[dict] = None,
+    manifest_path=None,
+) -> Dict[str, Exception]:
+    """Run conversion jobs in a process pool, largest first, without exceeding the memory and I/O budgets.
+
+    Whenever a worker is free, the largest pending job whose cost still fits next to the running jobs is started, so
+    small sessions fill the gaps left by big ones. A job that does not fit on its own is run once the pool is empty.
+    A failing job is reported and does not stop the others. If a worker dies abruptly, e.g. killed for running out of
+    memory, the pool is restarted; the jobs that were running next to it are rerun one at a time, so that only the job
+    that brings down a worker on its own is reported as failed.
+
+    With a manifest, jobs already done from inputs with the same fingerprint are skipped, and the status, duration
+    and peak memory of every job that runs are recorded as it starts and finishes, so an interrupted batch can be
+    restarted at the cost of reading the manifest.
+
+    Parameters
+    ----------
+    jobs: iterable of ConversionJob
+    max_workers: int, optional
+        Maximum number of concurrent jobs. Defaults to the number of physical cores.
+    memory_budget_gb: float, optional
+        Maximum summed memory_gb of the running jobs. Defaults to 80% of the available memory.
+    io_budget_gb: float, optional
+        Maximum summed io_gb of the running jobs, limiting how many large sessions hit the disk at once.
+        Default is no limit.
+    display_progress: bool, optional
+        Show a progress bar that advances as jobs complete. Default is True.
+    progress_bar_options: dict, optional
+        Keyword arguments passed to tqdm.
+    manifest_path: PathType, optional
+        SQLite file of a ConversionManifest. Default is to keep no record.
+
+    Returns
+    -------
+    failures: dict
+        Maps the name of every failed job to its exception.
+    """
+    if max_workers is None:
+        max_workers = (psutil.cpu_count(logical=False) if psutil is not None else None) or os.cpu_count()
+    memory_budget_gb = get_default_memory_budget_gb() if memory_budget_gb is None else memory_budget_gb
+    io_budget_gb = float("inf") if io_budget_gb is None else io_budget_gb
+    manifest = None if manifest_path is None else ConversionManifest(manifest_path=manifest_path)
+    if manifest is not None:
+        jobs = [job for job in jobs if not manifest.is_done(name=job.name, fingerprint=job.fingerprint)]
+    pending = sorted(jobs, key=lambda job: (job.cost.memory_gb, job.cost.io_gb), reverse=True)
+
+    progress_bar = None
+    if display_progress:
+        progress_bar_options = progress_bar_options or dict(desc="Running conversion...")
+        progress_bar = tqdm(total=len(pending), **progress_bar_options)
+
+    failures = dict()
+    running = dict()  # future -> job
+    suspects = set()  # Names of jobs that were running when a worker died, rerun one at a time
+
+    def record_result(job: ConversionJob, exception: Optional[BaseException], result: Optional[tuple]):
+        if exception is not None:
+            failures[job.name] = exception
+            print(f"ERROR ({job.name}): {str(exception)}")
+        if manifest is not None:
+            duration, peak_rss_mb = (None, None) if exception is not None else result
+            manifest.record(
+                name=job.name,
+                status=STATUS_DONE if exception is None else STATUS_FAILED,
+                fingerprint=job.fingerprint,
+                output_path=job.output_path,
+                duration=duration,
+                peak_rss_mb=peak_rss_mb,
+                error=None if exception is None else f"{type(exception).__name__}: {exception}",
+            )
+        if progress_bar is not None:
+            progress_bar.update(1)
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            memory_gb = sum(job.cost.memory_gb for job in running.values())
+            io_gb = sum(job.cost.io_gb for job in running.values())
+            for job in list(pending):
+                if len(running) >= max_workers or any(running_job.name in suspects for running_job in running.values()):
+                    break
+                if job.name in suspects and running:
+                    continue
+                fits = memory_gb + job.cost.memory_gb <= memory_budget_gb and io_gb + job.cost.io_gb <= io_budget_gb
+                if fits or not running:
+                    try:
+                        future = executor.submit(_run_job, job.function, job.kwargs, job.output_path)
+                    except BrokenProcessPool:  # A running job took down its worker; handled once it reports back
+                        break
+                    pending.remove(job)
+                    running[future] = job
+                    if manifest is not None:
+                        manifest.record(name=job.name, status=STATUS_RUNNING, fingerprint=job.fingerprint)
+                    memory_gb += job.cost.memory_gb
+                    io_gb += job.cost.io_gb
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                # A worker died abruptly, e.g. killed for running out of memory. Every job in flight fails with the
+                # same error, so the culprit is only known if it ran alone; the others are rerun one at a time.
+                done, _ = wait(running)
+                n_broken = sum(isinstance(future.exception(), BrokenProcessPool) for future in done)
+                for future in done:
+                    job = running.pop(future)
+                    exception = future.exception()
+                    if not isinstance(exception, BrokenProcessPool):
+                        record_result(job=job, exception=exception, result=None if exception else future.result())
+                    elif n_broken == 1:
+                        record_result(job=job, exception=exception, result=None)
+                    else:
+                        suspects.add(job.name)
+                        pending.insert(0, job)
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+                continue
+
+            for future in done:
+                job = running.pop(future)
+                exception = future.exception()
+                record_result(job=job, exception=exception, result=None if exception else future.result())
+    finally:
+        executor.shutdown(wait=True)
+
+    if progress_bar is not None:
+        progress_bar.close()
+    return failures
@@ -0,0 +1,149 @@
+"""Choose HDF5 chunk shapes and compression for NWB datasets from how they will be read."""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+TIME_SLICE = "time_slice"
+PER_CHANNEL = "per_channel"
+PER_SPIKE = "per_spike"
+ACCESS_PROFILES = (TIME_SLICE, PER_CHANNEL, PER_SPIKE)
+
+# Target chunk size of each profile in MiB; single spikes are read far more often than long windows
+DEFAULT_CHUNK_MB = {TIME_SLICE: 10.0, PER_CHANNEL: 10.0, PER_SPIKE: 1.0}
+# Channel bound of per-channel chunks, from
+# https://github.com/flatironinstitute/neurosift/issues/52#issuecomment-1671405249
+# and https://github.com/flatironinstitute/neurosift/issues/109#issuecomment-1684481733
+MAX_CHUNK_CHANNELS = 64
+
+
+@dataclass(frozen=True)
+class ChunkAdvice:
+    """Chunk shape and compression of a dataset; chunk_shape is None for datasets that should stay contiguous."""
+
+    chunk_shape: Optional[Tuple[int, ...]]
+    compression: Optional[str] = "gzip"
+    compression_opts: Optional[int] = 4
+
+    def get_data_io_kwargs(self) -> dict:
+        """Keyword arguments for H5DataIO, or h5py create_dataset, applying this advice."""
+        if self.chunk_shape is None:
+            return dict()
+        return dict(chunks=self.chunk_shape, compression=self.compression, compression_opts=self.compression_opts)
+
+
+def get_chunk_advice(
+    shape: Tuple[int, ...],
+    dtype,
+    access: str = TIME_SLICE,
+    chunk_mb: Optional[float] = None,
+    max_channels: int = MAX_CHUNK_CHANNELS,
+    compression_opts: int = 4,
+) -> ChunkAdvice:
+    """Recommend a chunk shape and compression for a (frames, ...) dataset.
+
+    The first axis is always time, or spikes. Every profile fills chunks along it up to the target size:
+        'time_slice': windows of every channel at once (LFP, processed series); chunks span all other axes.
+        'per_channel': long stretches of a few channels (raw recordings); the second axis is bounded by
+            max_channels and any further axes are kept whole.
+        'per_spike': single events (spike waveforms); chunks hold whole events, with a smaller target size.
+
+    Parameters
+    ----------
+    shape: tuple of int
+    dtype: np.dtype or str
+    access: str, optional
+        One of 'time_slice' (default), 'per_channel' or 'per_spike'.
+    chunk_mb: float, optional
+        Target chunk size in MiB. Defaults to 10 MiB, or 1 MiB for 'per_spike'.
+    max_channels: int, optional
+        Bound on the second axis of 'per_channel' chunks. Default is 64.
+    compression_opts: int, optional
+        Deflate level. Default is 4, the h5py default.
+
+    Returns
+    -------
+    ChunkAdvice
+    """
+    if access not in ACCESS_PROFILES:
+        raise ValueError(f"access must be one of {ACCESS_PROFILES}, not '{access}'!")
+    dtype = np.dtype(dtype)
+    if len(shape) == 0:  # Scalars cannot be chunked
+        return ChunkAdvice(chunk_shape=None, compression=None, compression_opts=None)
+
+    chunk_mb = DEFAULT_CHUNK_MB[access] if chunk_mb is None else chunk_mb
+    inner_shape = tuple(max(1, length) for length in shape[1:])
+    if access == PER_CHANNEL and len(inner_shape) > 0:
+        inner_shape = (min(max_channels, inner_shape[0]),) + inner_shape[1:]
+    bytes_per_frame = int(np.prod(inner_shape)) * dtype.itemsize
+    chunk_frames = max(1, min(max(1, shape[0]), int(chunk_mb * 1024**2 // bytes_per_frame)))
+    return ChunkAdvice(chunk_shape=(chunk_frames,) + inner_shape, compression_opts=compression_opts)
+
+
+def get_recording_conversion_options(recording_extractor, access: str = PER_CHANNEL, **kwargs) -> dict:
+    """Compression and iterator_opts of a recording or LFP interface following the chunk advice.
+
+    Works with both spikeinterface and spikeextractors recordings.
+
+    Parameters
+    ----------
+    recording_extractor: RecordingExtractor
+    access: str, optional
+        Access profile, see get_chunk_advice. Default is 'per_channel'.
+    **kwargs
+        chunk_mb, max_channels and compression_opts, passed to get_chunk_advice.
+
+    Returns
+    -------
+    conversion_options: dict
+        compression, compression_opts and iterator_opts=dict(chunk_shape=...).
+    """
+    if hasattr(recording_extractor, "get_num_samples"):
+        n_frames = recording_extractor.get_num_samples()
+    else:
+        n_frames = recording_extractor.get_num_frames()
+    if hasattr(recording_extractor, "get_dtype"):
+        dtype = recording_extractor.get_dtype()
+    else:
+        dtype = recording_extractor.get_traces(start_frame=0, end_frame=1).dtype
+    advice = get_chunk_advice(
+        shape=(n_frames, recording_extractor.get_num_channels()), dtype=dtype, access=access, **kwargs
+    )
+    return dict(
+        compression=advice.compression,
+        compression_opts=advice.compression_opts,
+        iterator_opts=dict(chunk_shape=advice.chunk_shape),
+    )
+
+
+def add_recording_chunk_options(converter, conversion_options: dict, **kwargs) -> dict:
+    """Fill in chunking and compression for every recording interface of a converter.
+
+    Interfaces whose class name contains 'LFP' get the 'time_slice' profile, other recordings 'per_channel'.
+    Options already set in conversion_options take precedence, and stub tests are left to the interface defaults
+    since their chunks would be larger than the stubbed data.
+
+    Parameters
+    ----------
+    converter: NWBConverter
+    conversion_options: dict
+        Updated in place.
+    **kwargs
+        chunk_mb, max_channels and compression_opts, passed to get_chunk_advice.
+
+    Returns
+    -------
+    conversion_options: dict
+    """
+    for interface_name, data_interface in converter.data_interface_objects.items():
+        recording_extractor = getattr(data_interface, "recording_extractor", None)
+        interface_options = conversion_options.get(interface_name, dict())
+        if recording_extractor is None or interface_options.get("stub_test", False):
+            continue
+        access = TIME_SLICE if "LFP" in type(data_interface).__name__ else PER_CHANNEL
+        options = get_recording_conversion_options(recording_extractor, access=access, **kwargs)
+        iterator_opts = dict(options["iterator_opts"], **interface_options.get("iterator_opts", dict()))
+        options.update(interface_options)
+        options.update(iterator_opts=iterator_opts)
+        conversion_options[interface_name] = options
+    return conversion_options
@@ -0,0 +1,123 @@
+"""Local SQLite record of batch conversion progress, so reruns only convert new, changed or failed sessions."""
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+from fnmatch import fnmatch
+from typing import Optional, Iterable
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+GENERATED_FILE_PATTERNS = ("*.video_probe.json",)
+
+
+def get_fingerprint(contents: dict) -> str:
+    """Hash a JSON-serializable mapping, such as file names to sizes, into a short stable fingerprint."""
+    return hashlib.sha1(json.dumps(contents, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_session_fingerprint(session_path, exclude_patterns: Iterable[str] = GENERATED_FILE_PATTERNS) -> str:
+    """Fingerprint the relative path, size and modification time of every file in a session folder.
+
+    Only the file metadata is read, so fingerprinting hundreds of sessions takes seconds.
+
+    Parameters
+    ----------
+    session_path: PathType
+    exclude_patterns: iterable of str, optional
+        Glob patterns of file names left out, such as sidecars written by earlier conversions, which change with
+        every run. Defaults to the video probe sidecars.
+
+    Returns
+    -------
+    str
+    """
+    session_path = Path(session_path)
+    contents = dict()
+    for file_path in session_path.rglob("*"):
+        if file_path.is_file() and not any(fnmatch(file_path.name, pattern) for pattern in exclude_patterns):
+            stat = file_path.stat()
+            contents[file_path.relative_to(session_path).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+    return get_fingerprint(contents)
+
+
+class ConversionManifest:
+    """Status, input fingerprint, output path, duration and peak memory of every session in a batch.
+
+    Sessions are keyed by name. A session is skipped on a rerun when it is marked done and its fingerprint is
+    unchanged; sessions that failed, were interrupted while running, or whose inputs changed are converted again.
+    Entries recorded without a fingerprint, e.g. sessions known to be converted before the manifest existed, count as
+    done regardless of their inputs.
+    """
+
+    def __init__(self, manifest_path):
+        """
+        Parameters
+        ----------
+        manifest_path: PathType
+            SQLite file, created if it does not exist.
+        """
+        self.manifest_path = Path(manifest_path)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "name TEXT PRIMARY KEY, status TEXT, fingerprint TEXT, output_path TEXT, "
+                "duration REAL, peak_rss_mb REAL, error TEXT, updated TEXT)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A generous timeout lets several processes record results into the same file
+        connection = sqlite3.connect(str(self.manifest_path), timeout=60)
+        try:
+            with connection:  # Commits on success, rolls back on error
+                yield connection
+        finally:
+            connection.close()
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, name: str) -> Optional[dict]:
+        """Return the entry of a session as a dict, or None if it was never recorded."""
+        with self._connect() as connection:
+            connection.row_factory = sqlite3.Row
+            row = connection.execute("SELECT * FROM sessions WHERE name = ?", (name,)).fetchone()
+        return None if row is None else dict(row)
+
+    def is_done(self, name: str, fingerprint: Optional[str] = None) -> bool:
+        """Whether a session was converted successfully from inputs with the given fingerprint."""
+        entry = self.get(name)
+        if entry is None or entry["status"] != STATUS_DONE:
+            return False
+        return entry["fingerprint"] is None or fingerprint is None or entry["fingerprint"] == fingerprint
+
+    def record(
+        self,
+        name: str,
+        status: str,
+        fingerprint: Optional[str] = None,
+        output_path: Optional[str] = None,
+        duration: Optional[float] = None,
+        peak_rss_mb: Optional[float] = None,
+        error: Optional[str] = None,
+    ):
+        """Insert or replace the entry of a session."""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    status,
+                    fingerprint,
+                    None if output_path is None else str(output_path),
+                    duration,
+                    peak_rss_mb,
+                    error,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
@@ -0,0 +1,296 @@
+"""Rechunk and repack HDF5/NWB files chunk by chunk, with parallel decompression and recompression."""
+import os
+import time
+import zlib
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple
+
+import h5py
+import numpy as np
+from hdmf.data_utils import DataChunk
+from tqdm import tqdm
+
+from .parallel_compression import write_gzip_chunks
+
+
+def _has_references(dtype: np.dtype) -> bool:
+    """Whether values of this dtype hold object or region references, directly or in a compound field."""
+    if dtype.names is not None:
+        return any(_has_references(dtype.fields[name][0]) for name in dtype.names)
+    return h5py.check_dtype(ref=dtype) is not None
+
+
+def _is_direct_chunk_dtype(dtype: np.dtype) -> bool:
+    """Whether the stored chunks of this dtype hold the values themselves, so they can be copied as raw bytes.
+
+    Only fixed-size numbers qualify. Chunks of variable-length strings and arrays hold pointers into the global
+    heap of the file, and chunks of references hold addresses of objects in the file.
+    """
+    return dtype.kind in "biufc"
+
+
+def _map_reference(reference, source_file: h5py.File, target_file: h5py.File):
+    """Translate an object or region reference into the equivalent reference in the target file."""
+    if not reference:
+        return reference
+    target_object = target_file[source_file[reference].name]
+    if isinstance(reference, h5py.RegionReference):
+        region = h5py.h5r.get_region(reference, source_file.id)
+        return h5py.h5r.create(target_file.id, target_object.name.encode(), h5py.h5r.DATASET_REGION, region)
+    return target_object.ref
+
+
+def _map_references(value, source_file: h5py.File, target_file: h5py.File):
+    if isinstance(value, np.void):  # A single compound value
+        return _map_references(np.array(value), source_file=source_file, target_file=target_file)[()]
+    if isinstance(value, np.ndarray) and value.dtype.names is not None:
+        mapped_value = value.copy()
+        for name in value.dtype.names:
+            if _has_references(value.dtype.fields[name][0]):
+                mapped_value[name] = _map_references(value[name], source_file=source_file, target_file=target_file)
+        return mapped_value
+    if isinstance(value, np.ndarray):
+        mapped_value = np.empty_like(value)
+        for index in np.ndindex(value.shape):
+            mapped_value[index] = _map_reference(value[index], source_file=source_file, target_file=target_file)
+        return mapped_value
+    return _map_reference(value, source_file=source_file, target_file=target_file)
+
+
+def _copy_attributes(source_object, target_object, deferred_references: list):
+    """Copy attributes, deferring the ones holding references until every object exists in the target."""
+    for key, attribute_id in ((key, source_object.attrs.get_id(key)) for key in source_object.attrs):
+        if _has_references(attribute_id.dtype):
+            deferred_references.append((source_object.name, key))
+        else:
+            target_object.attrs.create(key, data=source_object.attrs[key], dtype=attribute_id.dtype)
+
+
+def _read_block_from_gzip_chunks(dataset: h5py.Dataset, start: int, stop: int, executor: ThreadPoolExecutor):
+    """Read dataset[start:stop] by decompressing the stored chunks it overlaps in parallel."""
+    block = np.full((stop - start,) + dataset.shape[1:], dataset.fillvalue, dtype=dataset.dtype)
+    chunk_shape = dataset.chunks
+    first_chunk = start // chunk_shape[0] * chunk_shape[0]
+    axis_offsets = [range(first_chunk, stop, chunk_shape[0])]
+    axis_offsets.extend(
+        range(0, length, chunk_length) for length, chunk_length in zip(dataset.shape[1:], chunk_shape[1:])
+    )
+
+    def decompress(offset, raw_chunk):
+        filter_mask, chunk_bytes = raw_chunk
+        if not filter_mask & 1:  # Bit set when the deflate filter was skipped for this chunk
+            chunk_bytes = zlib.decompress(chunk_bytes)
+        return offset, np.frombuffer(chunk_bytes, dtype=dataset.dtype).reshape(chunk_shape)
+
+    futures = []
+    for offset in product(*axis_offsets):
+        if dataset.id.get_chunk_info_by_coord(offset).byte_offset is None:  # Never written, keeps the fill value
+            continue
+        futures.append(executor.submit(decompress, offset, dataset.id.read_direct_chunk(offset)))
+    for future in futures:
+        offset, chunk = future.result()
+        frame_start, frame_stop = max(offset[0], start), min(offset[0] + chunk_shape[0], stop)
+        target = (slice(frame_start - start, frame_stop - start),)
+        source = (slice(frame_start - offset[0], frame_stop - offset[0]),)
+        for axis_offset, chunk_length, length in zip(offset[1:], chunk_shape[1:], dataset.shape[1:]):
+            axis_stop = min(axis_offset + chunk_length, length)
+            target += (slice(axis_offset, axis_stop),)
+            source += (slice(0, axis_stop - axis_offset),)
+        block[target] = chunk[source]
+    return block
+
+
+def _iter_rechunked_blocks(
+    dataset: h5py.Dataset, chunk_shape: Tuple[int, ...], buffer_gb: float, executor: ThreadPoolExecutor
+):
+    """Yield DataChunks of whole target chunk rows along the first axis, spanning every other axis."""
+    bytes_per_frame = int(np.prod(dataset.shape[1:])) * dataset.dtype.itemsize
+    block_frames = max(chunk_shape[0], int(buffer_gb * 1e9 // bytes_per_frame) // chunk_shape[0] * chunk_shape[0])
+    parallel_read = (
+        _is_direct_chunk_dtype(dataset.dtype)
+        and dataset.chunks is not None
+        and dataset.compression == "gzip"
+        and not dataset.shuffle
+        and not dataset.fletcher32
+        and dataset.scaleoffset is None
+    )
+    for start in range(0, dataset.shape[0], block_frames):
+        stop = min(start + block_frames, dataset.shape[0])
+        if parallel_read:
+            block = _read_block_from_gzip_chunks(dataset=dataset, start=start, stop=stop, executor=executor)
+        else:
+            block = dataset[start:stop]
+        yield DataChunk(data=block, selection=(slice(start, stop),) + tuple(slice(0, n) for n in dataset.shape[1:]))
+
+
+def repack_nwbfile(
+    source_file_path,
+    target_file_path,
+    chunk_shapes: Optional[Dict[str, Tuple[int, ...]]] = None,
+    compression_opts: int = 4,
+    n_jobs: int = -1,
+    buffer_gb: float = 1.0,
+    page_size: int = 10 * 1024**2,
+    display_progress: bool = False,
+) -> List[dict]:
+    """Copy an HDF5 file into a new file with paged aggregation, rechunking and gzip compressing selected datasets.
+
+    Datasets listed in chunk_shapes are streamed in blocks of whole target chunks. For fixed-size numeric datasets,
+    gzip-compressed sources are decompressed chunk by chunk in a thread pool, and the new chunks are compressed in
+    parallel and written directly; strings, compounds and other variable-length values are rechunked through the
+    HDF5 library instead. Every other object is copied as stored with H5Ocopy. Object and region references, in
+    datasets, compound fields or attributes, are remapped to the new file once everything has been copied, as
+    h5repack does. Soft and external links are kept.
+
+    Parameters
+    ----------
+    source_file_path: PathType
+    target_file_path: PathType
+    chunk_shapes: dict, optional
+        Maps the full path of each dataset to rechunk to its new chunk shape.
+    compression_opts: int, optional
+        Deflate level of the rechunked datasets. Default is 4.
+    n_jobs: int, optional
+        Number of threads used to decompress and compress. The default of -1 uses all available cores.
+    buffer_gb: float, optional
+        Maximum size of the uncompressed block read at a time. Default is 1 GB.
+    page_size: int, optional
+        File space page size in bytes for the paged aggregation strategy. Default is 10 MiB.
+    display_progress: bool, optional
+        Print the throughput of each rechunked dataset. Default is False.
+
+    Returns
+    -------
+    report: list of dict
+        Path, uncompressed size in bytes, seconds and MB/s of each rechunked dataset.
+    """
+    chunk_shapes = chunk_shapes or dict()
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    deferred_references = []  # (path, attribute name or None for the dataset values)
+    report = []
+
+    with h5py.File(source_file_path, mode="r") as source_file, h5py.File(
+        target_file_path, mode="w", fs_strategy="page", fs_persist=True, fs_page_size=page_size
+    ) as target_file, ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        _copy_attributes(source_object=source_file, target_object=target_file, deferred_references=deferred_references)
+
+        def copy_group(source_group: h5py.Group, target_group: h5py.Group):
+            for name in source_group:
+                link = source_group.get(name, getlink=True)
+                if isinstance(link, (h5py.SoftLink, h5py.ExternalLink)):
+                    target_group[name] = link
+                    continue
+                source_object = source_group[name]
+                if isinstance(source_object, h5py.Group):
+                    target_subgroup = target_group.create_group(name)
+                    _copy_attributes(source_object, target_subgroup, deferred_references=deferred_references)
+                    copy_group(source_object, target_subgroup)
+                elif source_object.name in chunk_shapes:
+                    rechunk_dataset(source_object, target_group, name)
+                elif _has_references(source_object.dtype):
+                    target_dataset = target_group.create_dataset(
+                        name, shape=source_object.shape, dtype=source_object.dtype, maxshape=source_object.maxshape
+                    )
+                    _copy_attributes(source_object, target_dataset, deferred_references=deferred_references)
+                    deferred_references.append((source_object.name, None))
+                else:
+                    source_file.copy(source_object, target_group, name=name, without_attrs=True)
+                    _copy_attributes(source_object, target_group[name], deferred_references=deferred_references)
+
+        def rechunk_dataset(source_dataset: h5py.Dataset, target_group: h5py.Group, name: str):
+            chunk_shape = tuple(chunk_shapes[source_dataset.name])
+            direct_chunks = _is_direct_chunk_dtype(source_dataset.dtype)
+            target_dataset = target_group.create_dataset(
+                name,
+                shape=source_dataset.shape,
+                dtype=source_dataset.dtype,
+                maxshape=source_dataset.maxshape,
+                chunks=chunk_shape,
+                compression="gzip",
+                compression_opts=compression_opts,
+                fillvalue=source_dataset.fillvalue if direct_chunks else None,
+            )
+            _copy_attributes(source_dataset, target_dataset, deferred_references=deferred_references)
+            start_time = time.perf_counter()
+            blocks = _iter_rechunked_blocks(
+                dataset=source_dataset, chunk_shape=chunk_shape, buffer_gb=buffer_gb, executor=executor
+            )
+            if direct_chunks:
+                write_gzip_chunks(
+                    dataset=target_dataset, data_chunk_iterator=blocks, n_jobs=n_jobs, compression_opts=compression_opts
+                )
+            elif _has_references(source_dataset.dtype):
+                deferred_references.append((source_dataset.name, None))
+            else:  # Strings and other compound or variable-length values go through the HDF5 library
+                for block in blocks:
+                    target_dataset[block.selection] = block.data
+            seconds = time.perf_counter() - start_time
+            n_bytes = source_dataset.size * source_dataset.dtype.itemsize
+            mb_per_s = n_bytes / 1e6 / seconds if seconds > 0 else float("inf")
+            report.append(dict(path=source_dataset.name, bytes=n_bytes, seconds=seconds, mb_per_s=mb_per_s))
+            if display_progress:
+                print(f"{source_dataset.name}: {n_bytes / 1e9:.2f} GB in {seconds:.1f} s ({mb_per_s:.1f} MB/s)")
+
+        copy_group(source_file, target_file)
+
+        for path, attribute_name in deferred_references:
+            if attribute_name is None:
+                target_file[path][()] = _map_references(source_file[path][()], source_file, target_file)
+            else:
+                source_attribute = source_file[path].attrs[attribute_name]
+                target_file[path].attrs.create(
+                    attribute_name,
+                    data=_map_references(source_attribute, source_file, target_file),
+                    dtype=source_file[path].attrs.get_id(attribute_name).dtype,
+                )
+
+    return report
+
+
+def _repack_nwbfile_kwargs(kwargs: dict) -> List[dict]:
+    return repack_nwbfile(**kwargs)
+
+
+def repack_nwbfiles(
+    repack_jobs: List[dict],
+    n_files: int = 1,
+    n_jobs: int = -1,
+    display_progress: bool = True,
+    **kwargs,
+) -> Dict[str, List[dict]]:
+    """Repack several files concurrently, one process per file, splitting the compression threads between them.
+
+    Parameters
+    ----------
+    repack_jobs: list of dict
+        Keyword arguments of repack_nwbfile for each file: source_file_path, target_file_path and chunk_shapes.
+    n_files: int, optional
+        Number of files repacked at the same time. Default is 1.
+    n_jobs: int, optional
+        Total number of compression threads. The default of -1 uses all available cores.
+    display_progress: bool, optional
+        Show a progress bar that advances as files complete. Default is True.
+    **kwargs
+        compression_opts, buffer_gb and page_size, passed to repack_nwbfile.
+
+    Returns
+    -------
+    reports: dict
+        Maps each target file path to the per-dataset throughput report of repack_nwbfile.
+    """
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    kwargs.update(n_jobs=max(1, n_jobs // n_files))
+    all_kwargs = [dict(kwargs, **repack_job) for repack_job in repack_jobs]
+    target_file_paths = [str(repack_job["target_file_path"]) for repack_job in repack_jobs]
+    if n_files == 1:
+        reports = map(_repack_nwbfile_kwargs, all_kwargs)
+        if display_progress:
+            reports = tqdm(reports, total=len(all_kwargs), desc="Repacking files")
+        return dict(zip(target_file_paths, reports))
+
+    with ProcessPoolExecutor(max_workers=n_files) as executor:
+        reports = executor.map(_repack_nwbfile_kwargs, all_kwargs)
+        if display_progress:
+            reports = tqdm(reports, total=len(all_kwargs), desc="Repacking files")
+        return dict(zip(target_file_paths, reports))
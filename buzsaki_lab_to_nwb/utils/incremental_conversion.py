@@ -0,0 +1,310 @@
+"""Patch an existing NWB file by rewriting only the data interfaces whose source files changed."""
+import json
+import posixpath
+from copy import deepcopy
+from pathlib import Path
+from typing import Optional, Dict, List
+from warnings import warn
+
+import h5py
+import numpy as np
+from pynwb import NWBFile, NWBHDF5IO
+from pynwb.base import ProcessingModule
+from pynwb.device import Device
+from pynwb.ecephys import ElectrodeGroup
+from pynwb.file import Subject
+from hdmf.container import Container
+
+from .conversion_manifest import get_fingerprint
+from .parallel_compression import staged_compression
+
+SHARED_CONTAINER_TYPES = (Device, ElectrodeGroup, Subject)
+# Metadata fields that differ on every call of get_metadata, left out of the fingerprints
+VOLATILE_METADATA_FIELDS = (("NWBFile", "identifier"),)
+
+
+def get_interface_record_path(nwbfile_path) -> Path:
+    """Sidecar JSON next to the NWB file holding the fingerprint and HDF5 paths written by each interface."""
+    nwbfile_path = Path(nwbfile_path)
+    return nwbfile_path.with_name(f"{nwbfile_path.name}.interfaces.json")
+
+
+def _is_within(path: str, container_paths: List[str]) -> bool:
+    return any(path == container_path or path.startswith(container_path + "/") for container_path in container_paths)
+
+
+def _get_address(h5_object) -> int:
+    return h5py.h5o.get_info(h5_object.id).addr
+
+
+def _has_references(dtype) -> bool:
+    if dtype.names is not None:
+        return any(_has_references(dtype.fields[name][0]) for name in dtype.names)
+    return h5py.check_dtype(ref=dtype) is not None
+
+
+def _iter_references(value):
+    """Yield the non-null references held by an array or scalar, including those in compound fields."""
+    value = np.asarray(value)
+    if value.dtype.names is not None:
+        for name in value.dtype.names:
+            if _has_references(value.dtype.fields[name][0]):
+                yield from _iter_references(value[name])
+        return
+    for reference in value.flat:
+        if reference:
+            yield reference
+
+
+def find_links_into(file: h5py.File, container_paths: List[str]) -> List[str]:
+    """Paths of the links and object references outside of container_paths that point to objects inside them.
+
+    Deleting the containers would leave these dangling, e.g. the timeseries column of an intervals table written by
+    another interface, a soft link, or a second hard link to one of their datasets.
+    """
+    container_paths = [container_path.rstrip("/") for container_path in container_paths if container_path in file]
+    inside_addresses = set()
+    for container_path in container_paths:
+        container = file[container_path]
+        inside_addresses.add(_get_address(container))
+        if isinstance(container, h5py.Group):
+            container.visititems(lambda name, h5_object: inside_addresses.add(_get_address(h5_object)))
+
+    def points_inside(reference) -> bool:
+        return _get_address(file[reference]) in inside_addresses
+
+    def check_attributes(h5_object) -> List[str]:
+        return [
+            f"{h5_object.name}@{key}"
+            for key in h5_object.attrs
+            if _has_references(h5_object.attrs.get_id(key).dtype)
+            and any(points_inside(reference) for reference in _iter_references(h5_object.attrs[key]))
+        ]
+
+    found = check_attributes(file)
+    visited_addresses = {_get_address(file)}
+    groups = [file]
+    while groups:
+        group = groups.pop()
+        for name in group:
+            path = posixpath.join(group.name, name)
+            if _is_within(path, container_paths):
+                continue
+            link = group.get(name, getlink=True)
+            if isinstance(link, h5py.SoftLink):
+                if _is_within(posixpath.normpath(posixpath.join(group.name, link.path)), container_paths):
+                    found.append(path)
+                continue
+            if not isinstance(link, h5py.HardLink):
+                continue
+            h5_object = group[name]
+            address = _get_address(h5_object)
+            if address in inside_addresses:
+                found.append(path)
+                continue
+            if address in visited_addresses:
+                continue
+            visited_addresses.add(address)
+            found.extend(check_attributes(h5_object))
+            if isinstance(h5_object, h5py.Group):
+                groups.append(h5_object)
+            elif _has_references(h5_object.dtype) and any(
+                points_inside(reference) for reference in _iter_references(h5_object[()])
+            ):
+                found.append(path)
+    return found
+
+
+class IncrementalNWBConverterMixin:
+    """Add an append/patch mode to an NWBConverter.
+
+    Each interface is fingerprinted from the size and modification time of its source files together with its
+    conversion options. On the first run every interface is written and the HDF5 groups it created are recorded in a
+    sidecar next to the NWB file. On later runs only the interfaces whose fingerprint changed are rewritten: their
+    groups are deleted from the existing file, which is then opened in append mode and given the new containers, so
+    unchanged interfaces such as the ElectricalSeries are never read or rewritten.
+
+    Devices, electrode groups, the subject and the electrodes table are shared between interfaces and are never
+    removed, nor are columns an interface adds to a table created by another; rewrite the whole file when those
+    change. Deleted groups leave free space in the file until it is repacked.
+
+    The whole file is rewritten instead when the metadata changed, other than the sections listed for an interface in
+    interface_metadata_keys, or when objects outside of the groups to delete link or refer to objects inside them.
+
+    Folder-based interfaces list the files they read, relative to the folder, in interface_source_patterns;
+    otherwise every file in the folder counts toward their fingerprint.
+    """
+
+    interface_source_patterns: Dict[str, List[str]] = dict()
+    # Top-level metadata sections read by a single interface, which only rewrite that interface when they change
+    interface_metadata_keys: Dict[str, List[str]] = dict()
+
+    def get_interface_source_files(self, interface_name: str) -> List[Path]:
+        """Files read by an interface, found among the paths in its source_data."""
+        source_data = self.data_interface_objects[interface_name].source_data
+        source_files = []
+        for value in source_data.values():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for path in values:
+                if not isinstance(path, (str, Path)) or not Path(path).exists():
+                    continue
+                path = Path(path)
+                if path.is_file():
+                    source_files.append(path)
+                    continue
+                patterns = self.interface_source_patterns.get(interface_name, ["**/*"])
+                source_files.extend(file for pattern in patterns for file in path.glob(pattern) if file.is_file())
+        return sorted(set(source_files))
+
+    def get_interface_fingerprint(
+        self, interface_name: str, conversion_options: Optional[dict] = None, metadata: Optional[dict] = None
+    ) -> str:
+        contents = dict(options=conversion_options or dict())
+        if metadata is not None:
+            contents.update(
+                metadata={key: metadata.get(key) for key in self.interface_metadata_keys.get(interface_name, [])}
+            )
+        for file_path in self.get_interface_source_files(interface_name=interface_name):
+            stat = file_path.stat()
+            contents[str(file_path)] = (stat.st_size, stat.st_mtime_ns)
+        return get_fingerprint(contents)
+
+    def get_metadata_fingerprint(self, metadata: dict) -> str:
+        """Fingerprint of the metadata shared by all interfaces, which is only written along with the whole file."""
+        interface_keys = set(key for keys in self.interface_metadata_keys.values() for key in keys)
+        shared_metadata = deepcopy({key: value for key, value in metadata.items() if key not in interface_keys})
+        for section, field in VOLATILE_METADATA_FIELDS:
+            shared_metadata.get(section, dict()).pop(field, None)
+        return get_fingerprint(shared_metadata)
+
+    def make_nwbfile(self, metadata: dict) -> NWBFile:
+        try:
+            from neuroconv.tools.nwb_helpers import make_nwbfile_from_metadata
+        except ImportError:
+            from nwb_conversion_tools.tools.nwb_helpers import make_nwbfile_from_metadata
+        return make_nwbfile_from_metadata(metadata=metadata)
+
+    def _add_interface(self, interface_name: str, nwbfile: NWBFile, metadata: dict, conversion_options: dict):
+        """Add an interface to nwbfile and return the roots of the containers it created."""
+        existing_object_ids = set(child.object_id for child in nwbfile.all_children())
+        data_interface = self.data_interface_objects[interface_name]
+        options = conversion_options.get(interface_name, dict())
+        if hasattr(data_interface, "add_to_nwbfile"):
+            data_interface.add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, **options)
+        else:
+            data_interface.run_conversion(nwbfile=nwbfile, metadata=metadata, **options)
+
+        shared_object_ids = set(existing_object_ids)
+        if nwbfile.electrodes is not None:
+            shared_object_ids.add(nwbfile.electrodes.object_id)
+        owned_containers = []
+        for child in nwbfile.all_children():
+            if child.object_id in existing_object_ids or not isinstance(child, Container):
+                continue
+            if isinstance(child, (ProcessingModule, *SHARED_CONTAINER_TYPES)):
+                # Modules are shared by name, so the interface owns the containers inside them instead
+                shared_object_ids.add(child.object_id)
+                continue
+            if child.parent is nwbfile or child.parent.object_id in shared_object_ids:
+                if child.parent is not nwbfile.electrodes:
+                    owned_containers.append(child)
+        return owned_containers
+
+    def run_incremental_conversion(
+        self, nwbfile_path, metadata: Optional[dict] = None, conversion_options: Optional[dict] = None
+    ) -> List[str]:
+        """Write nwbfile_path, or patch it in place if it was written by this method before.
+
+        Parameters
+        ----------
+        nwbfile_path: PathType
+        metadata: dict, optional
+            Defaults to get_metadata(). Changes to the sections not listed in interface_metadata_keys rewrite the
+            whole file.
+        conversion_options: dict, optional
+            Conversion options of each interface, as for run_conversion.
+
+        Returns
+        -------
+        interface_names: list of str
+            Names of the interfaces that were written.
+        """
+        nwbfile_path = Path(nwbfile_path)
+        record_path = get_interface_record_path(nwbfile_path=nwbfile_path)
+        metadata = self.get_metadata() if metadata is None else metadata
+        conversion_options = conversion_options or dict()
+        metadata_fingerprint = self.get_metadata_fingerprint(metadata=metadata)
+        fingerprints = {
+            interface_name: self.get_interface_fingerprint(
+                interface_name=interface_name,
+                conversion_options=conversion_options.get(interface_name),
+                metadata=metadata,
+            )
+            for interface_name in self.data_interface_objects
+        }
+
+        patch = nwbfile_path.is_file() and record_path.is_file()
+        record = json.loads(record_path.read_text()) if patch else dict()
+        if record.get("metadata") != metadata_fingerprint:  # Also catches records from before metadata was tracked
+            patch, record = False, dict()
+        interface_records = record.setdefault("interfaces", dict())
+        record["metadata"] = metadata_fingerprint
+        changed_interface_names = [
+            interface_name
+            for interface_name, fingerprint in fingerprints.items()
+            if interface_records.get(interface_name, dict()).get("fingerprint") != fingerprint
+        ]
+        removed_interface_names = [name for name in interface_records if name not in fingerprints]
+        if patch and not changed_interface_names and not removed_interface_names:
+            return []
+
+        if patch:
+            container_paths = [
+                container_path
+                for interface_name in changed_interface_names + removed_interface_names
+                for container_path in interface_records.get(interface_name, dict()).get("containers", [])
+            ]
+            with h5py.File(nwbfile_path, mode="a") as file:
+                links = find_links_into(file=file, container_paths=container_paths)
+                if not links:
+                    for container_path in container_paths:
+                        if container_path in file:
+                            del file[container_path]
+            if links:
+                warn(
+                    f"Rewriting all of {nwbfile_path.name}: objects outside of the changed interfaces refer to their "
+                    f"containers ({', '.join(links[:3])}{', ...' if len(links) > 3 else ''})."
+                )
+                patch = False
+                changed_interface_names = list(fingerprints)
+                interface_records.clear()
+            else:
+                for interface_name in changed_interface_names + removed_interface_names:
+                    interface_records.pop(interface_name, None)
+
+        # The staging files of parallel compression are released once the file is written and closed
+        with staged_compression(scratch_folder_path=nwbfile_path.parent), NWBHDF5IO(
+            str(nwbfile_path), mode="a" if patch else "w"
+        ) as io:
+            nwbfile = io.read() if patch else self.make_nwbfile(metadata=metadata)
+            owned_containers = {
+                interface_name: self._add_interface(
+                    interface_name=interface_name,
+                    nwbfile=nwbfile,
+                    metadata=metadata,
+                    conversion_options=conversion_options,
+                )
+                for interface_name in changed_interface_names
+            }
+            io.write(nwbfile)
+            for interface_name, containers in owned_containers.items():
+                interface_records[interface_name] = dict(
+                    fingerprint=fingerprints[interface_name],
+                    # Builder paths start at the "root" group, which is "/" in the HDF5 file
+                    containers=[
+                        "/" + io.manager.get_builder(container).path.partition("/")[2] for container in containers
+                    ],
+                )
+
+        record_path.write_text(json.dumps(record, indent=2))
+        return changed_interface_names
@@ -0,0 +1,253 @@
+"""Load .mat files once per conversion, reading only the requested variables and fields."""
+import os
+from functools import lru_cache
+from typing import Optional, Iterable
+
+import numpy as np
+
+PYMATREADER = "pymatreader"
+SCIPY = "scipy"
+NORMALIZED = "normalized"
+BACKENDS = (PYMATREADER, SCIPY, NORMALIZED)
+
+MAT_V4 = "4"
+MAT_V5 = "5"  # Also written by MATLAB v6 and v7
+MAT_V73 = "7.3"
+
+
+def get_mat_version(file_path) -> str:
+    """Sniff the format of a .mat file from its 128 byte header.
+
+    v5 and v7.3 headers hold 116 bytes of text and an 8 byte subsystem offset, followed by the version (0x0100 or
+    0x0200) and an endian indicator, 'IM' when the version is stored little endian. v4 files have no header.
+    """
+    with open(file_path, mode="rb") as file:
+        header = file.read(128)
+    endian_indicator = header[126:128]
+    if len(header) < 128 or endian_indicator not in (b"IM", b"MI"):
+        return MAT_V4
+    version = int.from_bytes(header[124:126], byteorder="little" if endian_indicator == b"IM" else "big")
+    return MAT_V73 if version == 0x0200 else MAT_V5
+
+
+def is_mat_v73(file_path) -> bool:
+    """MATLAB v7.3 files are HDF5 files with a 512 byte user block holding the MATLAB header."""
+    return get_mat_version(file_path) == MAT_V73
+
+
+def normalize_mat_data(value):
+    """Give the output of any .mat reader the same shape.
+
+    Structs become dicts, struct arrays and cell arrays become lists, char arrays become str, and numeric arrays
+    are squeezed, so row and column vectors are both 1D and 1x1 arrays become Python scalars.
+    """
+    if isinstance(value, dict):
+        return {key: normalize_mat_data(item) for key, item in value.items() if not key.startswith("__")}
+    if isinstance(value, (list, tuple)):
+        return [normalize_mat_data(item) for item in value]
+    if isinstance(value, np.ndarray):
+        value = np.squeeze(value)
+        if value.dtype.kind in "US":
+            return str(value) if value.ndim == 0 else [str(item) for item in value]
+        if value.dtype == object:
+            if value.ndim == 0:
+                return normalize_mat_data(value.item())
+            return [normalize_mat_data(item) for item in value]
+        return value.item() if value.ndim == 0 else value
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _get_matlab_class(h5_object) -> Optional[str]:
+    matlab_class = h5_object.attrs.get("MATLAB_class")
+    return matlab_class.decode() if isinstance(matlab_class, bytes) else matlab_class
+
+
+def _is_struct_array(group) -> bool:
+    """Fields of struct arrays are datasets of references, one per element, without a MATLAB_class of their own."""
+    import h5py
+
+    return any(
+        isinstance(field, h5py.Dataset)
+        and h5py.check_dtype(ref=field.dtype) is not None
+        and _get_matlab_class(field) is None
+        for field in group.values()
+    )
+
+
+def _read_mat_v73_value(h5_object, ignore_fields: frozenset):
+    """Read a variable of a v7.3 file into the types scipy.io.loadmat returns for v5 files with simplify_cells.
+
+    MATLAB stores arrays column-major, so every HDF5 shape is the reverse of the MATLAB shape. Structs are groups,
+    and cells and the fields of struct arrays are datasets of references to objects in the '#refs#' group.
+    """
+    import h5py
+
+    file = h5_object.file
+    matlab_class = _get_matlab_class(h5_object)
+    if isinstance(h5_object, h5py.Group):
+        if "MATLAB_sparse" in h5_object.attrs:
+            from scipy.sparse import csc_matrix
+
+            jc = h5_object["jc"][()]
+            data = h5_object["data"][()] if "data" in h5_object else np.ones(jc[-1], dtype=bool)
+            ir = h5_object["ir"][()] if "ir" in h5_object else np.zeros(0, dtype="uint64")
+            return csc_matrix((data, ir, jc), shape=(int(h5_object.attrs["MATLAB_sparse"]), len(jc) - 1))
+        field_names = [
+            name.tobytes().decode() if isinstance(name, np.ndarray) else str(name)
+            for name in h5_object.attrs.get("MATLAB_fields", list(h5_object))
+        ]
+        field_names = [name for name in field_names if name in h5_object and name not in ignore_fields]
+        if not _is_struct_array(h5_object):
+            return {name: _read_mat_v73_value(h5_object[name], ignore_fields) for name in field_names}
+        references = {name: h5_object[name][()].T for name in field_names}
+        shape = next(iter(references.values())).shape if references else (0,)
+        struct_array = np.empty(shape, dtype=object)
+        for index in np.ndindex(shape):
+            struct_array[index] = {
+                name: _read_mat_v73_value(file[references[name][index]], ignore_fields) for name in field_names
+            }
+        return struct_array
+
+    if h5_object.attrs.get("MATLAB_empty", 0):
+        if matlab_class == "char":
+            return ""
+        shape = tuple(int(length) for length in h5_object[()][::-1]) if h5_object.ndim > 0 else (0,)
+        return np.empty(shape, dtype=object if matlab_class in ("cell", "struct") else "float64")
+    value = h5_object[()]
+    if matlab_class == "cell":
+        value = value.T
+        cell_array = np.empty(value.shape, dtype=object)
+        for index in np.ndindex(value.shape):
+            cell_array[index] = _read_mat_v73_value(file[value[index]], ignore_fields)
+        return cell_array
+    if matlab_class == "char":
+        rows = ["".join(chr(code) for code in row) for row in np.atleast_2d(value.T)]
+        return rows[0] if len(rows) == 1 else np.array(rows)
+    if value.dtype.names is not None and "real" in value.dtype.names:
+        value = value["real"] + 1j * value["imag"]
+    if matlab_class == "logical":
+        value = value.astype(bool)
+    return value.T if isinstance(value, np.ndarray) else value
+
+
+def _read_mat_v73(file_path: str, variable_names: Optional[list], ignore_fields: Optional[tuple]) -> dict:
+    """Walk the HDF5 tree of a v7.3 file, reading only the requested variables."""
+    import h5py
+
+    with h5py.File(file_path, mode="r") as file:
+        names = [name for name in file if not name.startswith("#")] if variable_names is None else variable_names
+        return {name: _read_mat_v73_value(file[name], frozenset(ignore_fields or ())) for name in names if name in file}
+
+
+def _read_normalized_mat_file(file_path: str, variable_names: Optional[list], ignore_fields: Optional[tuple]):
+    """Dispatch on the header version to a single reader, instead of trying each reader until one succeeds."""
+    if get_mat_version(file_path) == MAT_V73:
+        return _read_mat_v73(file_path, variable_names=variable_names, ignore_fields=ignore_fields)
+    from scipy.io import loadmat
+
+    return loadmat(file_name=file_path, variable_names=variable_names, simplify_cells=True)
+
+
+@lru_cache(maxsize=32)
+def _load_mat_file(
+    file_path: str,
+    st_mtime_ns: int,
+    st_size: int,
+    variable_names: Optional[tuple],
+    ignore_fields: Optional[tuple],
+    backend: str,
+    simplify_cells: bool,
+):
+    """Parse a .mat file; the file modification time and size are only part of the cache key."""
+    variable_names = None if variable_names is None else list(variable_names)
+    if backend == NORMALIZED:
+        return normalize_mat_data(_read_normalized_mat_file(file_path, variable_names, ignore_fields))
+    if backend == PYMATREADER:
+        from pymatreader import read_mat
+
+        # For v7.3 files pymatreader walks the HDF5 tree through h5py and never touches unrequested variables
+        return read_mat(file_path, variable_names=variable_names, ignore_fields=list(ignore_fields or []))
+
+    if is_mat_v73(file_path):
+        import hdf5storage
+
+        return hdf5storage.loadmat(file_name=file_path, variable_names=variable_names)
+    from scipy.io import loadmat
+
+    return loadmat(file_name=file_path, variable_names=variable_names, simplify_cells=simplify_cells)
+
+
+def load_mat(
+    file_path,
+    variable_names: Optional[Iterable[str]] = None,
+    ignore_fields: Optional[Iterable[str]] = None,
+    backend: str = PYMATREADER,
+    simplify_cells: bool = False,
+) -> dict:
+    """Read a .mat file, or return the cached result of an identical earlier read.
+
+    Results are cached per process on the path, size and modification time of the file together with the requested
+    variables, fields and backend, so interfaces of the same session that ask for the same projection of a file
+    share a single read. The returned dict is shared between callers and must not be modified. Call
+    clear_mat_cache between conversions to release the memory.
+
+    Parameters
+    ----------
+    file_path: PathType
+    variable_names: iterable of str, optional
+        Top-level variables to read. Defaults to all of them.
+    ignore_fields: iterable of str, optional
+        Names of struct fields to skip at any depth, e.g. large tracking data. Only used when pymatreader or the
+        'normalized' backend reads a v7.3 file.
+    backend: str, optional
+        'pymatreader' (default) returns nested dicts and lists for v5 and v7.3 files alike. 'scipy' returns the
+        struct arrays of scipy.io.loadmat, reading v7.3 files with hdf5storage. 'normalized' picks the reader from
+        the header version and returns the output of normalize_mat_data, see read_mat_file.
+    simplify_cells: bool, optional
+        Passed to scipy.io.loadmat. Default is False.
+
+    Returns
+    -------
+    dict
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, not '{backend}'!")
+    file_path = os.path.abspath(str(file_path))
+    file_stat = os.stat(file_path)
+    return _load_mat_file(
+        file_path,
+        file_stat.st_mtime_ns,
+        file_stat.st_size,
+        None if variable_names is None else tuple(sorted(variable_names)),
+        None if ignore_fields is None else tuple(sorted(ignore_fields)),
+        backend,
+        simplify_cells,
+    )
+
+
+def read_mat_file(file_path, variable_names: Optional[Iterable[str]] = None) -> dict:
+    """Read any .mat file into plain dicts, lists, squeezed arrays and Python scalars.
+
+    v4 and v5 to v7 files are read with scipy.io.loadmat(simplify_cells=True), and v7.3 files by walking their HDF5
+    tree into the same types, before normalize_mat_data, so a file gives the same result whichever MATLAB version
+    saved it; struct arrays become lists of dicts. Intervals that may hold a single row should be read with
+    np.reshape(values, (-1, 2)). Results are cached as by load_mat and must not be modified.
+
+    Parameters
+    ----------
+    file_path: PathType
+    variable_names: iterable of str, optional
+        Top-level variables to read. Defaults to all of them.
+
+    Returns
+    -------
+    dict
+    """
+    return load_mat(file_path=file_path, variable_names=variable_names, backend=NORMALIZED)
+
+
+def clear_mat_cache():
+    """Release every cached .mat file."""
+    _load_mat_file.cache_clear()
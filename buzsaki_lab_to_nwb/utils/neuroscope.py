@@ -1,19 +1,27 @@
 """Authors: Ben Dichter, Cody Baker."""
 import os
+import warnings
 from glob import glob
 import numpy as np
 import pandas as pd
 from lxml import etree as et
 from tqdm import tqdm
-from typing import Optional, List, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Iterable, Tuple
+from functools import lru_cache
+from dataclasses import dataclass
 from pathlib import Path
 
 from pynwb import NWBFile
 from pynwb.behavior import SpatialSeries
 from pynwb.ecephys import ElectricalSeries, LFP, SpikeEventSeries
 from hdmf.backends.hdf5.h5_utils import H5DataIO
-from hdmf.data_utils import DataChunkIterator
-from pynwb.misc import AnnotationSeries
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
+from hdmf.common import VectorData, VectorIndex
+from pynwb.misc import AnnotationSeries, Units
+
+from .parallel_compression import parallel_gzip_data_io
+from .chunking import TIME_SLICE, PER_SPIKE, get_chunk_advice
 
 try:
     from typing import ArrayLike
@@ -24,6 +32,11 @@ except ImportError:
     # adapted from numpy typing
     ArrayLike = Union[bool, int, float, complex, list, ndarray, Sequence]
 
+try:
+    from pynwb.file import ElectrodesTable as ElectrodeTable
+except ImportError:  # pynwb < 3.0
+    from pynwb.file import ElectrodeTable
+
 OptionalPathType = Optional[Union[str, Path]]
 
 
@@ -81,8 +94,66 @@ def load_xml(xml_filepath: str):
     return et.parse(xml_filepath).getroot()
 
 
-def get_channel_groups(session_path: str, xml_filepath: Optional[str] = None):
-    """Retrieve all channel ids and their group structure in the Neuroscope xml.
+@dataclass(frozen=True)
+class NeuroscopeHeader:
+    """Immutable summary of the fields used from a Neuroscope session .xml header.
+
+    Fields that are absent from a particular xml are None (or empty for the channel groups).
+    """
+
+    xml_filepath: str
+    n_channels: Optional[int]
+    sampling_rate: Optional[float]
+    lfp_sampling_rate: Optional[float]
+    channel_groups: Tuple[Tuple[int, ...], ...]
+    shank_channels: Tuple[Tuple[int, ...], ...]
+    spikes_nsamples: Optional[int]
+
+
+def _find_text(root, *tags: str):
+    element = root
+    for tag in tags:
+        element = element.find(tag) if element is not None else None
+    return None if element is None else element.text
+
+
+@lru_cache(maxsize=None)
+def _read_neuroscope_header(xml_filepath: str, st_mtime_ns: int, st_size: int):
+    """Parse the xml; the file modification time and size are only part of the cache key."""
+    root = load_xml(xml_filepath)
+
+    anatomical_groups = root.find("anatomicalDescription/channelGroups")
+    channel_groups = tuple(
+        tuple(int(channel.text) for channel in group.findall("channel"))
+        for group in ([] if anatomical_groups is None else anatomical_groups.findall("group"))
+    )
+    spike_groups = root.find("spikeDetection/channelGroups")
+    shank_channels = tuple(
+        tuple(int(channel.text) for channel in group.find("channels"))
+        for group in ([] if spike_groups is None else spike_groups.findall("group"))
+    )
+
+    n_channels = _find_text(root, "acquisitionSystem", "nChannels")
+    sampling_rate = _find_text(root, "acquisitionSystem", "samplingRate")
+    lfp_sampling_rate = _find_text(root, "fieldPotentials", "lfpSamplingRate")
+    spikes_nsamples = _find_text(root, "neuroscope", "spikes", "nSamples")
+
+    return NeuroscopeHeader(
+        xml_filepath=xml_filepath,
+        n_channels=None if n_channels is None else int(n_channels),
+        sampling_rate=None if sampling_rate is None else float(sampling_rate),
+        lfp_sampling_rate=None if lfp_sampling_rate is None else float(lfp_sampling_rate),
+        channel_groups=channel_groups,
+        shank_channels=shank_channels,
+        spikes_nsamples=None if spikes_nsamples is None else int(spikes_nsamples),
+    )
+
+
+def get_neuroscope_header(session_path: str, xml_filepath: Optional[str] = None):
+    """Retrieve the parsed Neuroscope xml header of a session.
+
+    Headers are cached for the lifetime of the process, keyed on the xml path, size and modification time, so
+    each xml is only parsed once no matter how many callers ask for it.
 
     Parameters
     ----------
@@ -91,22 +162,36 @@ def get_channel_groups(session_path: str, xml_filepath: Optional[str] = None):
 
     Returns
     -------
-    list(list(int))
+    NeuroscopeHeader
 
     """
     if xml_filepath is None:
         fpath_base, fname = os.path.split(session_path)
         xml_filepath = os.path.join(session_path, fname + ".xml")
 
-    assert os.path.isfile(xml_filepath), "No .xml file found at the path location!" "Unable to retrieve channel_groups."
+    assert os.path.isfile(xml_filepath), "No .xml file found at the path location!" "Unable to retrieve header."
 
-    root = load_xml(xml_filepath)
-    channel_groups = [
-        [int(channel.text) for channel in group.findall("channel")]
-        for group in root.find("anatomicalDescription").find("channelGroups").findall("group")
-    ]
+    xml_filepath = os.path.abspath(xml_filepath)
+    xml_stat = os.stat(xml_filepath)
+    return _read_neuroscope_header(xml_filepath, xml_stat.st_mtime_ns, xml_stat.st_size)
 
-    return channel_groups
+
+def get_channel_groups(session_path: str, xml_filepath: Optional[str] = None):
+    """Retrieve all channel ids and their group structure in the Neuroscope xml.
+
+    Parameters
+    ----------
+    session_path: str
+    xml_filepath: None | str (optional)
+
+    Returns
+    -------
+    list(list(int))
+
+    """
+    header = get_neuroscope_header(session_path=session_path, xml_filepath=xml_filepath)
+
+    return [list(group) for group in header.channel_groups]
 
 
 def get_shank_channels(session_path: str, xml_filepath: Optional[str] = None):
@@ -124,20 +209,9 @@ def get_shank_channels(session_path: str, xml_filepath: Optional[str] = None):
     list(list(int))
 
     """
-    if xml_filepath is None:
-        fpath_base, fname = os.path.split(session_path)
-        xml_filepath = os.path.join(session_path, fname + ".xml")
+    header = get_neuroscope_header(session_path=session_path, xml_filepath=xml_filepath)
 
-    assert os.path.isfile(xml_filepath), "No .xml file found at the path location!" "Unable to retrieve shank_channels."
-
-    root = load_xml(xml_filepath)
-    shank_channels = [
-        [int(channel.text) for channel in group.find("channels")]
-        for group in root.find("spikeDetection").find("channelGroups").findall("group")
-    ]
-    shank_channels = None
-
-    return shank_channels
+    return [list(group) for group in header.shank_channels]
 
 
 def get_lfp_sampling_rate(session_path: str, xml_filepath: Optional[str] = None):
@@ -153,18 +227,23 @@ def get_lfp_sampling_rate(session_path: str, xml_filepath: Optional[str] = None)
     fs: float
 
     """
-    if xml_filepath is None:
-        session_name = os.path.split(session_path)[1]
-        xml_filepath = os.path.join(session_path, session_name + ".xml")
+    return get_neuroscope_header(session_path=session_path, xml_filepath=xml_filepath).lfp_sampling_rate
 
-    assert os.path.isfile(xml_filepath), (
-        "No .xml file found at the path location!" "Unable to retrieve lfp_sampling_rate."
-    )
 
-    root = load_xml(xml_filepath)
-    lfp_sampling_rate = float(root.find("fieldPotentials").find("lfpSamplingRate").text)
+def get_n_channels(session_path: str, xml_filepath: Optional[str] = None):
+    """Read the total number of channels from the xml parameter file of the Neuroscope format.
+
+    Parameters
+    ----------
+    session_path: str
+    xml_filepath: None | str (optional)
 
-    return lfp_sampling_rate
+    Returns
+    -------
+    n_channels: int
+
+    """
+    return get_neuroscope_header(session_path=session_path, xml_filepath=xml_filepath).n_channels
 
 
 def add_position_data(
@@ -208,7 +287,48 @@ def add_position_data(
         )
 
 
-def read_spike_times(session_path: str, shankn: int, fs: float = 20000.0):
+def read_integer_text_file(file_path: str, cache_folder_path: OptionalPathType = None):
+    """Parse a whitespace separated text file of integers, such as the Neuroscope .res and .clu files.
+
+    Parameters
+    ----------
+    file_path: str | path
+    cache_folder_path: str | path, optional
+        If specified, the parsed values are saved to a .npy sidecar in this folder, keyed on the size and
+        modification time of the text file, and loaded from there on subsequent calls instead of re-parsing.
+
+    Returns
+    -------
+    np.ndarray(dtype=int64)
+    """
+    file_path = Path(file_path)
+    if cache_folder_path is not None:
+        file_stat = file_path.stat()
+        cache_file_path = Path(cache_folder_path) / f"{file_path.name}.{file_stat.st_size}_{file_stat.st_mtime_ns}.npy"
+        if cache_file_path.is_file():
+            return np.load(cache_file_path)
+
+    with open(file_path, mode="r") as file:
+        values = np.fromstring(file.read(), dtype=np.int64, sep=" ")
+
+    if cache_folder_path is not None:
+        try:
+            Path(cache_folder_path).mkdir(parents=True, exist_ok=True)
+            for stale_cache_file_path in Path(cache_folder_path).glob(f"{file_path.name}.*_*.npy"):
+                stale_cache_file_path.unlink()
+            temporary_file_path = cache_file_path.with_name(f"{cache_file_path.name}.{os.getpid()}.tmp")
+            with open(temporary_file_path, mode="wb") as file:
+                np.save(file, values)
+            os.replace(temporary_file_path, cache_file_path)
+        except OSError as exception:
+            warnings.warn(f"Unable to cache {file_path.name} in {cache_folder_path}: {exception}")
+
+    return values
+
+
+def read_spike_times(
+    session_path: str, shankn: int, fs: float = 20000.0, cache_folder_path: OptionalPathType = None
+):
     """Read .res files to get spike times.
 
     Parameters
@@ -218,19 +338,21 @@ def read_spike_times(session_path: str, shankn: int, fs: float = 20000.0):
         shank number (1-indexed)
     fs: float
         sampling rate. default = 20000.
+    cache_folder_path: str | path, optional
+        Folder for the parsed .npy sidecar; see read_integer_text_file.
 
     Returns
     -------
-    list(float)
+    np.ndarray(dtype=float)
     """
     _, session_name = os.path.split(session_path)
     timing_file = os.path.join(session_path, session_name + ".res." + str(shankn))
-    timing_df = pd.read_csv(timing_file, names=("time",))
+    spike_frames = read_integer_text_file(file_path=timing_file, cache_folder_path=cache_folder_path)
 
-    return timing_df.values.ravel() / fs
+    return spike_frames / fs
 
 
-def read_spike_clustering(session_path: str, shankn: int):
+def read_spike_clustering(session_path: str, shankn: int, cache_folder_path: OptionalPathType = None):
     """Read .clu files to get spike cluster assignments for a single shank.
 
     Parameters
@@ -238,6 +360,8 @@ def read_spike_clustering(session_path: str, shankn: int):
     session_path: str | path
     shankn: int
         shank number (1-indexed)
+    cache_folder_path: str | path, optional
+        Folder for the parsed .npy sidecar; see read_integer_text_file.
 
     Returns
     -------
@@ -246,15 +370,16 @@ def read_spike_clustering(session_path: str, shankn: int):
     """
     session_name = os.path.split(session_path)[1]
     id_file = os.path.join(session_path, session_name + ".clu." + str(shankn))
-    id_df = pd.read_csv(id_file, names=("id",))
+    spike_ids = read_integer_text_file(file_path=id_file, cache_folder_path=cache_folder_path)
     # The first number is the number of unique ids,
     # including 0 as an unsorted cluster and 1 as mult-unit activity
-    id_df = id_df[1:]
 
-    return id_df.values.ravel()
+    return spike_ids[1:]
 
 
-def get_clusters_single_shank(session_path: str, shankn: int, fs: float = 20000.0):
+def get_clusters_single_shank(
+    session_path: str, shankn: int, fs: float = 20000.0, cache_folder_path: OptionalPathType = None
+):
     """Read the spike time data for a from the .res and .clu files for a single shank.
 
     Automatically removes noise and multi-unit.
@@ -266,6 +391,8 @@ def get_clusters_single_shank(session_path: str, shankn: int, fs: float = 20000.
     shankn: int
         shank number (1-indexed)
     fs: float
+    cache_folder_path: str | path, optional
+        Folder for the parsed .npy sidecars; see read_integer_text_file.
 
     Returns
     -------
@@ -274,13 +401,11 @@ def get_clusters_single_shank(session_path: str, shankn: int, fs: float = 20000.
         indicates spike time.
 
     """
-    spike_times = read_spike_times(session_path, shankn, fs=fs)
-    spike_ids = read_spike_clustering(session_path, shankn)
-    df = pd.DataFrame({"id": spike_ids, "time": spike_times})
+    spike_times = read_spike_times(session_path, shankn, fs=fs, cache_folder_path=cache_folder_path)
+    spike_ids = read_spike_clustering(session_path, shankn, cache_folder_path=cache_folder_path)
     # id 0 is unsorted noise and 1 as mult-unit activity
-    noise_inds = ((df.iloc[:, 0] == 0) | (df.iloc[:, 0] == 1)).values.ravel()
-    df = df.loc[np.logical_not(noise_inds)].reset_index(drop=True)
-    df["id"] -= 2
+    keep = spike_ids > 1
+    df = pd.DataFrame({"id": spike_ids[keep] - 2, "time": spike_times[keep]})
 
     return df
 
@@ -350,70 +475,173 @@ def write_electrode_table(
 
     """
     fpath_base, fname = os.path.split(session_path)
+    custom_columns = custom_columns or []
 
     shank_channels = get_shank_channels(session_path)
     if max_shanks:
         shank_channels = shank_channels[:max_shanks]
-    nwbfile.add_electrode_column("shank_electrode_number", "1-indexed channel within a shank")
-    nwbfile.add_electrode_column("amp_channel", "order in which the channels were plugged into amp")
-    for custom_column in custom_columns:
-        nwbfile.add_electrode_column(custom_column["name"], custom_column["description"])
 
     device = nwbfile.create_device("implant", fname + ".xml")
-    for shankn, channels in enumerate(shank_channels):
-        shankn += 1
-        electrode_group = nwbfile.create_electrode_group(
+    electrode_groups = [
+        nwbfile.create_electrode_group(
             name="shank{}".format(shankn),
             description="shank{} electrodes".format(shankn),
             device=device,
             location="unknown",
         )
-        for shank_electrode_number, amp_channel in enumerate(channels):
-            if electrode_positions is not None:
-                pos = electrode_positions[amp_channel]
-            else:
-                pos = (np.nan, np.nan, np.nan)
-
-            if impedances is None:
-                imp = np.nan
-            else:
-                imp = impedances[amp_channel]
-
-            if locations is None:
-                location = "unknown"
-            else:
-                location = locations[amp_channel]
-
-            if filterings is None:
-                filtering = "unknown"
-            else:
-                filtering = filterings[amp_channel]
-
-            custom_data = {custom_col["name"]: custom_col["data"][amp_channel] for custom_col in custom_columns}
-
-            nwbfile.add_electrode(
-                float(pos[0]),
-                float(pos[1]),
-                float(pos[2]),
-                imp=imp,
-                location=location,
-                filtering=filtering,
-                group=electrode_group,
-                amp_channel=amp_channel,
-                shank_electrode_number=shank_electrode_number,
-                **custom_data,
+        for shankn in range(1, len(shank_channels) + 1)
+    ]
+
+    # Build every column in one pass over the flattened (shank, channel) layout
+    amp_channels = np.concatenate(shank_channels).astype(int)
+    shank_electrode_numbers = np.concatenate([np.arange(len(channels)) for channels in shank_channels]).astype(int)
+    groups = [group for group, channels in zip(electrode_groups, shank_channels) for _ in channels]
+    n_electrodes = len(amp_channels)
+
+    if electrode_positions is not None:
+        positions = np.asarray(electrode_positions, dtype=float)[amp_channels, :3]
+    else:
+        positions = np.full((n_electrodes, 3), np.nan)
+    imp = np.full(n_electrodes, np.nan) if impedances is None else np.asarray(impedances)[amp_channels]
+    location = ["unknown"] * n_electrodes if locations is None else list(np.asarray(locations)[amp_channels])
+    filtering = ["unknown"] * n_electrodes if filterings is None else list(np.asarray(filterings)[amp_channels])
+
+    column_data = [
+        ("x", "the x coordinate of the channel location", positions[:, 0]),
+        ("y", "the y coordinate of the channel location", positions[:, 1]),
+        ("z", "the z coordinate of the channel location", positions[:, 2]),
+        ("imp", "the impedance of the channel", imp),
+        ("location", "the location of channel within the subject e.g. brain region", location),
+        ("filtering", "description of hardware filtering", filtering),
+        ("group", "a reference to the ElectrodeGroup this electrode is a part of", groups),
+        ("group_name", "the name of the ElectrodeGroup this electrode is a part of", [x.name for x in groups]),
+        ("shank_electrode_number", "1-indexed channel within a shank", shank_electrode_numbers),
+        ("amp_channel", "order in which the channels were plugged into amp", amp_channels),
+    ]
+    column_data.extend(
+        (custom_column["name"], custom_column["description"], np.asarray(custom_column["data"])[amp_channels])
+        for custom_column in custom_columns
+    )
+
+    assert nwbfile.electrodes is None, "The electrode table of this NWBFile has already been written!"
+    electrode_table = ElectrodeTable()
+    nwbfile.electrodes = electrode_table
+    electrode_table.id.data.extend(range(n_electrodes))
+    for name, description, data in column_data:
+        if name in electrode_table.colnames:  # Predefined by pynwb, but still empty
+            electrode_table[name].data.extend(data)
+        else:
+            electrode_table.add_column(name=name, description=description, data=data)
+
+
+class NeuroscopeBinaryData:
+    """Lazy (frames, channels) view of an interleaved Neuroscope binary file (.eeg, .lfp, .dat) backed by np.memmap.
+
+    Indexing only reads the requested frames and channels from disk, so the view can be handed to writers and
+    band analysis routines without ever holding the entire recording in memory.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        n_channels: int,
+        channels: Optional[ArrayLike] = None,
+        max_frames: Optional[int] = None,
+        dtype: str = "int16",
+    ):
+        """
+        Parameters
+        ----------
+        file_path: str
+            Path to the binary file.
+        n_channels: int
+            Total number of interleaved channels stored in the file, as listed in the xml header.
+        channels: array-like(dtype=int), optional
+            Subset of channels exposed by this view. Defaults to all channels.
+        max_frames: int, optional
+            Truncate the view to at most this many frames.
+        dtype: str, optional
+            Sample data type. Default is 'int16'.
+        """
+        self.file_path = str(file_path)
+        self.n_channels = n_channels
+        self.max_frames = max_frames
+        itemsize = np.dtype(dtype).itemsize
+        file_size = os.path.getsize(self.file_path)
+        n_frames = file_size // (itemsize * n_channels)
+        if file_size % (itemsize * n_channels):
+            warnings.warn(
+                f"Size of {self.file_path} is not a multiple of {n_channels} channels; "
+                f"truncating to {n_frames} complete frames."
             )
+        if max_frames is not None:
+            n_frames = min(n_frames, max_frames)
+        self.memmap = np.memmap(self.file_path, dtype=dtype, mode="r", shape=(n_frames, n_channels))
+        all_channels = np.arange(n_channels)
+        self.channels = all_channels if channels is None else all_channels[channels]
+
+    @property
+    def shape(self):
+        return (self.memmap.shape[0], len(self.channels))
+
+    @property
+    def dtype(self):
+        return self.memmap.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return self.memmap.shape[0]
+
+    def __getitem__(self, item):
+        if not isinstance(item, tuple):
+            item = (item, slice(None))
+        frames, channels = item
+        channels = self.channels[channels]
+        if isinstance(channels, np.ndarray) and len(channels) == self.n_channels and np.all(np.diff(channels) == 1):
+            return np.asarray(self.memmap[frames])
+        return np.asarray(self.memmap[frames][..., channels])
+
+    def __array__(self, dtype=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype)
+
+    def subset(self, channels: ArrayLike):
+        """Return a new lazy view restricted to the given channels of this view, without reading any data.
+
+        Raises an IndexError if any of the channels are out of range.
+        """
+        return NeuroscopeBinaryData(
+            file_path=self.file_path,
+            n_channels=self.n_channels,
+            channels=self.channels[channels],
+            max_frames=self.max_frames,
+            dtype=self.dtype,
+        )
 
 
-def read_lfp(session_path: str, n_channels: int, stub: bool = False):
+def read_lfp(
+    session_path: str,
+    n_channels: Optional[int] = None,
+    stub: bool = False,
+    channels: Optional[ArrayLike] = None,
+):
     """Read LFP data from Neuroscope eeg file.
 
+    The data is not loaded into memory; a lazy (frames, channels) memory-mapped view is returned instead.
+
     Parameters
     ----------
     session_path: str
+    n_channels: int, optional
+        Total number of channels in the file. Defaults to the nChannels in the xml header.
     stub: bool, optional
         Default is False. If True, don't read full LFP, but instead a
         truncated version of at most size (50, n_channels)
+    channels: array-like(dtype=int), optional
+        Subset of channels to expose. Defaults to all channels.
 
     Returns
     -------
@@ -423,6 +651,8 @@ def read_lfp(session_path: str, n_channels: int, stub: bool = False):
     eeg_filepath = os.path.join(session_path, "{}.eeg".format(fname))
     lfp_filepath = os.path.join(session_path, "{}.lfp".format(fname))
     lfp_fs = get_lfp_sampling_rate(session_path)
+    if n_channels is None:
+        n_channels = get_n_channels(session_path)
 
     assert os.path.isfile(eeg_filepath) or os.path.isfile(
         lfp_filepath
@@ -433,23 +663,96 @@ def read_lfp(session_path: str, n_channels: int, stub: bool = False):
     else:
         filepath = lfp_filepath
 
-    if stub:
-        max_size = 50
-        all_channels_data = np.fromfile(filepath, dtype=np.int16, count=max_size * n_channels).reshape(-1, n_channels)
-    else:
-        data = np.fromfile(filepath, dtype=np.int16)
-        cont = True
-        while cont:
-            try:
-                all_channels_data = data.reshape(-1, n_channels)
-                cont = False
-            except:
-                cont = True
-                n_channels -= 1
+    max_frames = 50 if stub else None
+    all_channels_data = NeuroscopeBinaryData(
+        file_path=filepath, n_channels=n_channels, channels=channels, max_frames=max_frames
+    )
 
     return lfp_fs, all_channels_data
 
 
+class ElectricalSeriesChunkIterator(AbstractDataChunkIterator):
+    """Iterate over a (frames, ...) array in blocks of consecutive frames spanning every other axis.
+
+    Each block holds as many frames as fit in the buffer_gb byte budget, rounded down to a whole number of HDF5
+    chunks so that every write fills complete chunks. The chunk shape and compression follow get_chunk_advice for
+    the given access profile. Progress is reported once per block.
+    """
+
+    def __init__(
+        self,
+        data: ArrayLike,
+        buffer_gb: float = 1.0,
+        chunk_mb: Optional[float] = None,
+        access: str = TIME_SLICE,
+        display_progress: bool = True,
+        progress_bar_options: Optional[dict] = None,
+    ):
+        """
+        Parameters
+        ----------
+        data: array-like
+            (frames, channels) array, e.g. an np.memmap or a NeuroscopeBinaryData view; any trailing axes
+            (such as the samples of a spike waveform) are kept whole in every block.
+        buffer_gb: float, optional
+            Maximum size of each block read from data and passed to the backend. Default is 1 GB.
+        chunk_mb: float, optional
+            Target size of each HDF5 chunk in MiB. Defaults to that of the access profile.
+        access: str, optional
+            'time_slice' (default), 'per_channel' or 'per_spike'; see get_chunk_advice.
+        display_progress: bool, optional
+            Show a progress bar that advances once per block. Default is True.
+        progress_bar_options: dict, optional
+            Keyword arguments passed to tqdm.
+        """
+        self.data = data
+        n_frames = data.shape[0]
+        bytes_per_frame = int(np.prod(data.shape[1:])) * np.dtype(data.dtype).itemsize
+        self.chunk_advice = get_chunk_advice(shape=data.shape, dtype=data.dtype, access=access, chunk_mb=chunk_mb)
+        chunk_frames = self.chunk_advice.chunk_shape[0]
+        buffer_frames = max(chunk_frames, int(buffer_gb * 1e9 // bytes_per_frame) // chunk_frames * chunk_frames)
+        self.chunk_shape = self.chunk_advice.chunk_shape
+        self.buffer_frames = buffer_frames
+        self._frame = 0
+
+        self.progress_bar = None
+        if display_progress:
+            progress_bar_options = progress_bar_options or dict(desc="writing lfp data")
+            self.progress_bar = tqdm(total=int(np.ceil(n_frames / buffer_frames)), **progress_bar_options)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        n_frames = self.data.shape[0]
+        if self._frame >= n_frames:
+            if self.progress_bar is not None:
+                self.progress_bar.close()
+            raise StopIteration
+        start = self._frame
+        stop = min(start + self.buffer_frames, n_frames)
+        self._frame = stop
+        selection = (slice(start, stop),) + tuple(slice(0, length) for length in self.data.shape[1:])
+        data_chunk = DataChunk(data=np.asarray(self.data[start:stop]), selection=selection)
+        if self.progress_bar is not None:
+            self.progress_bar.update(1)
+        return data_chunk
+
+    def recommended_chunk_shape(self):
+        return self.chunk_shape
+
+    def recommended_data_shape(self):
+        return self.maxshape
+
+    @property
+    def dtype(self):
+        return np.dtype(self.data.dtype)
+
+    @property
+    def maxshape(self):
+        return tuple(self.data.shape)
+
+
 def write_lfp(
     nwbfile: NWBFile,
     data: ArrayLike,
@@ -457,6 +760,8 @@ def write_lfp(
     electrode_inds: Optional[List[int]] = None,
     name: Optional[str] = "LFP",
     description: Optional[str] = "local field potential signal",
+    iterator_opts: Optional[dict] = None,
+    n_jobs: int = 1,
 ):
     """
     Add LFP from neuroscope to a "ecephys" processing module of an NWBFile.
@@ -469,6 +774,11 @@ def write_lfp(
     electrode_inds: list(int), optional
     name: str, optional
     description: str, optional
+    iterator_opts: dict, optional
+        Keyword arguments passed to ElectricalSeriesChunkIterator, e.g. buffer_gb, chunk_mb or access.
+    n_jobs: int, optional
+        Number of threads used to gzip the data. If not 1, chunks are compressed in parallel and written
+        pre-compressed; the result is identical to the single-threaded gzip filter. Default is 1.
 
     Returns
     -------
@@ -482,10 +792,15 @@ def write_lfp(
             electrode_inds = list(range(len(nwbfile.electrodes.id.data[:])))
 
     table_region = nwbfile.create_electrode_table_region(electrode_inds, "electrode table reference")
-    data = H5DataIO(
-        DataChunkIterator(tqdm(data, desc="writing lfp data"), buffer_size=int(fs * 3600)),
-        compression="gzip",
-    )
+    iterator_opts = iterator_opts or dict()
+    data_chunk_iterator = ElectricalSeriesChunkIterator(data=data, **iterator_opts)
+    compression_opts = data_chunk_iterator.chunk_advice.compression_opts
+    if n_jobs == 1:
+        data = H5DataIO(data_chunk_iterator, compression="gzip", compression_opts=compression_opts)
+    else:
+        data = parallel_gzip_data_io(
+            data_chunk_iterator=data_chunk_iterator, n_jobs=n_jobs, compression_opts=compression_opts
+        )
     lfp_electrical_series = ElectricalSeries(
         name=name,
         description=description,
@@ -528,14 +843,67 @@ def add_lfp(
         features without the time-intensive data read step.
 
     """
-    fs, data = read_lfp(session_path, stub=stub)
     shank_channels = get_shank_channels(session_path)
     all_shank_channels = np.concatenate(shank_channels)
-    write_lfp(nwbfile, data[:, all_shank_channels], fs, name, description)
+    fs, data = read_lfp(session_path, stub=stub, channels=all_shank_channels)
+    write_lfp(nwbfile, data, fs, name=name, description=description)
 
 
-def get_events(session_path: str, suffixes: Iterable[int] = None):
-    """Retrieve event information from Neuroscope evt files.
+@dataclass(frozen=True)
+class NeuroscopeEvents:
+    """Parsed contents of a single Neuroscope .evt file.
+
+    The arrays are shared between every caller of read_events and are therefore read-only.
+    """
+
+    name: str
+    timestamps: np.ndarray
+    description_codes: np.ndarray
+    description_categories: np.ndarray
+
+    @property
+    def descriptions(self):
+        return self.description_categories[self.description_codes]
+
+    def to_annotation_series(self):
+        return AnnotationSeries(name=self.name, data=self.descriptions, timestamps=self.timestamps)
+
+
+@lru_cache(maxsize=None)
+def _read_event_file(evt_file: str, st_mtime_ns: int, st_size: int):
+    """Parse a .evt file; the file modification time and size are only part of the cache key."""
+    parts = os.path.split(evt_file)[1].split(".")
+    if parts[-1] == "evt":
+        name = ".".join(parts[1:-1])
+    else:
+        name = parts[-1]
+
+    df = pd.read_csv(
+        evt_file,
+        sep="\t",
+        names=("time", "desc"),
+        dtype=dict(time=np.float64, desc="category"),
+        keep_default_na=False,
+    )
+    timestamps = df["time"].values / 1000
+    description_codes = df["desc"].cat.codes.values
+    description_categories = np.asarray(df["desc"].cat.categories, dtype=str)
+    for array in (timestamps, description_codes, description_categories):
+        array.flags.writeable = False
+
+    return NeuroscopeEvents(
+        name=name,
+        timestamps=timestamps,
+        description_codes=description_codes,
+        description_categories=description_categories,
+    )
+
+
+def read_events(session_path: str, suffixes: Iterable[str] = None):
+    """Read all Neuroscope evt files of a session.
+
+    Each file is parsed once per process (keyed on its path, size and modification time) and shared by every
+    subsequent call, so get_events and write_events can both be used on a session without re-reading it.
 
     Parameters
     ----------
@@ -543,6 +911,10 @@ def get_events(session_path: str, suffixes: Iterable[int] = None):
     suffixes: Iterable(str), optional
         The 3-letter names for the events to write. If None, detect all in session_path
 
+    Returns
+    -------
+    list(NeuroscopeEvents), list(str)
+        The non-empty events, and the paths of any requested evt files that were not found.
     """
     session_name = os.path.split(session_path)[1]
 
@@ -553,25 +925,37 @@ def get_events(session_path: str, suffixes: Iterable[int] = None):
     else:
         evt_files = [os.path.join(session_path, session_name + s) for s in suffixes]
 
-    out = []
+    all_events = []
+    missing_evt_files = []
     for evt_file in evt_files:
-        parts = os.path.split(evt_file)[1].split(".")
-        if parts[-1] == "evt":
-            name = ".".join(parts[1:-1])
-        else:
-            name = parts[-1]
         if os.path.isfile(evt_file):
-            df = pd.read_csv(evt_file, sep="\t", names=("time", "desc"))
-            if len(df):
-                timestamps = df.values[:, 0].astype(float) / 1000
-                data = df["desc"].values
-                annotation_series = AnnotationSeries(name=name, data=data, timestamps=timestamps)
-                out.append(annotation_series)
+            evt_file = os.path.abspath(evt_file)
+            evt_stat = os.stat(evt_file)
+            events = _read_event_file(evt_file, evt_stat.st_mtime_ns, evt_stat.st_size)
+            if len(events.timestamps):
+                all_events.append(events)
         else:
-            print("Warning: No .evt file found at the path location!" "Unable to retrieve annotation_series.")
-            out = None
+            missing_evt_files.append(evt_file)
 
-    return out
+    return all_events, missing_evt_files
+
+
+def get_events(session_path: str, suffixes: Iterable[str] = None):
+    """Retrieve event information from Neuroscope evt files.
+
+    Parameters
+    ----------
+    session_path: str
+    suffixes: Iterable(str), optional
+        The 3-letter names for the events to write. If None, detect all in session_path
+
+    """
+    all_events, missing_evt_files = read_events(session_path=session_path, suffixes=suffixes)
+    if missing_evt_files:
+        print("Warning: No .evt file found at the path location!" "Unable to retrieve annotation_series.")
+        return None
+
+    return [events.to_annotation_series() for events in all_events]
 
 
 def write_events(nwbfile: NWBFile, session_path: str, suffixes: Iterable[str], module=None):
@@ -586,31 +970,13 @@ def write_events(nwbfile: NWBFile, session_path: str, suffixes: Iterable[str], m
     module: pynwb.processing_module
 
     """
-    session_name = os.path.split(session_path)[1]
-
-    if suffixes is None:
-        evt_files = glob(os.path.join(session_path, session_name) + ".evt.*") + glob(
-            os.path.join(session_path, session_name) + ".*.evt"
-        )
-    else:
-        evt_files = [os.path.join(session_path, session_name + s) for s in suffixes]
+    all_events, missing_evt_files = read_events(session_path=session_path, suffixes=suffixes)
     if module is None:
         module = check_module(nwbfile, "events")
-    for evt_file in evt_files:
-        parts = os.path.split(evt_file)[1].split(".")
-        if parts[-1] == "evt":
-            name = ".".join(parts[1:-1])
-        else:
-            name = parts[-1]
-        if os.path.isfile(evt_file):
-            df = pd.read_csv(evt_file, sep="\t", names=("time", "desc"))
-            if len(df):
-                timestamps = df.values[:, 0].astype(float) / 1000
-                data = df["desc"].values
-                annotation_series = AnnotationSeries(name=name, data=data, timestamps=timestamps)
-                module.add_data_interface(annotation_series)
-        else:
-            print("Warning: No .evt file found at the path location!" "Unable to write annotation_series.")
+    for events in all_events:
+        module.add_data_interface(events.to_annotation_series())
+    for _ in missing_evt_files:
+        print("Warning: No .evt file found at the path location!" "Unable to write annotation_series.")
 
 
 def write_spike_waveforms(
@@ -620,6 +986,8 @@ def write_spike_waveforms(
     shank_channels: ArrayLike,
     stub_test: bool = False,
     compression: Optional[str] = "gzip",
+    n_jobs: int = 1,
+    buffer_gb: float = 1.0,
 ):
     """Write spike waveforms to NWBFile.
 
@@ -633,10 +1001,36 @@ def write_spike_waveforms(
         default: False
     compression: str (optional)
         default: 'gzip'
+    n_jobs: int (optional)
+        Number of threads used for gzip compression. If not 1, up to n_jobs shanks are compressed concurrently,
+        sharing the threads and the buffer_gb memory budget. default: 1
+    buffer_gb: float (optional)
+        Total amount of waveform data held in memory at a time. default: 1.0
     """
-    for shankn in range(1, len(shank_channels) + 1):
-        try:
-            write_spike_waveforms_single_shank(
+    shankns = range(1, len(shank_channels) + 1)
+    if compression != "gzip" or n_jobs == 1:
+        for shankn in shankns:
+            try:
+                write_spike_waveforms_single_shank(
+                    nwbfile=nwbfile,
+                    session_path=session_path,
+                    shankn=shankn,
+                    spikes_nsamples=spikes_nsamples,
+                    nchan_on_shank=len(shank_channels[shankn - 1]),
+                    stub_test=stub_test,
+                    compression=compression,
+                    buffer_gb=buffer_gb,
+                )
+            except (FileNotFoundError, OSError) as exception:
+                warnings.warn(f"Unable to read the waveforms of shank{shankn} - skipping: {exception}")
+        return
+
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    n_shank_jobs = min(n_jobs, len(shankns))
+    with ThreadPoolExecutor(max_workers=n_shank_jobs) as executor:
+        futures = {
+            shankn: executor.submit(
+                get_spike_waveforms_single_shank,
                 nwbfile=nwbfile,
                 session_path=session_path,
                 shankn=shankn,
@@ -644,12 +1038,20 @@ def write_spike_waveforms(
                 nchan_on_shank=len(shank_channels[shankn - 1]),
                 stub_test=stub_test,
                 compression=compression,
+                n_jobs=max(1, n_jobs // n_shank_jobs),
+                buffer_gb=buffer_gb / n_shank_jobs / 2,  # Each shank holds up to two blocks while compressing
             )
-        except:
-            print(f"\nError finding waveforms for shank{shankn} - skipping")
+            for shankn in shankns
+        }
+    # Add in shank order from the main thread so the module contents are deterministic
+    for shankn, future in futures.items():
+        try:
+            check_module(nwbfile, "ecephys").add_data_interface(future.result())
+        except (FileNotFoundError, OSError) as exception:
+            warnings.warn(f"Unable to read the waveforms of shank{shankn} - skipping: {exception}")
 
 
-def write_spike_waveforms_single_shank(
+def get_spike_waveforms_single_shank(
     nwbfile: NWBFile,
     session_path: str,
     shankn: int,
@@ -657,8 +1059,13 @@ def write_spike_waveforms_single_shank(
     nchan_on_shank: int,
     stub_test: bool = False,
     compression: Optional[str] = "gzip",
+    n_jobs: int = 1,
+    buffer_gb: float = 1.0,
 ):
-    """Write spike waveforms to NWBFile.
+    """Create a SpikeEventSeries that streams the waveforms of a single shank from its .spk file.
+
+    The .spk file is memory-mapped and written in blocks along the spike axis, with each HDF5 chunk holding
+    whole spikes (the 'per_spike' chunk advice), so the waveforms are never loaded into memory at once.
 
     Parameters
     ----------
@@ -671,6 +1078,14 @@ def write_spike_waveforms_single_shank(
         default: False
     compression: str (optional)
         default: 'gzip'
+    n_jobs: int (optional)
+        Number of threads used for gzip compression; only applies when compression is 'gzip'. default: 1
+    buffer_gb: float (optional)
+        Maximum size of each block of waveforms read from the .spk file. default: 1.0
+
+    Returns
+    -------
+    SpikeEventSeries
     """
     session_name = os.path.split(session_path)[1]
     spk_file = os.path.join(session_path, session_name + ".spk.{}".format(shankn))
@@ -683,22 +1098,26 @@ def write_spike_waveforms_single_shank(
     elec_idx = list(np.where(np.array(nwbfile.ec_electrodes["group"]) == group)[0])
     table_region = nwbfile.create_electrode_table_region(elec_idx, group.name + " region")
 
+    n_spikes = os.path.getsize(spk_file) // (np.dtype(np.int16).itemsize * spikes_nsamples * nchan_on_shank)
+    spks = np.memmap(spk_file, dtype=np.int16, mode="r", shape=(n_spikes, spikes_nsamples, nchan_on_shank))
+    spk_times = read_spike_times(session_path, shankn)
     if stub_test:
         n_stub_spikes = 50
-        spks = np.fromfile(
-            spk_file,
-            dtype=np.int16,
-            count=n_stub_spikes * spikes_nsamples * nchan_on_shank,
-        ).reshape(n_stub_spikes, spikes_nsamples, nchan_on_shank)
-        spk_times = read_spike_times(session_path, shankn)[:n_stub_spikes]
-    else:
-        spks = np.fromfile(spk_file, dtype=np.int16).reshape(-1, spikes_nsamples, nchan_on_shank)
-        spk_times = read_spike_times(session_path, shankn)
+        spks = spks[:n_stub_spikes]
+        spk_times = spk_times[:n_stub_spikes]
 
-    if compression:
-        data = H5DataIO(spks, compression=compression)
+    data_chunk_iterator = ElectricalSeriesChunkIterator(
+        data=spks, buffer_gb=buffer_gb, access=PER_SPIKE, display_progress=False
+    )
+    compression_opts = data_chunk_iterator.chunk_advice.compression_opts if compression == "gzip" else None
+    if compression == "gzip" and n_jobs != 1:
+        data = parallel_gzip_data_io(
+            data_chunk_iterator=data_chunk_iterator, n_jobs=n_jobs, compression_opts=compression_opts
+        )
+    elif compression:
+        data = H5DataIO(data_chunk_iterator, compression=compression, compression_opts=compression_opts)
     else:
-        data = spks
+        data = data_chunk_iterator
 
     spike_event_series = SpikeEventSeries(
         name="SpikeWaveforms{}".format(shankn),
@@ -707,6 +1126,50 @@ def write_spike_waveforms_single_shank(
         conversion=1e-6,
         electrodes=table_region,
     )
+
+    return spike_event_series
+
+
+def write_spike_waveforms_single_shank(
+    nwbfile: NWBFile,
+    session_path: str,
+    shankn: int,
+    spikes_nsamples: int,
+    nchan_on_shank: int,
+    stub_test: bool = False,
+    compression: Optional[str] = "gzip",
+    n_jobs: int = 1,
+    buffer_gb: float = 1.0,
+):
+    """Write spike waveforms to NWBFile.
+
+    Parameters
+    ----------
+    nwbfile: pynwb.NWBFile
+    session_path: str
+    shankn: int
+    spikes_nsamples: int
+    nchan_on_shank: int
+    stub_test: bool, optional
+        default: False
+    compression: str (optional)
+        default: 'gzip'
+    n_jobs: int (optional)
+        Number of threads used for gzip compression; only applies when compression is 'gzip'. default: 1
+    buffer_gb: float (optional)
+        Maximum size of each block of waveforms read from the .spk file. default: 1.0
+    """
+    spike_event_series = get_spike_waveforms_single_shank(
+        nwbfile=nwbfile,
+        session_path=session_path,
+        shankn=shankn,
+        spikes_nsamples=spikes_nsamples,
+        nchan_on_shank=nchan_on_shank,
+        stub_test=stub_test,
+        compression=compression,
+        n_jobs=n_jobs,
+        buffer_gb=buffer_gb,
+    )
     check_module(nwbfile, "ecephys").add_data_interface(spike_event_series)
 
 
@@ -715,9 +1178,12 @@ def add_units(
     session_path: str,
     custom_cols: Optional[List[dict]] = None,
     max_shanks: Optional[int] = 8,
+    cache_folder_path: OptionalPathType = None,
 ):
     """Add the spiking unit information to the NWBFile.
 
+    The units table must not have been written yet. A session without any spikes leaves the NWBFile unchanged.
+
     Parameters
     ----------
     nwbfile: pynwb.NWBFile
@@ -726,24 +1192,52 @@ def add_units(
         [{name, description, data, kwargs}]
     max_shanks: int, optional
         only take the first <max_shanks> channel groups
+    cache_folder_path: str | path, optional
+        Folder for the parsed .res/.clu sidecars; see read_integer_text_file.
 
     Returns
     -------
     nwbfile
     """
-    nwbfile.add_unit_column("shank_id", "0-indexed id of cluster of shank")
+    assert nwbfile.units is None, "The units table of this NWBFile has already been written!"
     nshanks = len(get_shank_channels(session_path))
     nshanks = min((max_shanks, nshanks))
 
+    all_shankns, all_ids, all_times = [], [], []
     for shankn in range(1, nshanks + 1):
-        df = get_clusters_single_shank(session_path, shankn)
-        electrode_group = nwbfile.electrode_groups["shank" + str(shankn)]
-        for shank_id, idf in df.groupby("id"):
-            nwbfile.add_unit(
-                spike_times=idf["time"].values,
-                shank_id=shank_id,
-                electrode_group=electrode_group,
-            )
+        df = get_clusters_single_shank(session_path, shankn, cache_folder_path=cache_folder_path)
+        all_shankns.append(np.full(len(df), shankn))
+        all_ids.append(df["id"].values)
+        all_times.append(df["time"].values)
+    if not any(len(shank_times) for shank_times in all_times):  # No shanks, or no spikes on any of them
+        return nwbfile
+    all_shankns = np.concatenate(all_shankns)
+    all_ids = np.concatenate(all_ids)
+    all_times = np.concatenate(all_times)
+
+    # A stable sort by (shank, cluster id) keeps the spikes of each unit in their original order
+    unit_keys = all_shankns * (all_ids.max(initial=0) + 1) + all_ids
+    spike_order = np.argsort(unit_keys, kind="stable")
+    sorted_unit_keys = unit_keys[spike_order]
+    unique_unit_keys, unit_starts = np.unique(sorted_unit_keys, return_index=True)
+    spike_times_index = np.searchsorted(sorted_unit_keys, unique_unit_keys, side="right")
+    unit_shankns = all_shankns[spike_order][unit_starts]
+    unit_ids = all_ids[spike_order][unit_starts]
+
+    spike_times = VectorData(
+        name="spike_times", description="the spike times for each unit", data=all_times[spike_order]
+    )
+    columns = [
+        spike_times,
+        VectorIndex(name="spike_times_index", data=spike_times_index, target=spike_times),
+        VectorData(name="shank_id", description="0-indexed id of cluster of shank", data=unit_ids),
+        VectorData(
+            name="electrode_group",
+            description="the electrode group that each spike unit came from",
+            data=[nwbfile.electrode_groups["shank" + str(shankn)] for shankn in unit_shankns],
+        ),
+    ]
+    nwbfile.units = Units(name="units", description="Autogenerated by neuroscope.add_units", columns=columns)
 
     if custom_cols:
         [nwbfile.add_unit_column(**x) for x in custom_cols]
@@ -0,0 +1,204 @@
+"""Parallel gzip compression of chunked HDF5 datasets through direct chunk writes."""
+import os
+import zlib
+import weakref
+import tempfile
+from itertools import product
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import h5py
+import numpy as np
+from hdmf.backends.hdf5.h5_utils import H5DataIO
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
+
+_staged_data_ios = weakref.WeakSet()
+_scratch_folder_path = None
+
+
+def compress_chunk(chunk: np.ndarray, compression_opts: int = 4) -> bytes:
+    """Compress a single chunk exactly as the HDF5 deflate filter would."""
+    return zlib.compress(np.ascontiguousarray(chunk).tobytes(), compression_opts)
+
+
+def iter_chunks(data_chunk: DataChunk, chunk_shape: tuple):
+    """Split a chunk-aligned DataChunk into (offset, chunk) pairs in C order.
+
+    Edge chunks are zero-padded to the full chunk shape, matching the default HDF5 fill value.
+    """
+    block = np.asarray(data_chunk.data)
+    selection = data_chunk.selection if isinstance(data_chunk.selection, tuple) else (data_chunk.selection,)
+    starts = [axis_selection.start or 0 for axis_selection in selection]
+    starts.extend([0] * (block.ndim - len(starts)))
+    if any(start % length for start, length in zip(starts, chunk_shape)):
+        raise ValueError(f"Selection {data_chunk.selection} is not aligned to the chunk shape {chunk_shape}!")
+
+    axis_offsets = [range(0, block.shape[axis], chunk_shape[axis]) for axis in range(block.ndim)]
+    for local_offset in product(*axis_offsets):
+        chunk = block[tuple(slice(offset, offset + length) for offset, length in zip(local_offset, chunk_shape))]
+        if chunk.shape != tuple(chunk_shape):
+            padded_chunk = np.zeros(shape=chunk_shape, dtype=block.dtype)
+            padded_chunk[tuple(slice(0, length) for length in chunk.shape)] = chunk
+            chunk = padded_chunk
+        yield tuple(start + offset for start, offset in zip(starts, local_offset)), chunk
+
+
+def write_gzip_chunks(
+    dataset: h5py.Dataset,
+    data_chunk_iterator: AbstractDataChunkIterator,
+    n_jobs: int = -1,
+    compression_opts: int = 4,
+):
+    """Fill a gzip-filtered h5py dataset from a chunk-aligned iterator, compressing in a thread pool.
+
+    Chunks are written in order with write_direct_chunk, so the HDF5 library never recompresses them. Compression
+    of one block overlaps with reading the next, so at most two blocks are held in memory at a time.
+
+    Parameters
+    ----------
+    dataset: h5py.Dataset
+        Chunked dataset created with compression="gzip" and the same compression_opts.
+    data_chunk_iterator: AbstractDataChunkIterator
+        Iterator whose DataChunk selections start on chunk boundaries.
+    n_jobs: int, optional
+        Number of compression threads. The default of -1 uses all available cores.
+    compression_opts: int, optional
+        Deflate level. Default is 4, the h5py default.
+    """
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    chunk_shape = dataset.chunks
+
+    def write_block(offsets, futures):
+        for offset, future in zip(offsets, futures):
+            dataset.id.write_direct_chunk(offset, future.result(), filter_mask=0)
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        pending_block = None
+        for data_chunk in data_chunk_iterator:
+            offsets, futures = [], []
+            for offset, chunk in iter_chunks(data_chunk=data_chunk, chunk_shape=chunk_shape):
+                offsets.append(offset)
+                futures.append(executor.submit(compress_chunk, chunk, compression_opts))
+            if pending_block is not None:
+                write_block(*pending_block)
+            pending_block = (offsets, futures)
+        if pending_block is not None:
+            write_block(*pending_block)
+
+
+def _close_staging_file(staging_file: h5py.File, staging_file_path: str):
+    staging_file.close()
+    try:
+        os.remove(staging_file_path)
+    except FileNotFoundError:  # Already unlinked while open
+        pass
+
+
+class StagedH5DataIO(H5DataIO):
+    """H5DataIO copying a dataset out of a staging file, which is closed and deleted by close_staging_file.
+
+    The staging file is also released if this object is garbage collected before that, e.g. with its NWBFile.
+    """
+
+    def __init__(self, dataset: h5py.Dataset, staging_file_path: str):
+        super().__init__(data=dataset, link_data=False)
+        self.staging_file_path = staging_file_path
+        self._finalizer = weakref.finalize(self, _close_staging_file, dataset.file, staging_file_path)
+        _staged_data_ios.add(self)
+
+    def close_staging_file(self):
+        """Close and delete the staging file. Only call this once the NWBFile holding the data has been written."""
+        self._finalizer()
+        _staged_data_ios.discard(self)
+
+
+def close_staging_files():
+    """Close and delete the staging files of every StagedH5DataIO still open in this process."""
+    for data_io in list(_staged_data_ios):
+        data_io.close_staging_file()
+
+
+@contextmanager
+def staged_compression(scratch_folder_path: Optional[str] = None):
+    """Release the staging files of parallel_gzip_data_io calls made within the block when it exits.
+
+    The NWBFile holding the data must be written before the block exits, e.g. by wrapping the whole conversion.
+
+    Parameters
+    ----------
+    scratch_folder_path: str, optional
+        Default folder for the staging files created within the block, typically that of the output file so the
+        compressed data is not held in a possibly small system temporary folder. Defaults to that of the enclosing
+        block, if any.
+    """
+    global _scratch_folder_path
+    previous_scratch_folder_path = _scratch_folder_path
+    previous_data_ios = set(_staged_data_ios)
+    if scratch_folder_path is not None:
+        _scratch_folder_path = str(scratch_folder_path)
+    try:
+        yield
+    finally:
+        _scratch_folder_path = previous_scratch_folder_path
+        for data_io in list(_staged_data_ios):
+            if data_io not in previous_data_ios:
+                data_io.close_staging_file()
+
+
+def parallel_gzip_data_io(
+    data_chunk_iterator: AbstractDataChunkIterator,
+    n_jobs: int = -1,
+    compression_opts: int = 4,
+    scratch_folder_path: Optional[str] = None,
+) -> StagedH5DataIO:
+    """Compress an iterator in parallel into a staging dataset and wrap it for copying into an NWBFile.
+
+    When the NWBFile is written, HDF5 copies the staged chunks without decompressing them, so the result is
+    identical to writing H5DataIO(..., compression="gzip") but without single-threaded compression.
+
+    The staging file stays open until the NWBFile is written. It is released when the enclosing staged_compression
+    block exits, when close_staging_file is called on the result, or at the latest when the result is garbage
+    collected.
+
+    Parameters
+    ----------
+    data_chunk_iterator: AbstractDataChunkIterator
+        Iterator whose DataChunk selections start on chunk boundaries, such as ElectricalSeriesChunkIterator.
+    n_jobs: int, optional
+        Number of compression threads. The default of -1 uses all available cores.
+    compression_opts: int, optional
+        Deflate level. Default is 4, the h5py default.
+    scratch_folder_path: str, optional
+        Folder for the staging file. Defaults to that of the enclosing staged_compression block, or else the system
+        temporary folder. The staging file holds the compressed data only and is unlinked right away where the OS
+        allows it.
+
+    Returns
+    -------
+    StagedH5DataIO
+    """
+    scratch_folder_path = scratch_folder_path or _scratch_folder_path
+    file_descriptor, staging_file_path = tempfile.mkstemp(suffix=".h5", dir=scratch_folder_path)
+    os.close(file_descriptor)
+    staging_file = h5py.File(staging_file_path, mode="w")
+    try:
+        os.remove(staging_file_path)  # The open handle keeps the data readable until the file is closed
+    except OSError:  # Windows does not allow removing open files; the file is removed once closed instead
+        pass
+
+    dataset = staging_file.create_dataset(
+        name="data",
+        shape=data_chunk_iterator.recommended_data_shape(),
+        dtype=data_chunk_iterator.dtype,
+        chunks=data_chunk_iterator.recommended_chunk_shape(),
+        compression="gzip",
+        compression_opts=compression_opts,
+    )
+    data_io = StagedH5DataIO(dataset=dataset, staging_file_path=staging_file_path)
+    write_gzip_chunks(
+        dataset=dataset, data_chunk_iterator=data_chunk_iterator, n_jobs=n_jobs, compression_opts=compression_opts
+    )
+    staging_file.flush()
+
+    return data_io
@@ -0,0 +1,72 @@
+"""Read SleepState.states.mat files and write their intervals as a single sorted TimeIntervals table."""
+from typing import Optional, Dict
+
+import h5py
+import numpy as np
+from pynwb.epoch import TimeIntervals
+
+from .mat_loader import is_mat_v73, read_mat_file
+from .time_intervals import build_time_intervals
+
+
+def _read_v73_intervals(dataset: h5py.Dataset) -> np.ndarray:
+    """MATLAB stores an (n, 2) matrix as a (2, n) dataset, and empty matrices as their dimensions."""
+    if dataset.attrs.get("MATLAB_empty", 0):
+        return np.empty((0, 2))
+    return np.reshape(dataset[()].T, (-1, 2)).astype("float64")
+
+
+def read_sleep_state_intervals(file_path) -> Dict[str, np.ndarray]:
+    """Start and stop times of each state in SleepState.ints, as (n, 2) arrays keyed by state name.
+
+    v7.3 files are read with h5py directly, touching only the datasets under SleepState/ints.
+    """
+    if is_mat_v73(file_path):
+        with h5py.File(file_path, mode="r") as file:
+            ints_group = file["SleepState"]["ints"]
+            return {state: _read_v73_intervals(ints_group[state]) for state in ints_group}
+    sleep_state_ints = read_mat_file(file_path=file_path, variable_names=["SleepState"])["SleepState"]["ints"]
+    return {state: np.reshape(values, (-1, 2)).astype("float64") for state, values in sleep_state_ints.items()}
+
+
+def build_sleep_states_table(
+    state_intervals: Dict[str, np.ndarray],
+    name: str = "SleepStates",
+    description: str = "Sleep state of the animal.",
+    state_label_names: Optional[Dict[str, str]] = None,
+    ecephys_start_time: float = 0.0,
+) -> TimeIntervals:
+    """Build a TimeIntervals table of sleep states with a 'label' column, sorted by start and then stop time.
+
+    Parameters
+    ----------
+    state_intervals: dict
+        Maps each state name to an (n, 2) array of start and stop times, see read_sleep_state_intervals.
+    name: str, optional
+        Default is 'SleepStates'.
+    description: str, optional
+    state_label_names: dict, optional
+        Maps state names to labels, e.g. dict(WAKEstate="Awake"). States missing from it are left out.
+        Defaults to every state, labeled with its own name.
+    ecephys_start_time: float, optional
+        Added to every start and stop time. Default is 0.0.
+
+    Returns
+    -------
+    TimeIntervals
+    """
+    if state_label_names is not None:
+        state_intervals = {state: state_intervals[state] for state in state_label_names if state in state_intervals}
+    states = list(state_intervals)
+    labels = np.array([state if state_label_names is None else state_label_names[state] for state in states])
+    intervals = [np.reshape(state_intervals[state], (-1, 2)) for state in states]
+    label_codes = np.repeat(np.arange(len(states)), [len(state_interval) for state_interval in intervals])
+    intervals = np.concatenate(intervals) if intervals else np.empty((0, 2))
+    order = np.lexsort((intervals[:, 1], intervals[:, 0]))
+    return build_time_intervals(
+        name=name,
+        description=description,
+        start_times=ecephys_start_time + intervals[order, 0],
+        stop_times=ecephys_start_time + intervals[order, 1],
+        columns=[dict(name="label", description="Sleep state.", data=labels[label_codes[order]])],
+    )
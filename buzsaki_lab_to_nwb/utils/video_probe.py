@@ -0,0 +1,189 @@
+"""Probe frame counts, rates and timestamps of videos from their container headers, caching the results on disk."""
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, List, Tuple
+from warnings import warn
+
+import numpy as np
+
+
+@dataclass
+class VideoProbe:
+    """Frame count and rate of a video; timestamps is None when the frames are evenly spaced at fps."""
+
+    frame_count: int
+    fps: float
+    timestamps: Optional[List[float]] = None
+    validated: bool = False
+
+    def get_timestamps(self) -> np.ndarray:
+        if self.timestamps is not None:
+            return np.asarray(self.timestamps)
+        return np.arange(self.frame_count) / self.fps
+
+
+def _iter_riff_chunks(data: bytes):
+    offset = 0
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        yield chunk_id, data[offset + 8 : offset + 8 + size]
+        offset += 8 + size + (size & 1)  # Chunks are padded to an even size
+
+
+def read_avi_header(file_path) -> Optional[Tuple[int, float]]:
+    """Frame count and rate from the RIFF headers of an AVI file, or None if they cannot be read.
+
+    The count is taken from the OpenDML 'dmlh' header when present, since the 'avih' total only covers the first
+    RIFF chunk of files over 1 GB, then from the length of the first video stream, then from 'avih'.
+    """
+    with open(file_path, mode="rb") as file:
+        file_header = file.read(24)
+        if len(file_header) < 24:
+            return None
+        riff_id, _, form_type, list_id, list_size, list_type = struct.unpack("<4sI4s4sI4s", file_header)
+        if riff_id != b"RIFF" or form_type != b"AVI " or list_id != b"LIST" or list_type != b"hdrl":
+            return None
+        header_list = file.read(list_size - 4)
+
+    avih_frames, microseconds_per_frame, stream_frames, stream_fps, odml_frames = None, None, None, None, None
+    for chunk_id, body in _iter_riff_chunks(header_list):
+        if chunk_id == b"avih":
+            microseconds_per_frame, avih_frames = struct.unpack_from("<I12xI", body)
+        elif chunk_id == b"LIST" and body[:4] == b"strl" and stream_frames is None:
+            for stream_chunk_id, stream_body in _iter_riff_chunks(body[4:]):
+                if stream_chunk_id == b"strh" and stream_body[:4] == b"vids":
+                    scale, rate, _, stream_frames = struct.unpack_from("<4I", stream_body, 20)
+                    stream_fps = rate / scale if scale else None
+        elif chunk_id == b"LIST" and body[:4] == b"odml":
+            for odml_chunk_id, odml_body in _iter_riff_chunks(body[4:]):
+                if odml_chunk_id == b"dmlh":
+                    (odml_frames,) = struct.unpack_from("<I", odml_body)
+
+    frame_count = next((count for count in (odml_frames, stream_frames, avih_frames) if count), None)
+    fps = stream_fps or (1e6 / microseconds_per_frame if microseconds_per_frame else None)
+    if frame_count is None or fps is None:
+        return None
+    return frame_count, fps
+
+
+def probe_video_container(file_path) -> VideoProbe:
+    """Frame count and rate from the container alone, without decoding: the AVI headers or CAP_PROP_FRAME_COUNT."""
+    avi_header = read_avi_header(file_path) if Path(file_path).suffix.lower() == ".avi" else None
+    if avi_header is not None:
+        frame_count, fps = avi_header
+        return VideoProbe(frame_count=frame_count, fps=fps)
+
+    import cv2
+
+    video_capture = cv2.VideoCapture(str(file_path))
+    try:
+        return VideoProbe(
+            frame_count=int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT)), fps=video_capture.get(cv2.CAP_PROP_FPS)
+        )
+    finally:
+        video_capture.release()
+
+
+def validate_video_probe(file_path, video_probe: VideoProbe) -> VideoProbe:
+    """Count the frames and read their timestamps by demuxing the whole video once, as a check of the headers.
+
+    Frames are grabbed without being converted to images. Timestamps are only kept if they are not evenly spaced
+    at the rate of the container.
+    """
+    import cv2
+
+    video_capture = cv2.VideoCapture(str(file_path))
+    timestamps = []
+    try:
+        while video_capture.grab():  # POS_MSEC is the timestamp of the frame grabbed last
+            timestamps.append(video_capture.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+    finally:
+        video_capture.release()
+
+    if len(timestamps) != video_probe.frame_count:
+        warn(f"{file_path} holds {len(timestamps)} frames, but its header reports {video_probe.frame_count}!")
+    timestamps = np.array(timestamps)
+    evenly_spaced = np.allclose(timestamps, np.arange(len(timestamps)) / video_probe.fps, rtol=0.0, atol=1e-6)
+    return VideoProbe(
+        frame_count=len(timestamps),
+        fps=video_probe.fps,
+        timestamps=None if evenly_spaced else timestamps.tolist(),
+        validated=True,
+    )
+
+
+def _probe_video(file_path, validate: bool) -> VideoProbe:
+    video_probe = probe_video_container(file_path=file_path)
+    return validate_video_probe(file_path=file_path, video_probe=video_probe) if validate else video_probe
+
+
+def probe_videos(
+    file_paths: List,
+    cache_file_path=None,
+    validate: bool = True,
+    max_workers: Optional[int] = None,
+) -> List[VideoProbe]:
+    """Probe several videos in a thread pool, reusing the results cached for files that have not changed.
+
+    Parameters
+    ----------
+    file_paths: list of PathType
+    cache_file_path: PathType, optional
+        JSON sidecar holding the probe of each file together with its size and modification time. Defaults to no
+        cache. The sidecar is only rewritten when a probe changed. One that cannot be written only raises a warning.
+    validate: bool, optional
+        Demux each video once to check the frame count of its header and read its timestamps. Default is True;
+        validated probes are cached, so this happens once per file.
+    max_workers: int, optional
+        Number of threads. Defaults to one per file, up to the number of cores.
+
+    Returns
+    -------
+    list of VideoProbe
+    """
+    cache = dict()
+    if cache_file_path is not None and Path(cache_file_path).is_file():
+        cache = json.loads(Path(cache_file_path).read_text())
+
+    def get_cache_key(file_path) -> str:
+        if cache_file_path is None:
+            return str(file_path)
+        return os.path.relpath(file_path, start=Path(cache_file_path).parent)
+
+    def probe_or_reuse(file_path) -> VideoProbe:
+        file_stat = os.stat(file_path)
+        cached = cache.get(get_cache_key(file_path))
+        if (
+            cached is not None
+            and cached["size"] == file_stat.st_size
+            and cached["mtime_ns"] == file_stat.st_mtime_ns
+            and (cached["probe"]["validated"] or not validate)
+        ):
+            return VideoProbe(**cached["probe"])
+        return _probe_video(file_path=file_path, validate=validate)
+
+    if not file_paths:
+        return []
+    max_workers = max_workers or min(len(file_paths), os.cpu_count())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        video_probes = list(executor.map(probe_or_reuse, file_paths))
+
+    if cache_file_path is not None:
+        updated_cache = dict(cache)
+        for file_path, video_probe in zip(file_paths, video_probes):
+            file_stat = os.stat(file_path)
+            updated_cache[get_cache_key(file_path)] = dict(
+                size=file_stat.st_size, mtime_ns=file_stat.st_mtime_ns, probe=asdict(video_probe)
+            )
+        if updated_cache == cache:  # Leave the sidecar and its modification time untouched
+            return video_probes
+        cache = updated_cache
+        try:
+            Path(cache_file_path).write_text(json.dumps(cache))
+        except OSError as exception:
+            warn(f"Unable to write the video probe cache {cache_file_path}: {exception}")
+    return video_probes
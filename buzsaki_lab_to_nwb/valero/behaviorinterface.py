@@ -8,10 +8,11 @@ from ndx_events import LabeledEvents
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from neuroconv.utils.json_schema import FolderPathType
-from pymatreader import read_mat
 from pynwb.behavior import Position, SpatialSeries
 from pynwb.file import NWBFile, TimeIntervals, TimeSeries
 
+from buzsaki_lab_to_nwb.utils.mat_loader import load_mat
+
 
 class ValeroBehaviorLinearTrackRewardsInterface(BaseDataInterface):
     def __init__(self, folder_path: FolderPathType):
@@ -26,7 +27,7 @@ class ValeroBehaviorLinearTrackRewardsInterface(BaseDataInterface):
             warnings.warn(f"Behavior file not found: {file_path}. Skipping rewards interface. \n")
             return nwbfile
 
-        mat_file = read_mat(file_path)
+        mat_file = load_mat(file_path)
 
         events_data = mat_file["behavior"]["events"]
 
@@ -76,7 +77,7 @@ class ValeroBehaviorLinearTrackInterface(BaseDataInterface):
 
         file_path = self.session_path / f"{self.session_id}.Behavior.mat"
         if file_path.is_file():
-            mat_file = read_mat(file_path)
+            mat_file = load_mat(file_path)
             behavior_data = mat_file["behavior"]
             timestamps = behavior_data["timestamps"]
             position = behavior_data["position"]
@@ -84,7 +85,7 @@ class ValeroBehaviorLinearTrackInterface(BaseDataInterface):
             warnings.warn(f"\n Behavior file {file_path} not found. Trying `Tracking.Behavior.mat` file instead \n")
             file_path = self.session_path / f"{self.session_id}.Tracking.Behavior.mat"
 
-            mat_file = read_mat(file_path)
+            mat_file = load_mat(file_path)
             tracking_data = mat_file["tracking"]
             position = tracking_data["position"]
             timestamps = tracking_data["timestamps"]
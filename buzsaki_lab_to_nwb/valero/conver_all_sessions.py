@@ -1,10 +1,14 @@
-import concurrent.futures
 import time
 from pathlib import Path
 
-import psutil
-
-from buzsaki_lab_to_nwb.valero.convert_session import session_to_nwbfile
+from buzsaki_lab_to_nwb.valero.convert_session import get_nwbfile_path, session_to_nwbfile
+from buzsaki_lab_to_nwb.utils.batch_scheduler import (
+    STREAMED_SUFFIXES,
+    ConversionJob,
+    estimate_session_cost,
+    run_conversion_jobs,
+)
+from buzsaki_lab_to_nwb.utils.conversion_manifest import get_session_fingerprint
 
 if __name__ == "__main__":
     # Parameters for conversion
@@ -12,6 +16,7 @@ if __name__ == "__main__":
     verbose = True
     run_in_parallel = False
     write_electrical_series = False  # Write the electrical series to the NWB file
+    incremental = False  # Patch existing files, rewriting only the interfaces whose source files changed
     iterator_opts = dict(buffer_gb=1.0, display_progress=verbose)
 
     output_dir_path = Path.home() / "conversion_nwb"
@@ -28,27 +33,46 @@ if __name__ == "__main__":
         all_subject_sessions_paths = (path for path in subject_path.iterdir() if path.is_dir())
         session_dir_path_list.extend(all_subject_sessions_paths)
 
-    def worker(session_dir_path):
-        session_to_nwbfile(
-            session_dir_path,
-            output_dir_path,
-            iterator_opts=iterator_opts,
-            stub_test=stub_test,
-            write_electrical_series=write_electrical_series,
-            verbose=verbose,
+    streamed_suffixes = [suffix for suffix in STREAMED_SUFFIXES if write_electrical_series or suffix != ".dat"]
+    jobs = [
+        ConversionJob(
+            name=str(session_dir_path.relative_to(project_root_path)),
+            function=session_to_nwbfile,
+            kwargs=dict(
+                session_dir_path=session_dir_path,
+                output_dir_path=output_dir_path,
+                iterator_opts=iterator_opts,
+                stub_test=stub_test,
+                write_electrical_series=write_electrical_series,
+                verbose=verbose,
+                incremental=incremental,
+            ),
+            cost=estimate_session_cost(
+                session_dir_path, buffer_gb=iterator_opts["buffer_gb"], streamed_suffixes=streamed_suffixes
+            ),
+            fingerprint=get_session_fingerprint(session_dir_path),
+            output_path=str(
+                get_nwbfile_path(
+                    session_dir_path,
+                    output_dir_path,
+                    stub_test=stub_test,
+                    write_electrical_series=write_electrical_series,
+                )
+            ),
         )
+        for session_dir_path in session_dir_path_list
+    ]
 
     if verbose:
         start_time = time.time()
 
-    if run_in_parallel:
-        # Create a pool of worker processes
-        num_physical_cores = psutil.cpu_count(logical=False)
-        with concurrent.futures.ProcessPoolExecutor(max_workers=num_physical_cores) as executor:
-            executor.map(worker, session_dir_path_list)
-    else:
-        for session_dir_path in session_dir_path_list:
-            worker(session_dir_path)
+    # Largest sessions first, packed under the available memory; sessions done on a previous run are skipped
+    run_conversion_jobs(
+        jobs,
+        max_workers=None if run_in_parallel else 1,
+        display_progress=verbose,
+        manifest_path=output_dir_path / "conversion_manifest.sqlite",
+    )
 
     if verbose:
         end_time = time.time()
@@ -6,10 +6,26 @@ from warnings import warn
 from neuroconv.utils import dict_deep_update, load_dict_from_file
 
 from buzsaki_lab_to_nwb.valero.converter import ValeroNWBConverter
+from buzsaki_lab_to_nwb.utils.chunking import add_recording_chunk_options
+
+
+def get_nwbfile_path(session_dir_path, output_dir_path, stub_test=False, write_electrical_series=True) -> Path:
+    """Path of the NWB file session_to_nwbfile writes for a session."""
+    output_dir_path = Path(output_dir_path)
+    if stub_test:
+        output_dir_path = output_dir_path / "nwb_stub"
+    session_id = Path(session_dir_path).stem
+    return output_dir_path / (f"{session_id}.nwb" if write_electrical_series else f"{session_id}_no_raw_data.nwb")
 
 
 def session_to_nwbfile(
-    session_dir_path, output_dir_path, iterator_opts=None, stub_test=False, write_electrical_series=True, verbose=False
+    session_dir_path,
+    output_dir_path,
+    iterator_opts=None,
+    stub_test=False,
+    write_electrical_series=True,
+    verbose=False,
+    incremental=False,
 ):
     iterator_opts = dict() if iterator_opts is None else iterator_opts
     if verbose:
@@ -20,17 +36,13 @@ def session_to_nwbfile(
 
     session_dir_path = Path(session_dir_path)
     assert session_dir_path.is_dir()
-    output_dir_path = Path(output_dir_path)
-
-    if stub_test:
-        output_dir_path = output_dir_path / "nwb_stub"
+    nwbfile_path = get_nwbfile_path(
+        session_dir_path, output_dir_path, stub_test=stub_test, write_electrical_series=write_electrical_series
+    )
+    output_dir_path = nwbfile_path.parent
     output_dir_path.mkdir(parents=True, exist_ok=True)
 
     session_id = session_dir_path.stem
-    nwbfile_path = output_dir_path / f"{session_id}.nwb"
-
-    if not write_electrical_series:
-        nwbfile_path = output_dir_path / f"{session_id}_no_raw_data.nwb"
 
     source_data = dict()
     conversion_options = dict()
@@ -82,7 +94,8 @@ def session_to_nwbfile(
 
     # Add videos
     folder_path = session_dir_path
-    source_data.update(Video=dict(folder_path=str(folder_path)))
+    video_probe_file_path = output_dir_path / f"{session_id}.video_probe.json"
+    source_data.update(Video=dict(folder_path=str(folder_path), video_probe_file_path=str(video_probe_file_path)))
     conversion_options.update(Video=dict(stub_test=stub_test, external_mode=True))
 
     # Add epochs
@@ -135,12 +148,20 @@ def session_to_nwbfile(
         session_id_to_write += "_no_raw_data"
         metadata["NWBFile"]["session_id"] = session_id_to_write
 
-    converter.run_conversion(
-        nwbfile_path=nwbfile_path,
-        metadata=metadata,
-        conversion_options=conversion_options,
-        overwrite=True,
-    )
+    # Chunk the recordings for streaming reads so the files never need a repack
+    add_recording_chunk_options(converter=converter, conversion_options=conversion_options)
+    if incremental:
+        # Only the interfaces whose source files changed since the last incremental run are rewritten
+        converter.run_incremental_conversion(
+            nwbfile_path=nwbfile_path, metadata=metadata, conversion_options=conversion_options
+        )
+    else:
+        converter.run_conversion(
+            nwbfile_path=nwbfile_path,
+            metadata=metadata,
+            conversion_options=conversion_options,
+            overwrite=True,
+        )
     if verbose:
         end_time = time.time()
         conversion_time = end_time - start_time
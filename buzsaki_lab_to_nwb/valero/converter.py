@@ -5,7 +5,6 @@ from zoneinfo import ZoneInfo
 
 import numpy as np
 from neuroconv import NWBConverter
-from pymatreader import read_mat
 from pynwb import NWBFile
 
 from buzsaki_lab_to_nwb.valero.behaviorinterface import (
@@ -16,7 +15,7 @@ from buzsaki_lab_to_nwb.valero.ecephys_interface import (
     ValeroLFPInterface,
     ValeroRawInterface,
 )
-from buzsaki_lab_to_nwb.valero.epochsinterface import ValeroEpochsInterface
+from buzsaki_lab_to_nwb.valero.epochsinterface import SESSION_MAT_IGNORE_FIELDS, ValeroEpochsInterface
 from buzsaki_lab_to_nwb.valero.eventsinterface import (
     ValeroBehaviorSleepStatesInterface,
     ValeroHSEventsInterface,
@@ -29,9 +28,11 @@ from buzsaki_lab_to_nwb.valero.stimulilaserinterface import (
 )
 from buzsaki_lab_to_nwb.valero.trialsinterface import ValeroTrialInterface
 from buzsaki_lab_to_nwb.valero.videointerface import ValeroVideoInterface
+from buzsaki_lab_to_nwb.utils.incremental_conversion import IncrementalNWBConverterMixin
+from buzsaki_lab_to_nwb.utils.mat_loader import load_mat
 
 
-class ValeroNWBConverter(NWBConverter):
+class ValeroNWBConverter(IncrementalNWBConverterMixin, NWBConverter):
     """Primary conversion class for the Valero 2022 experiment."""
 
     data_interface_classes = dict(
@@ -49,6 +50,21 @@ class ValeroNWBConverter(NWBConverter):
         HSEvents=ValeroHSEventsInterface,
         UPDownEvents=ValeroHSUPDownEventsInterface,
     )
+    # Files each folder-based interface reads, used to detect which interfaces need rewriting
+    interface_source_patterns = dict(
+        Recording=["*.dat", "*.xml", "chanMap.mat"],
+        LFP=["*.lfp", "*.xml", "chanMap.mat"],
+        Video=["*.session.mat", "*/*.avi"],
+        Trials=["*.behavior.cellinfo.mat"],
+        Epochs=["*.session.mat"],
+        OptogeneticStimuli=["*.pulses.events.mat"],
+        BehaviorLinearTrack=["*.Behavior.mat"],
+        BehaviorSleepStates=["*.SleepState.states.mat"],
+        BehaviorLinearTrackRewards=["*.Behavior.mat"],
+        RippleEvents=["*.ripples.events.mat"],
+        HSEvents=["*.HSE.mat"],
+        UPDownEvents=["*.UDStates.events.mat"],
+    )
 
     def __init__(self, source_data: dict, session_folder_path: str, verbose: bool = True):
         super().__init__(source_data=source_data, verbose=verbose)
@@ -61,8 +77,7 @@ class ValeroNWBConverter(NWBConverter):
         session_file_path = self.session_folder_path / f"{self.session_id}.session.mat"
         assert session_file_path.is_file(), f"Session file not found: {session_file_path}"
 
-        ignore_fields = ["behavioralTracking", "timeSeries", "spikeSorting", "extracellular", "brainRegions"]
-        session_mat = read_mat(session_file_path, ignore_fields=ignore_fields)
+        session_mat = load_mat(session_file_path, ignore_fields=SESSION_MAT_IGNORE_FIELDS)
         session_data = session_mat["session"]
 
         # Add session start time
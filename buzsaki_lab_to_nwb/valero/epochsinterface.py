@@ -4,9 +4,13 @@ from pathlib import Path
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from neuroconv.utils.json_schema import FolderPathType
-from pymatreader import read_mat
 from pynwb.file import NWBFile
 
+from buzsaki_lab_to_nwb.utils.mat_loader import load_mat
+
+# Shared by every reader of session.mat so that the file is parsed once per session
+SESSION_MAT_IGNORE_FIELDS = ["behavioralTracking", "timeSeries", "spikeSorting", "extracellular", "brainRegions"]
+
 
 class ValeroEpochsInterface(BaseDataInterface):
     def __init__(self, folder_path: FolderPathType):
@@ -18,7 +22,7 @@ class ValeroEpochsInterface(BaseDataInterface):
 
         session_file_path = self.session_path / f"{self.session_id}.session.mat"
 
-        mat_file = read_mat(session_file_path)
+        mat_file = load_mat(session_file_path, ignore_fields=SESSION_MAT_IGNORE_FIELDS)
 
         epoch_list = mat_file["session"]["epochs"]
 
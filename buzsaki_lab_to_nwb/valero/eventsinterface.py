@@ -7,10 +7,12 @@ from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools.nwb_helpers import get_module
 from neuroconv.utils.json_schema import FolderPathType
 from pymatreader import read_mat
-from pynwb import H5DataIO
 from pynwb.epoch import TimeIntervals
 from pynwb.file import NWBFile
 
+from buzsaki_lab_to_nwb.utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
+from buzsaki_lab_to_nwb.utils.time_intervals import build_time_intervals
+
 
 def get_human_readable_size(file_path):
     size = file_path.stat().st_size
@@ -145,17 +147,13 @@ class ValeroHSEventsInterface(BaseDataInterface):
 
         name = "HSETimeIntervals"
         description = "High synchrony events"  # TODO: Confirm author for description
-        ripple_events_table = TimeIntervals(name=name, description=description)
-
-        for start_time, stop_time in hse_intervals:
-            ripple_events_table.add_row(start_time=start_time, stop_time=stop_time)
-
-        for field_name, nwb_info in mat_field_to_nwb_info.items():
-            ripple_events_table.add_column(
-                name=nwb_info["name"],
-                description=nwb_info["description"],
-                data=H5DataIO(nwb_info["data"], compression="gzip"),
-            )
+        ripple_events_table = build_time_intervals(
+            name=name,
+            description=description,
+            start_times=hse_intervals[:, 0],
+            stop_times=hse_intervals[:, 1],
+            columns=list(mat_field_to_nwb_info.values()),
+        )
 
         processing_module = get_module(nwbfile=nwbfile, name="ecephys")
 
@@ -227,20 +225,8 @@ class ValeroRipplesEventsInterface(BaseDataInterface):
                     data=ripple_stats["data"]["peakAmplitude"],
                 )
 
-        name = "RippleTimeIntervals"
-        ripple_events_table = TimeIntervals(name=name, description="Ripples and their metrics")
-
-        for start_time, stop_time in ripple_intervals:
-            ripple_events_table.add_row(start_time=start_time, stop_time=stop_time)
-
-        for field_name, nwb_info in mat_field_to_nwb_info.items():
-            ripple_events_table.add_column(
-                name=nwb_info["name"],
-                description=nwb_info["description"],
-                data=H5DataIO(nwb_info["data"], compression="gzip"),
-            )
-
         # Extract indexed data
+        indexed_columns = []
         if "rippleStats" in ripples_data:
             ripple_stats_maps = ripples_data["rippleStats"]["maps"]
 
@@ -259,13 +245,20 @@ class ValeroRipplesEventsInterface(BaseDataInterface):
             for column_name, column_data in zip(
                 list(indexed_descriptions), [ripple_raw, ripple_frequencies, ripple_phases, ripple_amplitudes]
             ):
-                ripple_events_table.add_column(
-                    name=column_name,
-                    description=indexed_descriptions[column_name],
-                    index=list(range(column_data.shape[0])),
-                    data=H5DataIO(column_data, compression="gzip"),
+                indexed_columns.append(
+                    dict(name=column_name, description=indexed_descriptions[column_name], data=column_data)
                 )
 
+        name = "RippleTimeIntervals"
+        ripple_events_table = build_time_intervals(
+            name=name,
+            description="Ripples and their metrics",
+            start_times=ripple_intervals[:, 0],
+            stop_times=ripple_intervals[:, 1],
+            columns=list(mat_field_to_nwb_info.values()),
+            ragged_columns=indexed_columns,
+        )
+
         # Add the events to the ecephys processing module
         processing_module = get_module(nwbfile=nwbfile, name="ecephys")
         processing_module.add(ripple_events_table)
@@ -292,9 +285,7 @@ class ValeroBehaviorSleepStatesInterface(BaseDataInterface):
             warn(f"Sleep states file {sleep_states_file_path} not found. Skipping sleep states interface")
             return nwbfile
 
-        mat_file = read_mat(sleep_states_file_path)
-
-        sleep_intervals = mat_file["SleepState"]["ints"]
+        sleep_intervals = read_sleep_state_intervals(file_path=sleep_states_file_path)
         sleep_intervals = {key: value for key, value in sleep_intervals.items() if value.shape[0] > 0}
 
         description_of_states = {
@@ -318,21 +309,9 @@ class ValeroBehaviorSleepStatesInterface(BaseDataInterface):
         description_of_available_states = {state: description_of_states[state] for state in sleep_intervals}
         description = f"Description of states : {json.dumps(description_of_available_states, indent=4)}"
 
-        table_rows = []
-        for state_name, state_intervals in sleep_intervals.items():
-            if state_intervals.ndim > 1:
-                for start_time, stop_time in state_intervals:
-                    row_as_dict = dict(start_time=float(start_time), stop_time=float(stop_time), label=state_name)
-                    table_rows.append(row_as_dict)
-            else:  # This is necessary because `read_mat` returns a 1D array if there is only one interval
-                start_time, stop_time = state_intervals
-                row_as_dict = dict(start_time=float(start_time), stop_time=float(stop_time), label=state_name)
-                table_rows.append(row_as_dict)
-
-        time_intervals = TimeIntervals(name="SleepStates", description=description)
-        time_intervals.add_column(name="label", description="Sleep state.")
-        sorted_table = sorted(table_rows, key=lambda x: (x["start_time"], x["stop_time"]))
-        [time_intervals.add_row(**row_as_dict) for row_as_dict in sorted_table]
+        time_intervals = build_sleep_states_table(
+            state_intervals=sleep_intervals, name="SleepStates", description=description
+        )
 
         # Create behavior module
         behavior_description = "Tracking data obtained from positional tracking in video"
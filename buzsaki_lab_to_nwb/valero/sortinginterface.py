@@ -2,12 +2,12 @@ from pathlib import Path
 from typing import Optional
 
 import numpy as np
-import scipy
 
 from neuroconv.datainterfaces.ecephys.basesortingextractorinterface import BaseSortingExtractorInterface
-from neuroconv.tools import get_package
 from neuroconv.utils import FilePathType
 
+from buzsaki_lab_to_nwb.utils.mat_loader import read_mat_file
+
 
 class CellExplorerSortingInterface(BaseSortingExtractorInterface):
     """Primary data interface class for converting Cell Explorer spiking data."""
@@ -23,76 +23,45 @@ class CellExplorerSortingInterface(BaseSortingExtractorInterface):
         verbose: bool, default: True
         """
 
-        hdf5storage = get_package(package_name="hdf5storage")
-
         session_path = Path(file_path).parent
         session_id = session_path.stem
         spikes_matfile_path = Path(file_path)
+        assert (
+            spikes_matfile_path.is_file()
+        ), f"The file_path should point to an existing .spikes.cellinfo.mat file ({spikes_matfile_path})"
 
-        # First load the
-        try:
-            spikes_mat = scipy.io.loadmat(file_name=str(spikes_matfile_path))
-            self.read_spikes_info_with_scipy = True
-        except NotImplementedError:
-            spikes_mat = hdf5storage.loadmat(file_name=str(spikes_matfile_path))
-            self.read_spikes_info_with_scipy = False
-        cell_info = spikes_mat.get("spikes", np.empty(0))
-        self.cell_info_fields = cell_info.dtype.names
+        cell_info = read_mat_file(file_path=spikes_matfile_path, variable_names=["spikes"]).get("spikes", dict())
+        self.cell_info_fields = list(cell_info)
         if sampling_frequency is None and "sr" in self.cell_info_fields:
-            sampling_frequency = float(cell_info["sr"][0][0][0][0])
+            sampling_frequency = float(cell_info["sr"])
 
         super().__init__(spikes_matfile_path=file_path, verbose=verbose, sampling_frequency=sampling_frequency)
         self.source_data = dict(file_path=file_path, sampling_frequency=sampling_frequency)
 
-        assert (
-            spikes_matfile_path.is_file()
-        ), f"The file_path should point to an existing .spikes.cellinfo.mat file ({spikes_matfile_path})"
-
-        try:
-            spikes_mat = scipy.io.loadmat(file_name=str(spikes_matfile_path))
-            self.read_spikes_info_with_scipy = True
-        except NotImplementedError:
-            spikes_mat = hdf5storage.loadmat(file_name=str(spikes_matfile_path))
-            self.read_spikes_info_with_scipy = False
-        cell_info = spikes_mat.get("spikes", np.empty(0))
-        self.cell_info_fields = cell_info.dtype.names
-
         unit_ids = self.sorting_extractor.get_unit_ids()
-        if self.read_spikes_info_with_scipy:
-            if "cluID" in self.cell_info_fields:
-                self.sorting_extractor.set_property(
-                    ids=unit_ids, key="clu_id", values=[int(x) for x in cell_info["cluID"][0][0][0]]
-                )
-            if "shankID" in self.cell_info_fields:
-                self.sorting_extractor.set_property(
-                    ids=unit_ids, key="group_id", values=[f"Group{x}" for x in cell_info["shankID"][0][0][0]]
-                )
-            if "region" in self.cell_info_fields:
-                self.sorting_extractor.set_property(
-                    ids=unit_ids, key="location", values=[str(x[0]) for x in cell_info["region"][0][0][0]]
-                )
-        else:  # Logic for hdf5storage
-            if "cluID" in self.cell_info_fields:
-                self.sorting_extractor.set_property(
-                    ids=unit_ids, key="clu_id", values=[int(x) for x in cell_info["cluID"][0][0]]
-                )
-            if "shankID" in self.cell_info_fields:
-                self.sorting_extractor.set_property(
-                    ids=unit_ids, key="group_id", values=[f"Group{x}" for x in cell_info["shankID"][0][0]]
-                )
-            if "region" in self.cell_info_fields:
-                self.sorting_extractor.set_property(
-                    ids=unit_ids, key="location", values=[str(x[0]) for x in cell_info["region"][0][0]]
-                )
+        if "cluID" in self.cell_info_fields:
+            self.sorting_extractor.set_property(
+                ids=unit_ids, key="clu_id", values=[int(x) for x in np.atleast_1d(cell_info["cluID"])]
+            )
+        if "shankID" in self.cell_info_fields:
+            self.sorting_extractor.set_property(
+                ids=unit_ids, key="group_id", values=[f"Group{int(x)}" for x in np.atleast_1d(cell_info["shankID"])]
+            )
+        if "region" in self.cell_info_fields:
+            self.sorting_extractor.set_property(
+                ids=unit_ids, key="location", values=[str(x) for x in np.atleast_1d(cell_info["region"])]
+            )
         celltype_mapping = {"pE": "excitatory", "pI": "inhibitory", "[]": "unclassified"}
         celltype_file_path = session_path / f"{session_id}.CellClass.cellinfo.mat"
         if celltype_file_path.is_file():
-            celltype_info = scipy.io.loadmat(celltype_file_path).get("CellClass", np.empty(0))
-            if "label" in celltype_info.dtype.names:
+            celltype_info = read_mat_file(file_path=celltype_file_path, variable_names=["CellClass"]).get(
+                "CellClass", dict()
+            )
+            if "label" in celltype_info:
                 self.sorting_extractor.set_property(
                     ids=unit_ids,
                     key="cell_type",
-                    values=[str(celltype_mapping[str(x[0])]) for x in celltype_info["label"][0][0][0]],
+                    values=[celltype_mapping[str(x) or "[]"] for x in np.atleast_1d(celltype_info["label"])],
                 )
 
     def get_metadata(self) -> dict:
@@ -129,8 +98,10 @@ class CellExplorerSortingInterface(BaseSortingExtractorInterface):
                 )
         celltype_filepath = session_path / f"{session_id}.CellClass.cellinfo.mat"
         if celltype_filepath.is_file():
-            celltype_info = scipy.io.loadmat(celltype_filepath).get("CellClass", np.empty(0))
-            if "label" in celltype_info.dtype.names:
+            celltype_info = read_mat_file(file_path=celltype_filepath, variable_names=["CellClass"]).get(
+                "CellClass", dict()
+            )
+            if "label" in celltype_info:
                 unit_properties.append(
                     dict(
                         name="cell_type",
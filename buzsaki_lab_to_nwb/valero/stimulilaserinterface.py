@@ -4,10 +4,10 @@ import numpy as np
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils.json_schema import FolderPathType
 from pymatreader import read_mat
-from pynwb.epoch import TimeIntervals
 from pynwb.file import NWBFile
 from pynwb.ogen import OptogeneticSeries, OptogeneticStimulusSite
 
+from buzsaki_lab_to_nwb.utils.time_intervals import build_time_intervals
 from buzsaki_lab_to_nwb.valero.ecephys_interface import (
     generate_neurolight_device_metadata,
 )
@@ -160,18 +160,17 @@ class ValeroLaserPulsesInterface(BaseDataInterface):
         random sites with a randomly variable ({offset}) offset.
         """
 
-        stimuli_laser_pulses = TimeIntervals(
+        stimuli_laser_pulses = build_time_intervals(
             name="stimuli_laser_pulses",
             description=laser_description,
+            start_times=pulse_intervals[:, 0],
+            stop_times=pulse_intervals[:, 1],
+            columns=[
+                dict(
+                    name="electrode_channel", description="The electrode channel for the pulse", data=electrode_channel
+                ),
+                dict(name="amplitude", description="The amplitude of the pulse", data=amplitude),
+            ],
         )
 
-        stimuli_laser_pulses.add_column(name="electrode_channel", description="The electrode channel for the pulse")
-        stimuli_laser_pulses.add_column(name="amplitude", description="The amplitude of the pulse")
-
-        for interval, channel, amp in zip(pulse_intervals, electrode_channel, amplitude):
-            start_time, stop_time = interval
-            channel = channel
-            row_dict = dict(start_time=start_time, stop_time=stop_time, electrode_channel=channel, amplitude=amp)
-            stimuli_laser_pulses.add_row(**row_dict)
-
         nwbfile.add_time_intervals(stimuli_laser_pulses)
@@ -1,24 +1,45 @@
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List
 
 import numpy as np
 from neuroconv.datainterfaces import VideoInterface
 from neuroconv.utils import FilePathType, FolderPathType
 from neuroconv.utils.json_schema import get_base_schema, get_schema_from_hdmf_class
-from pymatreader import read_mat
 from pynwb import NWBFile
 from pynwb.image import ImageSeries
 
+from buzsaki_lab_to_nwb.utils.mat_loader import load_mat
+from buzsaki_lab_to_nwb.utils.video_probe import probe_videos
+from buzsaki_lab_to_nwb.valero.epochsinterface import SESSION_MAT_IGNORE_FIELDS
+
 
 class ValeroVideoInterface(VideoInterface):
-    def __init__(self, folder_path: FolderPathType, verbose: bool = False):
+    def __init__(
+        self,
+        folder_path: FolderPathType,
+        verbose: bool = False,
+        video_probe_file_path: Optional[FilePathType] = None,
+        validate_video_probe: bool = True,
+    ):
+        """
+        Parameters
+        ----------
+        folder_path: FolderPathType
+        verbose: bool, default: False
+        video_probe_file_path: FilePathType, optional
+            JSON sidecar caching the frame counts and timestamps of the epoch videos, so that reconversions skip
+            probing them. Keep it out of the session folder, e.g. next to the output file, so the raw data is left
+            untouched. Defaults to no sidecar.
+        validate_video_probe: bool, default: True
+            Demux each video once to check the frame count of its header and read its timestamps. Otherwise the
+            frame count and rate of the container are used.
+        """
         self.session_folder_path = Path(folder_path)
         self.session_id = self.session_folder_path.stem
         session_file_path = self.session_folder_path / f"{self.session_id}.session.mat"
         assert session_file_path.is_file(), session_file_path
 
-        ignore_fields = ["animal", "behavioralTracking", "timeSeries", "spikeSorting", "extracellular", "brainRegions"]
-        mat_file = read_mat(session_file_path, ignore_fields=ignore_fields)
+        mat_file = load_mat(session_file_path, ignore_fields=SESSION_MAT_IGNORE_FIELDS)
 
         epoch_list = mat_file["session"]["epochs"]
 
@@ -40,20 +61,20 @@ class ValeroVideoInterface(VideoInterface):
         self.sorted_epoch_to_video_info = {k: v for k, v in sorted_items}
         file_paths = [info["file_path"] for info in self.sorted_epoch_to_video_info.values()]
 
-        from neuroconv.datainterfaces.behavior.video.video_utils import (
-            VideoCaptureContext,
+        self._video_probes = probe_videos(
+            file_paths=file_paths, cache_file_path=video_probe_file_path, validate=validate_video_probe
         )
-
-        self._starting_frames = [0]
-        for file_index, file_path in enumerate(file_paths):
-            with VideoCaptureContext(file_path=str(file_path)) as video_capture:
-                self._starting_frames.append(video_capture.get_video_frame_count())
-
-        self._starting_frames = self._starting_frames[:-1]
+        frame_counts = [video_probe.frame_count for video_probe in self._video_probes]
+        # Index of the first frame of each file within the concatenated ImageSeries
+        self._starting_frames = np.concatenate(([0], np.cumsum(frame_counts)[:-1])).astype(int).tolist()
         super().__init__(file_paths, verbose)
 
         self.segment_starting_times = [info["start_time"] for info in self.sorted_epoch_to_video_info.values()]
 
+    def get_original_timestamps(self, stub_test: bool = False) -> List[np.ndarray]:
+        max_frames = 10 if stub_test else None
+        return [video_probe.get_timestamps()[:max_frames] for video_probe in self._video_probes]
+
     def get_metadata(self):
         metadata = super().get_metadata()
 
@@ -2,13 +2,13 @@
 from nwb_conversion_tools.utils import get_base_schema, get_schema_from_hdmf_class
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from pynwb import NWBFile
-from pynwb.file import TimeIntervals
 from pynwb.behavior import SpatialSeries, Position
 from hdmf.backends.hdf5.h5_utils import H5DataIO
 import os
 import numpy as np
 from scipy.io import loadmat
-from ..neuroscope import get_events, find_discontinuities, check_module
+from ..utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
+from ..utils.neuroscope import get_events, find_discontinuities, check_module
 
 
 class WatsonBehaviorInterface(BaseDataInterface):
@@ -109,15 +109,10 @@ class WatsonBehaviorInterface(BaseDataInterface):
         # label renaming specific to Watson
         state_label_names = {"WAKEstate": "Awake", "NREMstate": "Non-REM", "REMstate": "REM"}
         if os.path.isfile(sleep_state_fpath):
-            matin = loadmat(sleep_state_fpath)["SleepState"]["ints"][0][0]
-
-            table = TimeIntervals(name="states", description="Sleep states of animal.")
-            table.add_column(name="label", description="Sleep state.")
-
-            data = []
-            for name in matin.dtype.names:
-                for row in matin[name][0][0]:
-                    data.append({"start_time": row[0], "stop_time": row[1], "label": state_label_names[name]})
-            [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
-
+            table = build_sleep_states_table(
+                state_intervals=read_sleep_state_intervals(file_path=sleep_state_fpath),
+                name="states",
+                description="Sleep states of animal.",
+                state_label_names=state_label_names,
+            )
             check_module(nwbfile, "behavior", "contains behavioral data").add_data_interface(table)
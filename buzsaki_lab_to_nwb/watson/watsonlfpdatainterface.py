@@ -6,8 +6,8 @@ from pynwb.misc import DecompositionSeries
 import os
 import numpy as np
 
-from ..band_analysis import filter_lfp, hilbert_lfp
-from ..neuroscope import read_lfp, write_lfp, write_spike_waveforms, check_module
+from ..utils.band_analysis import get_decomposition_series
+from ..utils.neuroscope import read_lfp, write_lfp, write_spike_waveforms, check_module
 
 
 class WatsonLFPInterface(BaseDataInterface):
@@ -30,7 +30,14 @@ class WatsonLFPInterface(BaseDataInterface):
 
         return metadata_schema
 
-    def convert_data(self, nwbfile: NWBFile, metadata: dict, stub_test: bool = False):
+    def convert_data(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        stub_test: bool = False,
+        n_jobs: int = 1,
+        decomposition_dtype: str = "float64",
+    ):
         session_path = self.input_args["folder_path"]
         # TODO: check/enforce format?
         all_shank_channels = metadata["all_shank_channels"]
@@ -45,7 +52,7 @@ class WatsonLFPInterface(BaseDataInterface):
 
         _, all_channels_lfp_data = read_lfp(session_path, stub=stub_test, n_channels=n_total_channels)
         try:
-            lfp_data = all_channels_lfp_data[:, all_shank_channels]
+            lfp_data = all_channels_lfp_data.subset(all_shank_channels)
         except IndexError:
             lfp_data = all_channels_lfp_data
         lfp_ts = write_lfp(
@@ -71,28 +78,17 @@ class WatsonLFPInterface(BaseDataInterface):
 
         for ref_name, lfp_channel in lfp_channels.items():
             try:
-                all_lfp_phases = []
-                for passband in ("theta", "gamma"):
-                    lfp_fft = filter_lfp(
-                        lfp_data[:, all_shank_channels == lfp_channel].ravel(), lfp_sampling_rate, passband=passband
-                    )
-                    lfp_phase, _ = hilbert_lfp(lfp_fft)
-                    all_lfp_phases.append(lfp_phase[:, np.newaxis])
-                decomp_series_data = np.dstack(all_lfp_phases)
-
                 # TODO: should units or metrics be metadata?
-                decomp_series = DecompositionSeries(
+                decomp_series = get_decomposition_series(
+                    lfp_data[:, all_shank_channels == lfp_channel].ravel(),
+                    lfp_sampling_rate,
                     name=metadata["lfp_decomposition"][ref_name]["name"],
                     description=metadata["lfp_decomposition"][ref_name]["description"],
-                    data=decomp_series_data,
-                    rate=lfp_sampling_rate,
                     source_timeseries=lfp_ts,
-                    metric="phase",
-                    unit="radians",
+                    passbands=("theta", "gamma"),
+                    dtype=decomposition_dtype,
+                    n_jobs=n_jobs,
                 )
-                # TODO: the band limits should be extracted from parse_passband in band_analysis?
-                decomp_series.add_band(band_name="theta", band_limits=(4, 10))
-                decomp_series.add_band(band_name="gamma", band_limits=(30, 80))
 
                 check_module(
                     nwbfile, "ecephys", "contains processed extracellular electrophysiology data"
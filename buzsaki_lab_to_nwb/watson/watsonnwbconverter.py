@@ -8,10 +8,9 @@ from .watsonsortinginterface import WatsonSortingInterface
 import numpy as np
 from scipy.io import loadmat
 import os
-from lxml import etree as et
 from datetime import datetime
 from dateutil.parser import parse as dateparse
-from ..neuroscope import get_clusters_single_shank
+from ..utils.neuroscope import get_neuroscope_header
 
 
 class WatsonNWBConverter(NWBConverter):
@@ -34,16 +33,8 @@ class WatsonNWBConverter(NWBConverter):
                 new_data_interface_classes.update({name: val})
             new_data_interface_classes.pop("NeuroscopeRecording")
 
-            session_id = os.path.split(input_args["WatsonLFP"]["folder_path"])[1]
-            xml_filepath = os.path.join(input_args["WatsonLFP"]["folder_path"], session_id + ".xml")
-            root = et.parse(xml_filepath).getroot()
-            n_channels = len(
-                [
-                    int(channel.text)
-                    for group in root.find("spikeDetection").find("channelGroups").findall("group")
-                    for channel in group.find("channels")
-                ]
-            )
+            header = get_neuroscope_header(session_path=input_args["WatsonLFP"]["folder_path"])
+            n_channels = sum(len(channels) for channels in header.shank_channels)
             # The only information needed for this is .get_channel_ids() which is set by the shape of the input series
             input_args.update(
                 {"WatsonNoRecording": {"timeseries": np.array(range(n_channels)), "sampling_frequency": 1}}
@@ -79,17 +70,13 @@ class WatsonNWBConverter(NWBConverter):
         session_start = dateparse(date_text)
 
         # TODO: add error checking on file existence
-        xml_filepath = os.path.join(session_path, "{}.xml".format(session_id))
-        root = et.parse(xml_filepath).getroot()
+        header = get_neuroscope_header(session_path=session_path)
 
-        shank_channels = [
-            [int(channel.text) for channel in group.find("channels")]
-            for group in root.find("spikeDetection").find("channelGroups").findall("group")
-        ]
+        shank_channels = [list(channels) for channels in header.shank_channels]
         all_shank_channels = np.concatenate(shank_channels)
         all_shank_channels.sort()
-        spikes_nsamples = int(root.find("neuroscope").find("spikes").find("nSamples").text)
-        lfp_sampling_rate = float(root.find("fieldPotentials").find("lfpSamplingRate").text)
+        spikes_nsamples = header.spikes_nsamples
+        lfp_sampling_rate = header.lfp_sampling_rate
 
         session_info_filepath = os.path.join(session_path, "{}.sessionInfo.mat".format(session_id))
         if os.path.isfile(session_info_filepath):
@@ -4,13 +4,11 @@ import pandas as pd
 from pathlib import Path
 import warnings
 
-from lxml import etree as et
 from pynwb import NWBFile, TimeSeries
-from pynwb.misc import DecompositionSeries
 from nwb_conversion_tools import NeuroscopeLFPInterface
 
-from ..utils.band_analysis import filter_lfp, hilbert_lfp
-from ..utils.neuroscope import read_lfp, check_module
+from ..utils.band_analysis import get_decomposition_series
+from ..utils.neuroscope import get_neuroscope_header, read_lfp, check_module
 
 
 def get_reference_elec(exp_sheet_path, hilus_csv_path, date, session_id, b=False):
@@ -51,21 +49,24 @@ def get_reference_elec(exp_sheet_path, hilus_csv_path, date, session_id, b=False
 class YutaLFPInterface(NeuroscopeLFPInterface):
     """Primary conversion class for LFP data from the SenzaiY dataset."""
 
-    def run_conversion(self, nwbfile: NWBFile, metadata: dict, stub_test: bool = False):
+    def run_conversion(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        stub_test: bool = False,
+        n_jobs: int = 1,
+        decomposition_dtype: str = "float64",
+    ):
         super().run_conversion(nwbfile=nwbfile, metadata=metadata, stub_test=stub_test)
 
         session_path = Path(self.source_data["file_path"]).parent
         session_id = session_path.name
         subject_path = session_path.parent
 
-        xml_filepath = session_path / f"{session_id}.xml"
-        root = et.parse(str(xml_filepath)).getroot()
-        n_total_channels = int(root.find("acquisitionSystem").find("nChannels").text)
-        lfp_sampling_rate = float(root.find("fieldPotentials").find("lfpSamplingRate").text)
-        shank_channels = [
-            [int(channel.text) for channel in group.find("channels")]
-            for group in root.find("spikeDetection").find("channelGroups").findall("group")
-        ]
+        header = get_neuroscope_header(session_path=str(session_path))
+        n_total_channels = header.n_channels
+        lfp_sampling_rate = header.lfp_sampling_rate
+        shank_channels = [list(channels) for channels in header.shank_channels]
         all_shank_channels = np.concatenate(shank_channels)  # Flattened
 
         # Special electrodes
@@ -114,35 +115,23 @@ class YutaLFPInterface(NeuroscopeLFPInterface):
             b = True
         lfp_channel = get_reference_elec(subject_xls, hilus_csv_path, session_start, session_id, b=b)
         if lfp_channel is not None:
-            lfp_data = all_channels_lfp_data[:, all_shank_channels]
-            all_lfp_phases = []
-            for passband in ("theta", "gamma"):
-                lfp_fft = filter_lfp(
-                    lfp_data[:, all_shank_channels == lfp_channel].ravel(),
-                    lfp_sampling_rate,
-                    passband=passband,
-                )
-                lfp_phase, _ = hilbert_lfp(lfp_fft)
-                all_lfp_phases.append(lfp_phase[:, np.newaxis])
-            decomp_series_data = np.dstack(all_lfp_phases)
+            lfp_data = all_channels_lfp_data.subset(all_shank_channels)
             ecephys_mod = check_module(
                 nwbfile,
                 "ecephys",
                 "Intermediate data from extracellular electrophysiology recordings, e.g., LFP.",
             )
             lfp_ts = ecephys_mod.data_interfaces["LFP"]["LFP"]
-            decomp_series = DecompositionSeries(
+            decomp_series = get_decomposition_series(
+                lfp_data[:, all_shank_channels == lfp_channel].ravel(),
+                lfp_sampling_rate,
                 name="LFPDecompositionSeries",
                 description="Theta and Gamma phase for reference LFP",
-                data=decomp_series_data,
-                rate=lfp_sampling_rate,
                 source_timeseries=lfp_ts,
-                metric="phase",
-                unit="radians",
+                passbands=("theta", "gamma"),
+                dtype=decomposition_dtype,
+                n_jobs=n_jobs,
             )
-            # TODO: the band limits should be extracted from parse_passband in band_analysis?
-            decomp_series.add_band(band_name="theta", band_limits=(4, 10))
-            decomp_series.add_band(band_name="gamma", band_limits=(30, 80))
             check_module(
                 nwbfile,
                 "ecephys",
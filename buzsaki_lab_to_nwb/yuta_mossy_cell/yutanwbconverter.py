@@ -3,7 +3,6 @@ import pandas as pd
 import numpy as np
 from scipy.io import loadmat
 from pathlib import Path
-from lxml import etree as et
 from datetime import datetime
 
 from nwb_conversion_tools import NWBConverter
@@ -15,7 +14,7 @@ from nwb_conversion_tools import (
 from .yutalfpdatainterface import YutaLFPInterface, get_reference_elec
 from .yutapositiondatainterface import YutaPositionInterface
 from .yutabehaviordatainterface import YutaBehaviorInterface
-from ..utils.neuroscope import get_clusters_single_shank, read_spike_clustering
+from ..utils.neuroscope import get_neuroscope_header, read_spike_clustering
 
 
 def get_UnitFeatureCell_features(fpath_base, session_id, session_path, nshanks):
@@ -95,13 +94,9 @@ class YutaNWBConverter(NWBConverter):
             subject_data = dict()
             print(f"Warning: no subject file detected for session {session_path}!")
 
-        xml_filepath = session_path / f"{session_id}.xml"
-        root = et.parse(str(xml_filepath)).getroot()
+        header = get_neuroscope_header(session_path=str(session_path))
 
-        shank_channels = [
-            [int(channel.text) for channel in group.find("channels")]
-            for group in root.find("spikeDetection").find("channelGroups").findall("group")
-        ]
+        shank_channels = [list(channels) for channels in header.shank_channels]
 
         all_shank_channels = np.concatenate(shank_channels)
         all_shank_channels.sort()
@@ -141,9 +136,9 @@ class YutaNWBConverter(NWBConverter):
 
         sorting_electrode_groups = []
         for shankn in range(len(shank_channels)):
-            df = get_clusters_single_shank(session_path, shankn + 1)
-            for _, _ in df.groupby("id"):
-                sorting_electrode_groups.append(f"shank{str(shankn+1)}")
+            spike_ids = read_spike_clustering(session_path, shankn + 1)
+            n_units = len(np.unique(spike_ids[spike_ids > 1]))  # 0 is noise and 1 is multi-unit activity
+            sorting_electrode_groups.extend([f"shank{str(shankn+1)}"] * n_units)
 
         metadata = super().get_metadata()
         metadata["NWBFile"].update(
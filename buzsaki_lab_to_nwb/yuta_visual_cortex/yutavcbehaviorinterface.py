@@ -1,11 +1,14 @@
 """Authors: Heberto Mayorquin and Cody Baker."""
 from pathlib import Path
+
+import numpy as np
 from nwb_conversion_tools.utils.json_schema import FolderPathType
 
 from pynwb.file import NWBFile, TimeIntervals
 from nwb_conversion_tools.basedatainterface import BaseDataInterface
 from nwb_conversion_tools.utils.conversion_tools import get_module
 
+from ..utils.sleep_states import read_sleep_state_intervals, build_sleep_states_table
 from .yuta_vc_utils import read_matlab_file
 
 
@@ -26,27 +29,11 @@ class YutaVCBehaviorInterface(BaseDataInterface):
         # Sleep states
         sleep_file_path = session_path / f"{session_id}.SleepState.states.mat"
         if Path(sleep_file_path).exists():
-            mat_file = read_matlab_file(sleep_file_path)
-
-            state_label_names = dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM", MAstate="MA")
-            sleep_state_dic = mat_file["SleepState"]["ints"]
-            table = TimeIntervals(name="Sleep states", description="Sleep state of the animal.")
-            table.add_column(name="label", description="Sleep state.")
-
-            data = []
-            for sleep_state in state_label_names:
-                values = sleep_state_dic[sleep_state]
-                if len(values) != 0 and isinstance(values[0], int):
-                    values = [values]
-                for start_time, stop_time in values:
-                    data.append(
-                        dict(
-                            start_time=float(start_time),
-                            stop_time=float(stop_time),
-                            label=state_label_names[sleep_state],
-                        )
-                    )
-            [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
+            table = build_sleep_states_table(
+                state_intervals=read_sleep_state_intervals(file_path=sleep_file_path),
+                name="Sleep states",
+                state_label_names=dict(WAKEstate="Awake", NREMstate="Non-REM", REMstate="REM", MAstate="MA"),
+            )
             processing_module.add(table)
 
         # Up and down states
@@ -58,7 +45,7 @@ class YutaVCBehaviorInterface(BaseDataInterface):
         data = []
         up_and_down_intervals_dic = behavioral_file["SlowWaves"]["ints"]
         for state, values in up_and_down_intervals_dic.items():
-            for start_time, stop_time in values:
+            for start_time, stop_time in np.reshape(values, (-1, 2)):
                 data.append(dict(start_time=float(start_time), stop_time=float(stop_time), label=state))
         [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
         processing_module.add(table)
@@ -76,8 +63,8 @@ class YutaVCBehaviorInterface(BaseDataInterface):
                 table.add_column(name="amplitude", description="Amplitude of the laser pulse.")
 
                 data = []
-                laser_pulses = laser_file["Pulses"]["periods"]
-                amplitudes = laser_file["Pulses"]["amplitude"]
+                laser_pulses = np.reshape(laser_file["Pulses"]["periods"], (-1, 2))
+                amplitudes = np.atleast_1d(laser_file["Pulses"]["amplitude"])
                 for interval, amplitude in zip(laser_pulses, amplitudes):
                     data.append(dict(start_time=float(interval[0]), stop_time=float(interval[1]), amplitude=amplitude))
                 [table.add_row(**row) for row in sorted(data, key=lambda x: x["start_time"])]
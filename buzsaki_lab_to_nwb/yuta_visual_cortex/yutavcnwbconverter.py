@@ -29,9 +29,9 @@ class YutaVCNWBConverter(NWBConverter):
         # Electrode locations
         electrode_chan_map_file_path = session_path / "chanMap.mat"
         chan_map = read_matlab_file(file_path=electrode_chan_map_file_path)
-        xcoords = [x[0] for x in chan_map["xcoords"]]
-        ycoords = [y[0] for y in chan_map["ycoords"]]
-        for channel_id in chan_map["chanMap0ind"]:
+        xcoords = chan_map["xcoords"]
+        ycoords = chan_map["ycoords"]
+        for channel_id in chan_map["chanMap0ind"].astype(int):
             self.data_interface_objects["NeuroscopeLFP"].recording_extractor.set_channel_locations(
                 locations=[xcoords[channel_id], ycoords[channel_id]], channel_ids=channel_id
             )
@@ -62,16 +62,16 @@ class YutaVCNWBConverter(NWBConverter):
         for property_key, property_name in cell_metrics_map.items():
             try:
                 if property_key in ["synapticEffect", "putativeCellType", "brainRegion"]:
-                    values = [str(x[0]) for x in cell_metrics[property_key][0][0][0]]
+                    values = [str(x) for x in cell_metrics[property_key]]
                 else:
-                    values = cell_metrics[property_key][0][0][0]
+                    values = cell_metrics[property_key]
                 if len(values) != n_units:
                     print(f"Skipping unit property {property_name} in session {session_id} due to length mismatch!")
                 else:
                     self.data_interface_objects["PhySorting"].sorting_extractor.set_units_property(
                         property_name=property_name, values=values
                     )
-            except ValueError:  # only safe way I know of to check key existence in numpy void object
+            except KeyError:
                 print(f"Skipping unit property {property_name} in session {session_id} due to missing key!")
 
     def get_metadata(self):
@@ -0,0 +1,84 @@
+"""Round trip of repack_nwbfile on a small NWB file holding strings, references and compound references."""
+from datetime import datetime, timezone
+
+import h5py
+import numpy as np
+import pytest
+from hdmf.backends.hdf5.h5_utils import H5DataIO
+from pynwb import NWBFile, NWBHDF5IO, TimeSeries
+
+from buzsaki_lab_to_nwb.utils.chunking import TIME_SLICE, get_chunk_advice
+from buzsaki_lab_to_nwb.utils.hdf5_repack import repack_nwbfile
+
+DATA = np.arange(20000, dtype="float32").reshape(-1, 2)
+
+
+@pytest.fixture
+def source_file_path(tmp_path):
+    nwbfile = NWBFile(
+        session_description="session", identifier="id", session_start_time=datetime(2020, 1, 1, tzinfo=timezone.utc)
+    )
+    device = nwbfile.create_device(name="device")
+    electrode_group = nwbfile.create_electrode_group(name="shank1", description="shank", location="CA1", device=device)
+    for _ in range(4):
+        nwbfile.add_electrode(location="CA1", group=electrode_group, x=1.0, y=2.0, z=3.0, imp=np.nan, filtering="none")
+    time_series = TimeSeries(
+        name="TimeSeries", data=H5DataIO(DATA, compression="gzip", chunks=(100, 2)), unit="a.u.", rate=10.0
+    )
+    nwbfile.add_acquisition(time_series)
+    nwbfile.add_epoch(start_time=0.0, stop_time=1.0, tags=["a"], timeseries=[time_series])
+    nwbfile.add_epoch(start_time=1.0, stop_time=2.0, tags=["b"], timeseries=[time_series])
+
+    file_path = tmp_path / "source.nwb"
+    with NWBHDF5IO(str(file_path), mode="w") as io:
+        io.write(nwbfile)
+    return file_path
+
+
+def get_rechunk_plan(file_path) -> dict:
+    """Rechunk every non-scalar dataset, as the Petersen repack does."""
+    chunk_shapes = dict()
+
+    def add_dataset(name, h5py_object):
+        if isinstance(h5py_object, h5py.Dataset) and h5py_object.ndim > 0:
+            chunk_advice = get_chunk_advice(shape=h5py_object.shape, dtype=h5py_object.dtype, access=TIME_SLICE)
+            chunk_shapes[h5py_object.name] = chunk_advice.chunk_shape
+
+    with h5py.File(file_path, mode="r") as file:
+        file.visititems(add_dataset)
+    return chunk_shapes
+
+
+@pytest.mark.parametrize("rechunk", [True, False])
+def test_repack_nwbfile_round_trip(source_file_path, tmp_path, rechunk):
+    chunk_shapes = get_rechunk_plan(source_file_path) if rechunk else None
+    if rechunk:
+        assert "/file_create_date" in chunk_shapes
+        assert "/general/extracellular_ephys/electrodes/group" in chunk_shapes
+        assert "/intervals/epochs/timeseries" in chunk_shapes
+    target_file_path = tmp_path / "target.nwb"
+    repack_nwbfile(source_file_path=source_file_path, target_file_path=target_file_path, chunk_shapes=chunk_shapes)
+
+    with NWBHDF5IO(str(source_file_path), mode="r") as source_io, NWBHDF5IO(
+        str(target_file_path), mode="r"
+    ) as target_io:
+        source_nwbfile = source_io.read()
+        target_nwbfile = target_io.read()
+
+        assert target_nwbfile.file_create_date == source_nwbfile.file_create_date
+        np.testing.assert_array_equal(target_nwbfile.acquisition["TimeSeries"].data[:], DATA)
+
+        electrodes = target_nwbfile.electrodes.to_dataframe()
+        assert list(electrodes["location"]) == ["CA1"] * 4
+        assert list(electrodes["group_name"]) == ["shank1"] * 4
+        assert all(group is target_nwbfile.electrode_groups["shank1"] for group in electrodes["group"])
+
+        epochs = target_nwbfile.epochs.to_dataframe()
+        assert list(epochs["tags"]) == [["a"], ["b"]]
+        for timeseries in epochs["timeseries"]:  # (idx_start, count, TimeSeries) of each epoch
+            assert timeseries[0][2] is target_nwbfile.acquisition["TimeSeries"]
+
+    if rechunk:
+        with h5py.File(target_file_path, mode="r") as file:
+            for path, chunk_shape in chunk_shapes.items():
+                assert file[path].chunks == tuple(chunk_shape), path
@@ -0,0 +1,40 @@
+"""Checks that decide whether run_incremental_conversion may patch a file or must rewrite it."""
+import h5py
+import numpy as np
+
+from buzsaki_lab_to_nwb.utils.incremental_conversion import IncrementalNWBConverterMixin, find_links_into
+
+
+def test_find_links_into(tmp_path):
+    with h5py.File(tmp_path / "links.h5", mode="w") as file:
+        dataset = file.create_dataset("interface/series/data", data=np.arange(4))
+        file.create_dataset("interface/series/timestamps", data=np.arange(4.0))
+        file["interface/series"].attrs["data"] = dataset.ref  # References within the deleted groups do not count
+        file.create_group("other")
+        assert find_links_into(file=file, container_paths=["/interface/series"]) == []
+
+        file["other/soft"] = h5py.SoftLink("/interface/series/data")
+        file["other/hard"] = dataset
+        file["other"].attrs["reference"] = dataset.ref
+        compound_dtype = np.dtype([("index", "int32"), ("series", h5py.ref_dtype)])
+        file.create_dataset("other/table", data=np.array([(0, file["interface/series"].ref)], dtype=compound_dtype))
+        links = find_links_into(file=file, container_paths=["/interface/series"])
+    assert sorted(links) == ["/other/hard", "/other/soft", "/other/table", "/other@reference"]
+
+
+class Converter(IncrementalNWBConverterMixin):
+    interface_metadata_keys = dict(Behavior=["Behavior"])
+
+
+def test_get_metadata_fingerprint():
+    metadata = dict(NWBFile=dict(identifier="a", session_description="session"), Behavior=dict(name="position"))
+    fingerprint = Converter().get_metadata_fingerprint(metadata=metadata)
+
+    for changed_metadata in (
+        dict(metadata, NWBFile=dict(identifier="b", session_description="session")),
+        dict(metadata, Behavior=dict(name="speed")),
+    ):
+        assert Converter().get_metadata_fingerprint(metadata=changed_metadata) == fingerprint
+    changed_metadata = dict(metadata, NWBFile=dict(identifier="a", session_description="other session"))
+    assert Converter().get_metadata_fingerprint(metadata=changed_metadata) != fingerprint
+    assert metadata["NWBFile"]["identifier"] == "a"
@@ -0,0 +1,57 @@
+"""read_mat_file returns the same values for the same variables saved as v5 and as v7.3 files."""
+import numpy as np
+import pytest
+from scipy.io import savemat
+
+from buzsaki_lab_to_nwb.utils.mat_loader import MAT_V5, MAT_V73, clear_mat_cache, get_mat_version, read_mat_file
+
+hdf5storage = pytest.importorskip("hdf5storage")
+
+
+def get_variables() -> dict:
+    struct_array = np.empty((1, 3), dtype=[("start", "O"), ("label", "O")])
+    struct_array[0, 0] = (np.array([[1.0, 2.0]]), "a")
+    struct_array[0, 1] = (np.array([[3.0]]), "bc")
+    struct_array[0, 2] = (np.array([[4.0, 5.0, 6.0]]), "d")
+    cell_array = np.empty((1, 2), dtype=object)
+    cell_array[0, 0] = np.array([[1, 2, 3]])
+    cell_array[0, 1] = "text"
+    session = dict(
+        trials=struct_array,
+        general=dict(channels=np.arange(4.0)[None]),
+        cells=cell_array,
+        name="session",
+        rate=1250.0,
+        intervals=np.arange(6.0).reshape(3, 2),
+    )
+    return dict(session=session, count=np.array([[7]]))
+
+
+def assert_same(value, expected, path="/"):
+    assert type(value) is type(expected), path
+    if isinstance(expected, dict):
+        assert value.keys() == expected.keys(), path
+        for key in expected:
+            assert_same(value[key], expected[key], path=f"{path}{key}/")
+    elif isinstance(expected, list):
+        assert len(value) == len(expected), path
+        for index, (item, expected_item) in enumerate(zip(value, expected)):
+            assert_same(item, expected_item, path=f"{path}{index}/")
+    elif isinstance(expected, np.ndarray):
+        np.testing.assert_array_equal(value, expected, err_msg=path)
+    else:
+        assert value == expected, path
+
+
+def test_read_mat_file_v5_and_v73(tmp_path):
+    v5_file_path, v73_file_path = tmp_path / "v5.mat", tmp_path / "v73.mat"
+    savemat(v5_file_path, get_variables())
+    hdf5storage.savemat(str(v73_file_path), get_variables(), format="7.3", matlab_compatible=True)
+    assert get_mat_version(v5_file_path) == MAT_V5
+    assert get_mat_version(v73_file_path) == MAT_V73
+
+    v5_data, v73_data = read_mat_file(v5_file_path), read_mat_file(v73_file_path)
+    clear_mat_cache()
+    assert_same(v73_data, v5_data)
+    assert [trial["label"] for trial in v73_data["session"]["trials"]] == ["a", "bc", "d"]
+    assert read_mat_file(v73_file_path, variable_names=["count"]) == dict(count=7)
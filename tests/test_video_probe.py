@@ -0,0 +1,34 @@
+"""Header probing and demux validation of a small synthetic AVI."""
+import numpy as np
+import pytest
+
+from buzsaki_lab_to_nwb.utils.video_probe import probe_video_container, read_avi_header, validate_video_probe
+
+cv2 = pytest.importorskip("cv2")
+
+FRAME_COUNT = 12
+FPS = 30.0
+
+
+@pytest.fixture
+def avi_file_path(tmp_path):
+    file_path = tmp_path / "video.avi"
+    video_writer = cv2.VideoWriter(str(file_path), cv2.VideoWriter_fourcc(*"MJPG"), FPS, (32, 24))
+    for frame_index in range(FRAME_COUNT):
+        video_writer.write(np.full((24, 32, 3), fill_value=frame_index * 10, dtype="uint8"))
+    video_writer.release()
+    return file_path
+
+
+def test_read_avi_header(avi_file_path):
+    frame_count, fps = read_avi_header(avi_file_path)
+    assert frame_count == FRAME_COUNT
+    assert fps == pytest.approx(FPS)
+
+
+def test_validate_video_probe(avi_file_path):
+    video_probe = validate_video_probe(avi_file_path, video_probe=probe_video_container(avi_file_path))
+    assert video_probe.validated
+    assert video_probe.frame_count == FRAME_COUNT
+    assert video_probe.timestamps is None  # Evenly spaced frames are not stored
+    np.testing.assert_allclose(video_probe.get_timestamps(), np.arange(FRAME_COUNT) / FPS)